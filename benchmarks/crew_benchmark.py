@@ -0,0 +1,144 @@
+# Offline end-to-end benchmark for the three crews
+# Runs OpportunityInsightCrew, BootStrapCrew and StartupValidatorCrew against the fake LMs in fake_lm.py,
+# once with CrewAI's LLM.call left alone ("baseline") and once behind the DSPy rewrite interceptor ("rewrite").
+# Reports wall time, LM calls per kickoff and the interceptor's CPU overhead per CrewAI LLM call.
+#
+#   python benchmarks/crew_benchmark.py --llm-latency 0.2 --dspy-latency 0.05 --repeat 3 --json bench.json
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for project in ("crewcommon", "vanillacrewai", "crewaibootstrap", "crewaimiprov2"):
+    sys.path.insert(0, os.path.join(REPO_ROOT, project, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# The main modules check for a key on first use and CrewAI reports telemetry; neither is wanted offline
+os.environ.setdefault("ANTHROPIC_API_KEY", "offline-benchmark")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+import dspy
+import crewai.llm
+from crewcommon.interceptor import RewriteStats
+from crewcommon.rewriter import AgentTemplateStore, BoilerplateNormalizer, RewriteCache, create_patched_llm_call_function
+from fake_lm import FakeCrewLLMCall, FakeDSPyLM
+
+# (crew class, crew package, main module whose interceptor rewrites its prompts, kickoff inputs)
+CREWS = [
+    ("OpportunityInsightCrew", "vanillacrewai", "crewaibootstrap",
+     {"topic": "AI in Personalized Fitness and Nutrition Coaching", "current_year": datetime.now().year}),
+    ("BootStrapCrew", "crewaibootstrap", "crewaibootstrap", {"topic": "Kenyan couple going to Netherlands for 5 days"}),
+    ("StartupValidatorCrew", "crewaimiprov2", "crewaimiprov2", {"topic": "AI Solutions for cancer diagnosis"}),
+]
+
+def create_rewrite_module(main_name: str):
+    """An uncompiled module of the crew's own type to rewrite with; it runs on the fake LM dspy is configured with."""
+    return importlib.import_module(f"{main_name}.main").PromptOptimizerModule()
+
+def kickoff_once(crew_class, inputs, llm_call, fake_crew_call: FakeCrewLLMCall, fake_dspy_lm: FakeDSPyLM) -> dict:
+    crewai.llm.LLM.call = llm_call
+    fake_crew_call.counter.reset()
+    fake_dspy_lm.counter.reset()
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):  # Crews and the interceptor are verbose; keep the report readable
+        crew_class().crew().kickoff(inputs=inputs)
+    return {
+        "wall_seconds": time.perf_counter() - wall_start,
+        "cpu_seconds": time.process_time() - cpu_start,
+        "crew_llm_calls": fake_crew_call.counter.reset(),
+        "dspy_lm_calls": fake_dspy_lm.counter.reset(),
+    }
+
+def median_of(runs: list, key: str) -> float:
+    return statistics.median(run[key] for run in runs)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark of the crews with and without DSPy rewriting.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake CrewAI LLM call")
+    parser.add_argument("--dspy-latency", type=float, default=0.05, help="Seconds per fake DSPy LM call")
+    parser.add_argument("--repeat", type=int, default=3, help="Kickoffs per crew and scenario; medians are reported")
+    parser.add_argument("--json", help="Also write the raw and median results to this JSON file")
+    parser.add_argument("--max-overhead-ms", type=float, help="Exit with status 1 if the interceptor CPU overhead per call exceeds this")
+    args = parser.parse_args()
+
+    fake_crew_call = FakeCrewLLMCall(latency=args.llm_latency)
+    fake_dspy_lm = FakeDSPyLM(latency=args.dspy_latency)
+    dspy.configure(lm=fake_dspy_lm)
+
+    def fake_llm_call(self, messages, *call_args, **call_kwargs):
+        return fake_crew_call(self, messages, *call_args, **call_kwargs)
+
+    report = []
+    failed = False
+    print(f"{'crew':<24}{'scenario':<10}{'wall s':>9}{'cpu s':>9}{'crew LLM':>10}{'DSPy LM':>9}{'overhead ms/call':>18}")
+
+    # Task output files (market_research.md, visa_report.md, ...) land in a scratch directory, not the repo
+    with tempfile.TemporaryDirectory() as workdir:
+        previous_cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            for crew_name, crew_package, main_name, inputs in CREWS:
+                crew_class = getattr(importlib.import_module(f"{crew_package}.crew"), crew_name)
+
+                # The fake must be in place before crewcommon captures the "original" LLM.call
+                crewai.llm.LLM.call = fake_llm_call
+                rewrite_module = create_rewrite_module(main_name)
+
+                baseline_runs = [kickoff_once(crew_class, inputs, fake_llm_call, fake_crew_call, fake_dspy_lm)
+                                 for _ in range(args.repeat)]
+
+                rewrite_runs = []
+                for _ in range(args.repeat):
+                    # Fresh interceptor state per kickoff, the same way run() sets it up
+                    patched_call = create_patched_llm_call_function(
+                        rewrite_module, RewriteCache(),
+                        template_store=AgentTemplateStore(),
+                        normalizer=BoilerplateNormalizer(),
+                        stats=RewriteStats(crew_package),
+                    )
+                    rewrite_runs.append(kickoff_once(crew_class, inputs, patched_call, fake_crew_call, fake_dspy_lm))
+
+                calls = max(median_of(rewrite_runs, "crew_llm_calls"), 1)
+                overhead_ms = (median_of(rewrite_runs, "cpu_seconds") - median_of(baseline_runs, "cpu_seconds")) / calls * 1000
+                failed |= args.max_overhead_ms is not None and overhead_ms > args.max_overhead_ms
+
+                for scenario, runs in (("baseline", baseline_runs), ("rewrite", rewrite_runs)):
+                    summary = {
+                        "crew": crew_name,
+                        "scenario": scenario,
+                        "wall_seconds": median_of(runs, "wall_seconds"),
+                        "cpu_seconds": median_of(runs, "cpu_seconds"),
+                        "crew_llm_calls": median_of(runs, "crew_llm_calls"),
+                        "dspy_lm_calls": median_of(runs, "dspy_lm_calls"),
+                        "interceptor_cpu_ms_per_call": overhead_ms if scenario == "rewrite" else 0.0,
+                        "runs": runs,
+                    }
+                    report.append(summary)
+                    print(f"{crew_name:<24}{scenario:<10}{summary['wall_seconds']:>9.2f}{summary['cpu_seconds']:>9.2f}"
+                          f"{summary['crew_llm_calls']:>10.0f}{summary['dspy_lm_calls']:>9.0f}"
+                          f"{summary['interceptor_cpu_ms_per_call']:>18.2f}")
+        finally:
+            os.chdir(previous_cwd)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "results": report}, f, indent=2)
+        print(f"\n📄 Results written to {args.json}")
+
+    if failed:
+        print(f"\n❌ Interceptor CPU overhead is above {args.max_overhead_ms:g} ms per call")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# Deterministic offline stand-ins for dspy.LM and CrewAI's LLM.call
+# Both answer with canned/templated text after a configurable latency, so the crews, the DSPy rewrite
+# interceptor and the optimizers can be timed without any network access or API spend.
+
+import hashlib
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+import dspy
+from dspy.utils.callback import with_callbacks
+
+# The ChatAdapter lists the signature's output fields in the system message as "1. `name` (type): ..."
+OUTPUT_FIELDS_PATTERN = re.compile(r"Your output fields are:(.*?)(?:All interactions will be structured|$)", re.S)
+FIELD_PATTERN = re.compile(r"`(\w+)` \((\w+)\)")
+INPUT_VALUE_PATTERN = re.compile(r"\[\[ ## \w+ ## \]\]\n(.+)")
+
+def stable_choice(text: str, options: List[str]) -> str:
+    # Same input, same answer: picks an option from a hash of the text, not from a random generator
+    return options[int(hashlib.sha256(text.encode("utf-8")).hexdigest(), 16) % len(options)]
+
+class CallCounter:
+    """Thread-safe call counter shared by the fakes, reset between benchmark kickoffs."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def increment(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def reset(self) -> int:
+        with self._lock:
+            calls, self.calls = self.calls, 0
+            return calls
+
+class FakeDSPyLM(dspy.LM):
+    """dspy.LM stand-in that answers every signature with templated field values after a fixed latency."""
+
+    def __init__(self, latency: float = 0.05, model: str = "fake/offline-dspy"):
+        super().__init__(model, cache=False)
+        self.latency = latency
+        self.counter = CallCounter()
+
+    @with_callbacks # Like dspy.LM, so callbacks such as the LM call counters see the fake's calls
+    def __call__(self, prompt: Optional[str] = None, messages: Optional[List[Dict[str, str]]] = None, **kwargs) -> List[str]:
+        self.counter.increment()
+        time.sleep(self.latency)
+
+        messages = messages or [{"role": "user", "content": prompt or ""}]
+        system_text = "\n".join(m["content"] for m in messages if m.get("role") == "system")
+        user_text = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+
+        fields_block = OUTPUT_FIELDS_PATTERN.search(system_text)
+        fields = FIELD_PATTERN.findall(fields_block.group(1)) if fields_block else []
+        first_input = INPUT_VALUE_PATTERN.search(user_text)
+        subject = (first_input.group(1) if first_input else user_text).strip()[:80]
+
+        sections = []
+        for name, type_name in fields:
+            if type_name == "bool":
+                value = stable_choice(name + user_text, ["True", "True", "False"])
+            else:
+                value = (f"ROLE: Offline Specialist\nTASK: {subject}\n"
+                         f"REQUIREMENTS:\n- Be specific\n- {stable_choice(user_text, ['Use a numbered list', 'Use short sections'])}\n"
+                         f"FORMAT:\n1. [Item] - [Explanation]")
+            sections.append(f"[[ ## {name} ## ]]\n{value}")
+        sections.append("[[ ## completed ## ]]")
+        return ["\n\n".join(sections)]
+
+class FakeCrewLLMCall:
+    """
+    Replacement for crewai.llm.LLM.call. Returns a canned ReAct final answer built from the task text,
+    so CrewAI's parser accepts it and writes the task's output file as usual.
+    """
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.counter = CallCounter()
+
+    def __call__(self, llm_self, messages, *args, **kwargs) -> str:
+        self.counter.increment()
+        time.sleep(self.latency)
+
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        user_text = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        task_line = next((line for line in user_text.splitlines() if line.strip()), "the task").strip()[:100]
+
+        items = "\n".join(f"{i}. {stable_choice(f'{task_line}{i}', ['Market gap', 'Key risk', 'Next step', 'Day plan'])} {i} - "
+                          f"offline placeholder detail for: {task_line}" for i in range(1, 6))
+        return f"Thought: I now can give a great answer\nFinal Answer: # Offline Result\n\n{items}"
@@ -0,0 +1,127 @@
+# Startup budget check for the course modules
+# Imports each module in a fresh, cold interpreter (nothing pre-imported), with no API key and no .env in reach.
+# A separate cold interpreter times `import dspy` alone, and a dspy module's own cost is its cold import time minus that.
+# Fails if a module goes over the budget, pulls in crewai, or does I/O from repo code while it is imported.
+#
+#   python benchmarks/startup_budget.py --budget 0.5 --repeat 3
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMON_SRC = os.path.join(REPO_ROOT, "crewcommon", "src") # Imported by every crew main
+
+# (module name, directory that has to be on sys.path to import it)
+MODULES = [
+    ("vanillacrewai.main", os.path.join(REPO_ROOT, "vanillacrewai", "src")),
+    ("crewaibootstrap.main", os.path.join(REPO_ROOT, "crewaibootstrap", "src")),
+    ("crewaimiprov2.main", os.path.join(REPO_ROOT, "crewaimiprov2", "src")),
+    ("crewruntime.main", os.path.join(REPO_ROOT, "crewruntime", "src")),
+    ("dspyintro", os.path.join(REPO_ROOT, "dspyintro")),
+]
+
+# Runs inside the fresh interpreter. File, directory, network and process events are recorded when the nearest
+# frame that caused them is repo code; events raised under the import system belong to the module being imported
+# (e.g. dspy setting up its cache), so they only count towards the time. os.stat has no audit event and is wrapped.
+PROBE = """
+import os, sys, time
+repo_root = os.path.join(sys.argv[2], "")
+io_events = []
+AUDITED = {"open", "os.stat", "os.listdir", "os.scandir", "socket.connect", "socket.getaddrinfo",
+           "subprocess.Popen", "sqlite3.connect"}
+
+def repo_caller():
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith("<frozen importlib"):
+            return None
+        if filename.startswith(repo_root):
+            return f"{os.path.relpath(filename, repo_root)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return None
+
+def record(event, args):
+    if event in AUDITED:
+        caller = repo_caller()
+        if caller is not None:
+            io_events.append(f"{event}({args[0]!r}) at {caller}" if args else f"{event} at {caller}")
+
+_stat = os.stat
+def audited_stat(path, *args, **kwargs):
+    record("os.stat", (path,))
+    return _stat(path, *args, **kwargs)
+
+os.stat = audited_stat
+sys.addaudithook(record)
+
+start = time.perf_counter()
+__import__(sys.argv[1])
+seconds = time.perf_counter() - start
+os.stat = _stat
+print(__import__("json").dumps({"seconds": seconds, "dspy_imported": "dspy" in sys.modules,
+                                "crewai_imported": "crewai" in sys.modules, "io_events": io_events}))
+"""
+
+def measure(module_name: str, path: str) -> dict:
+    env = {k: v for k, v in os.environ.items() if k != "ANTHROPIC_API_KEY"}
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (path, COMMON_SRC, env.get("PYTHONPATH")) if p)
+
+    # An empty working directory keeps load_dotenv (if anything still calls it) from finding a .env
+    with tempfile.TemporaryDirectory() as cwd:
+        completed = subprocess.run([sys.executable, "-c", PROBE, module_name, REPO_ROOT], env=env, cwd=cwd,
+                                   capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "import failed"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check cold import time of the course modules against a startup budget.")
+    parser.add_argument("--budget", type=float, default=float(os.getenv("STARTUP_BUDGET_SECONDS", "0.5")),
+                        help="Maximum seconds a cold import may take beyond a cold `import dspy` (default: 0.5)")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module; the fastest run is kept")
+    args = parser.parse_args()
+
+    baseline_runs = [measure("dspy", REPO_ROOT) for _ in range(args.repeat)]
+    baseline_errors = [run["error"] for run in baseline_runs if "error" in run]
+    if baseline_errors:
+        print(f"❌ Cold `import dspy` failed: {baseline_errors[0]}")
+        return 1
+    dspy_seconds = min(run["seconds"] for run in baseline_runs)
+    print(f"🧊 Cold `import dspy`: {dspy_seconds:.3f}s\n")
+
+    failures = 0
+    print(f"{'module':<24}{'cold import':>14}{'own import':>14}  status")
+    for module_name, path in MODULES:
+        runs = [measure(module_name, path) for _ in range(args.repeat)]
+        errors = [run["error"] for run in runs if "error" in run]
+        if errors:
+            failures += 1
+            print(f"{module_name:<24}{'-':>14}{'-':>14}  ❌ {errors[0]}")
+            continue
+
+        best = min(runs, key=lambda run: run["seconds"])
+        # Modules that never import dspy (vanillacrewai, crewruntime) are charged their whole cold import
+        own_seconds = max(0.0, best["seconds"] - dspy_seconds) if best["dspy_imported"] else best["seconds"]
+        io_events = sorted({event for run in runs for event in run["io_events"]})
+        problems = []
+        if own_seconds > args.budget:
+            problems.append(f"over budget ({args.budget:g}s)")
+        if any(run["crewai_imported"] for run in runs):
+            problems.append("imports crewai")
+        if io_events:
+            problems.append(f"does I/O at import ({len(io_events)} events)")
+        failures += bool(problems)
+        status = "❌ " + ", ".join(problems) if problems else "✅"
+        print(f"{module_name:<24}{best['seconds']:>13.3f}s{own_seconds:>13.3f}s  {status}")
+        for event in io_events:
+            print(f"{'':<24}  ↳ {event}")
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
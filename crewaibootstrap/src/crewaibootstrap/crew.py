@@ -1,15 +1,23 @@
+from pathlib import Path
+
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
+from crewcommon.optimized_config import OptimizedConfigCrew
+
+from .tools.custom_tool import KnowledgeSearchTool
 
 @CrewBase
-class BootStrapCrew():
+class BootStrapCrew(OptimizedConfigCrew):
     """Crew that plans international travel itineraries and checks visa requirements"""
 
+    config_dir = Path(__file__).parent / "config" # CREW_OPTIMIZED_CONFIG=1 loads config/optimized/current instead of the YAML below
+
     @agent
     def travel_planner(self) -> Agent:
         return Agent(
             config=self.agents_config['travel_planner'],
             verbose=True,
+            tools=[KnowledgeSearchTool()], # Shared BM25 index over knowledge/ and earlier reports
             # Configure LLM directly as requested
             llm="anthropic/claude-sonnet-4-20250514"
         )
@@ -19,6 +27,7 @@ class BootStrapCrew():
         return Agent(
             config=self.agents_config['visa_expert'],
             verbose=True,
+            tools=[KnowledgeSearchTool()], # Shared BM25 index over knowledge/ and earlier reports
             # Configure LLM directly as requested
             llm="anthropic/claude-sonnet-4-20250514"
         )
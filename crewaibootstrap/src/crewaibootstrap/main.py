@@ -2,25 +2,74 @@
 import dspy
 from dotenv import load_dotenv
 import os
-import crewai.llm
-from typing import List, Dict, Union, Callable
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dspy.utils.callback import BaseCallback
+from typing import List, Dict, Union, Callable, Optional, Tuple
+from crewcommon.commands import CrewCommands, kickoff_topics_async
+from crewcommon.http_pool import get_http_pool, print_http_pool_stats
+from crewcommon.interceptor import (RewriteStats, create_counting_llm_call, get_original_llm_call, patch_llm_call,
+                                    print_rewrite_stats_summary, write_rewrite_stats)
+from crewcommon.lms import get_shared_lm
+from crewcommon.rewriter import (CAPTURE_FINAL_ANSWER, NEAR_DUP_ENABLED, REWRITE_NORMALIZE, TASK_CONTEXT_MARKER,
+                                 AgentTemplateStore, BoilerplateNormalizer, NearDuplicateIndex, RewriteCache,
+                                 StaticTemplateStore, bridge_async_llm_call, build_message_contexts,
+                                 create_async_patched_llm_call_function, create_patched_llm_call_function,
+                                 get_rewrite_policy, get_static_templates,
+                                 print_near_duplicate_stats, print_rewrite_policy_stats, print_static_template_stats,
+                                 split_agent_template, to_placeholder_form)
+from crewcommon.streaming import task_output_streamer
 
 # --- Configuration ---
-# Loading environmental variables
-load_dotenv()
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+# Everything below is created on first use, so importing this module stays fast, offline and side-effect free.
+MAIN_TASK_LM_MODEL = 'anthropic/claude-3-opus-20240229'
+ASSESS_LM_MODEL = 'anthropic/claude-sonnet-4-20250514'
 
-if not ANTHROPIC_API_KEY:
-    raise ValueError("ANTHROPIC_API_KEY not found in environment variables.")
+@lru_cache(maxsize=None)
+def get_anthropic_api_key() -> str:
+    # Loading environmental variables
+    load_dotenv()
+    api_key = os.getenv("ANTHROPIC_API_KEY")
 
-# Configure DSPy with Claude 3 Opus for the main task LLM
-main_task_lm = dspy.LM('anthropic/claude-3-opus-20240229', api_key=ANTHROPIC_API_KEY, cache=True)
-dspy.configure(lm=main_task_lm)
-print("DSPy is configured with Claude 3 Opus for main task optimization.")
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY not found in environment variables.")
+    return api_key
 
-# Configure a separate Claude Sonnet 4 for the AI-assisted metric (you can use the same llm for main task and metric)
-assess_lm = dspy.LM('anthropic/claude-sonnet-4-20250514', api_key=ANTHROPIC_API_KEY, cache=True)
-print("DSPy metric LLM is configured with Claude Sonnet 4.")
+def get_main_task_lm() -> dspy.LM:
+    # Claude 3 Opus for the main task LLM; one client per model is shared with every other crew in the process
+    return get_shared_lm(MAIN_TASK_LM_MODEL, get_anthropic_api_key())
+
+def get_assess_lm() -> dspy.LM:
+    # A separate Claude Sonnet 4 for the AI-assisted metric (you can use the same llm for main task and metric)
+    return get_shared_lm(ASSESS_LM_MODEL, get_anthropic_api_key())
+
+@lru_cache(maxsize=None)
+def configure_dspy() -> dspy.LM:
+    # Only this crew's own entry points configure DSPy globally; crewruntime passes its LM to get_optimized_module
+    main_task_lm = get_main_task_lm()
+    dspy.configure(lm=main_task_lm)
+    print("DSPy is configured with Claude 3 Opus for main task optimization.")
+    return main_task_lm
+
+def __getattr__(name: str):
+    # Keep the old module-level names working (e.g. `main.assess_lm`) while creating them lazily
+    lazy_attributes = {
+        "main_task_lm": get_main_task_lm,
+        "assess_lm": get_assess_lm,
+        "trainset": get_trainset,
+        "devset": get_devset,
+    }
+    if name in lazy_attributes:
+        return lazy_attributes[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- DSPy Components for Prompt Optimization ---
 # Define the NEW Signature for Prompt Optimization
@@ -58,195 +107,200 @@ class PromptOptimizerModule(dspy.Module):
 basic_prompt_module = PromptOptimizerModule()
 
 # --- Create Train and Dev Sets for Prompt Improvement ---
-trainset = [
-    dspy.Example(
-        crewai_prompt=(
-            "[System]: You are a Market Opportunity Explorer for AI in Personalized Fitness and Nutrition Coaching.\n"
-            "A strategic thinker who collaborates with early-stage startups to uncover niche opportunities.\n"
-            "Experienced in using market signals, customer behavior, and unmet pain points to guide innovation.\n\n"
-            "Your personal goal is: Identify underserved needs, emerging demands, and untapped segments within "
-            "the AI in Personalized Fitness and Nutrition Coaching domain\n\n"
-            "To give my best complete final answer to the task respond using the exact following format:\n\n"
-            "Thought: I now can give a great answer.\n\n"
-            "[User]: Current Task: Identify gaps and emerging opportunities in the "
-            "AI in Personalized Fitness and Nutrition Coaching space using up-to-date 2025 data.\n\n"
-            "This is the expected criteria for your final answer: A list of 8-10 market gaps or opportunities with 1-2 lines of context each.\n\n"
-            "You MUST return the actual complete content as the final answer, not a summary.\n\n"
-            "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it! "
-        ),
-        dspy_improved_prompt=(
-            "[System]: ROLE: Market Opportunity Analyst\n"
-            "DOMAIN: AI for Personalized Fitness and Nutrition Coaching\n"
-            "OBJECTIVE: Identify strategic market gaps, emerging demands, and underserved segments.\n"
-            "CONTEXT:\n"
-            "- You are a domain expert who advises early-stage startups.\n"
-            "- You use behavioral trends, market signals, and customer pain points.\n"
-            "- Your output guides innovation and product strategy.\n"
-            "[User]: TASK: Generate a list of 8-10 specific market opportunities in the domain of AI for Personalized Fitness and Nutrition Coaching.\n\n"
-            "REQUIREMENTS:\n"
-            "- Each opportunity must include:\n"
-            "  • A clear, short title\n"
-            "  • 1-2 lines of explanation grounded in user behavior, trends, or unmet needs\n"
-            "- Avoid vague or overly general phrasing\n"
-            "- Do not summarize or give analysis before or after the list\n\n"
-            "FORMAT:\n"
-            "1. [Opportunity Title] - Contextual explanation\n"
-            "2. ...\n\n"
-            "EXAMPLES:\n"
-            "1. Personalized Menopause Coaching - A growing demand among middle-aged women for tailored fitness and nutrition plans that adapt to hormonal changes.\n"
-            "2. AI Meal Planning for Gut Health - Rising interest in gut microbiome optimization creates a need for personalized meal recommendations based on digestive data.\n\n"
-            "Begin your list now. Return only the structured output."
-        )
-    ).with_inputs("crewai_prompt"),
-
-    dspy.Example(
-        crewai_prompt=(
-            "[System]: You are a Cybersecurity Consultant for Small Businesses. Your goal is to help small businesses "
-            "with their cybersecurity needs. Your backstory: You're an expert who understands small business "
-            "challenges and how to keep their data safe.\n\n"
-            "To give my best complete final answer to the task respond using the exact following format:\n\n"
-            "Thought: I now can give a great answer.\n\n"
-            "[User]: Current Task: Advise a small business on common cybersecurity threats they face and how to protect themselves. "
-            "Your expected output is a list of three threats and simple solutions.\n\n"
-            "You MUST return the actual complete content as the final answer, not a summary.\n\n"
-            "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it! "
-        ),
-        dspy_improved_prompt=(
-            "[System]: **Consultant Profile:** Cybersecurity Specialist for Small & Medium Enterprises (SMEs).\n"
-            "**Core Mission:** Provide concise, actionable security guidance tailored for businesses with limited IT resources.\n"
-            "**Key Expertise:** Risk assessment, incident response planning, and practical security tool implementation.\n" 
-            "**Target Audience:** Non-technical business owners and staff requiring clear, understandable advice.\n\n"
-            "[User]: **Assignment:** Detail 4 common cybersecurity threats relevant to a typical small business, each with 2 practical mitigation steps.\n\n"
-            "**Output Directives:**\n"
-            "- Focus on immediately implementable and high-impact solutions.\n"
-            "- Ensure advice is current and avoids jargon.\n"
-            "- Present as a clear, numbered list.\n\n"
-            "**Format Example:**\n"
-            "1. **Threat:** [Threat Name]\n"
-            "   **Mitigation:** [Actionable Step 1]; [Actionable Step 2]\n\n"
-            "**Illustrative Entry:**\n"
-            "1. **Threat:** Phishing and Spear Phishing Attacks\n"
-            "   **Mitigation:** Conduct mandatory, regular employee training on identifying suspicious emails; Implement email gateway security with robust anti-phishing filters.\n\n"
-            "Generate the cybersecurity threat guide now. Only the formatted list should be returned."
-        )
-    ).with_inputs("crewai_prompt"),
-
-    dspy.Example(
-        crewai_prompt=(
-            "[System]: You are a Technology Risk Analyst whose goal is to look at new tech and find problems. "
-            "Your backstory is that you are good at spotting risks in new digital systems and you specialize in IoT devices. \n\n"
-            "To give my best complete final answer to the task respond using the exact following format:\n\n"
-            "Thought: I now can give a great answer.\n\n"
-            "[User]: Current Task: Identify security and privacy risks for deploying IoT in a smart home setting. "
-            "Expected output is a list of 3 risks.\n\n"
-            "This is the expected criteria for your final answer: Just a simple list of risks.\n\n"
-            "You MUST return the actual complete content as the final answer, not a summary.\n\n"
-            "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it! "
-        ),
-        dspy_improved_prompt=(
-            "[System]:\n"
-            "**Analyst Role:** IoT Security and Privacy Risk Assessment Specialist.\n"
-            "**Primary Objective:** Systematically identify and articulate potential vulnerabilities in nascent IoT deployments.\n"
-            "**Domain Expertise:** Comprehensive understanding of IoT device architecture, data flow, and emerging threat landscapes.\n"
-            "**Guiding Ethos:** Proactive identification and concise articulation of risks to enable robust mitigation strategies.\n\n"
-            "[User]:\n"
-            "**Task Directive:** Compile a list of 3 critical security and privacy risks associated with the deployment of Internet of Things (IoT) devices within a typical smart home environment.\n\n"
-            "**Content Specifications:**\n"
-            "- Each risk must be clearly named and explained in 2 sentences, highlighting the potential impact.\n"
-            "- Focus on risks inherent to consumer IoT devices and their interconnected nature.\n"
-            "- Categorize risks for clarity (e.g., Data Security, Device Vulnerabilities, Privacy Concerns).\n\n"
-            "**Expected Format:**\n"
-            "## IoT Smart Home Risk Assessment\n"
-            "\n"
-            "### [Risk Category 1]\n"
-            "- **[Risk Name 1]:** [Concise explanation of risk and impact]\n"
-            "- **[Risk Name 2]:** [Concise explanation of risk and impact]\n"
-            "\n"
-            "### [Risk Category 2]\n"
-            "- **[Risk Name 3]:** [Concise explanation of risk and impact]\n"
-            "\n"
-            "**Illustrative Entry:**\n"
-            "## IoT Smart Home Risk Assessment\n"
-            "\n"
-            "### Device Vulnerabilities\n"
-            "- **Weak Default Passwords:** Many IoT devices ship with easily guessable or hardcoded credentials, making them prime targets for unauthorized access and botnet recruitment.\n"
-            "- **Unpatched Firmware:** Manufacturers often fail to provide timely security updates, leaving devices vulnerable to known exploits long after discovery.\n\n"
-            "Generate the comprehensive risk assessment now. Provide only the markdown content, strictly adhering to the specified structure."
-        )
-    ).with_inputs("crewai_prompt"),
-]
-
-devset = [
-    dspy.Example(
-        crewai_prompt=(
-            "[System]: You are a Climate Risk Analyst specializing in urban environments. Your expertise lies in using AI models "
-            "to evaluate environmental risks and guide decision-making for city planners.\n\n"
-            "To give my best complete final answer to the task respond using the exact following format:\n\n"
-            "Thought: I now can give a great answer.\n\n"
-            "[User]: Current Task: Use 2025 climate data to identify 3 climate-related risks "
-            "that should influence the design of a coastal urban infrastructure project.\n\n"
-            "This is the expected criteria for your final answer: A list of 5 specific climate risks with 1-2 lines of explanation each.\n\n"
-            "You MUST return the actual complete content as the final answer, not a summary.\n\n"
-            "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it!"
-        ),
-        dspy_improved_prompt=(
-            "[System]:\n"
-            "**Role:** Urban Climate Risk Analyst\n"
-            "**Objective:** Surface actionable climate risks affecting city infrastructure design in coastal areas.\n"
-            "**Domain:** AI-Driven Environmental Modeling\n\n"
-            "[User]:\n"
-            "**Task Directive:** List 5 critical climate risks that urban planners must consider when designing infrastructure for a coastal city.\n\n"
-            "**Requirements:**\n"
-            "- Each risk should be named clearly and briefly explained based on projected 2025 climate models.\n"
-            "- Focus on risks relevant to construction, public safety, and city sustainability.\n"
-            "- Do not include policy commentary or mitigation strategies.\n\n"
-            "**Format:**\n"
-            "1. [Risk Name] - [Short impact explanation]\n"
-            "2. ...\n\n"
-            "**Illustrative Entry:**\n"
-            "1. Sea Level Rise - Coastal flooding events are expected to increase in frequency and severity due to rising tides and extreme weather.\n"
-            "2. Heat Island Intensification - Dense urban areas will experience prolonged heat waves that strain public health and power systems.\n\n"
-            "Generate your list of climate risks now. Only return the structured markdown list."
-        )
-    ).with_inputs("crewai_prompt"),
-
-    dspy.Example(
-        crewai_prompt=(
-            "[System]: You are a Mental Health Resource Curator. Your goal is to find and share resources for people who need mental health support. "
-            "Your backstory: You are good at finding reliable info and tools.\n\n"
-            "To give my best complete final answer to the task respond using the exact following format:\n\n"
-            "Thought: I now can give a great answer.\n\n"
-            "[User]: Current Task: Provide resources for managing a specific mental health challenge. " # Generic task
-            "Expected output: A list of resources.\n\n"
-            "This is the expected criteria for your final answer: A list of resources for the specified challenge.\n\n"
-            "You MUST return the actual complete content as the final answer, not a summary.\n\n"
-            "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it! "
-        ),
-        dspy_improved_prompt=(
-            "[System]:\n"
-            "ROLE: Mental Wellness Resource Specialist\n"
-            "DOMAIN: Mental Health Support and Stress Management\n"
-            "OBJECTIVE: Curate and present accessible, evidence-based resources to improve mental well-being.\n"
-            "CONTEXT:\n"
-            "- You specialize in identifying credible tools, techniques, and programs for laypeople.\n"
-            "- Your audience includes individuals seeking practical self-help options.\n"
-            "- Resources should be current, actionable, and diverse in approach.\n\n"
-            "[User]: TASK: List 4 high-quality resources or strategies for managing stress, tailored to the general public.\n\n"
-            "REQUIREMENTS:\n"
-            "- Each entry must include a name and a brief description (1-2 sentences).\n"
-            "- Include at least one digital tool (e.g., app or website) and one offline method.\n"
-            "- Ensure descriptions highlight how the resource helps with stress.\n\n"
-            "FORMAT:\n"
-            "- **Resource 1:** [Name] - [Description]\n"
-            "- **Resource 2:** [Name] - [Description]\n"
-            "- ...\n\n"
-            "SAMPLE ENTRY:\n"
-            "- **Resource 1:** Calm App - This mobile app offers guided meditations and breathing exercises to reduce stress and promote relaxation.\n"
-            "- **Resource 2:** Journaling - Writing daily thoughts and feelings helps process emotions, lowering stress levels over time.\n\n"
-            "Generate the resource list now. Provide only the formatted output."
-        )
-    ).with_inputs("crewai_prompt"),
-]
+# Built on first use rather than at import time
+@lru_cache(maxsize=None)
+def get_trainset() -> List[dspy.Example]:
+    return [
+        dspy.Example(
+            crewai_prompt=(
+                "[System]: You are a Market Opportunity Explorer for AI in Personalized Fitness and Nutrition Coaching.\n"
+                "A strategic thinker who collaborates with early-stage startups to uncover niche opportunities.\n"
+                "Experienced in using market signals, customer behavior, and unmet pain points to guide innovation.\n\n"
+                "Your personal goal is: Identify underserved needs, emerging demands, and untapped segments within "
+                "the AI in Personalized Fitness and Nutrition Coaching domain\n\n"
+                "To give my best complete final answer to the task respond using the exact following format:\n\n"
+                "Thought: I now can give a great answer.\n\n"
+                "[User]: Current Task: Identify gaps and emerging opportunities in the "
+                "AI in Personalized Fitness and Nutrition Coaching space using up-to-date 2025 data.\n\n"
+                "This is the expected criteria for your final answer: A list of 8-10 market gaps or opportunities with 1-2 lines of context each.\n\n"
+                "You MUST return the actual complete content as the final answer, not a summary.\n\n"
+                "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it! "
+            ),
+            dspy_improved_prompt=(
+                "[System]: ROLE: Market Opportunity Analyst\n"
+                "DOMAIN: AI for Personalized Fitness and Nutrition Coaching\n"
+                "OBJECTIVE: Identify strategic market gaps, emerging demands, and underserved segments.\n"
+                "CONTEXT:\n"
+                "- You are a domain expert who advises early-stage startups.\n"
+                "- You use behavioral trends, market signals, and customer pain points.\n"
+                "- Your output guides innovation and product strategy.\n"
+                "[User]: TASK: Generate a list of 8-10 specific market opportunities in the domain of AI for Personalized Fitness and Nutrition Coaching.\n\n"
+                "REQUIREMENTS:\n"
+                "- Each opportunity must include:\n"
+                "  • A clear, short title\n"
+                "  • 1-2 lines of explanation grounded in user behavior, trends, or unmet needs\n"
+                "- Avoid vague or overly general phrasing\n"
+                "- Do not summarize or give analysis before or after the list\n\n"
+                "FORMAT:\n"
+                "1. [Opportunity Title] - Contextual explanation\n"
+                "2. ...\n\n"
+                "EXAMPLES:\n"
+                "1. Personalized Menopause Coaching - A growing demand among middle-aged women for tailored fitness and nutrition plans that adapt to hormonal changes.\n"
+                "2. AI Meal Planning for Gut Health - Rising interest in gut microbiome optimization creates a need for personalized meal recommendations based on digestive data.\n\n"
+                "Begin your list now. Return only the structured output."
+            )
+        ).with_inputs("crewai_prompt"),
+
+        dspy.Example(
+            crewai_prompt=(
+                "[System]: You are a Cybersecurity Consultant for Small Businesses. Your goal is to help small businesses "
+                "with their cybersecurity needs. Your backstory: You're an expert who understands small business "
+                "challenges and how to keep their data safe.\n\n"
+                "To give my best complete final answer to the task respond using the exact following format:\n\n"
+                "Thought: I now can give a great answer.\n\n"
+                "[User]: Current Task: Advise a small business on common cybersecurity threats they face and how to protect themselves. "
+                "Your expected output is a list of three threats and simple solutions.\n\n"
+                "You MUST return the actual complete content as the final answer, not a summary.\n\n"
+                "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it! "
+            ),
+            dspy_improved_prompt=(
+                "[System]: **Consultant Profile:** Cybersecurity Specialist for Small & Medium Enterprises (SMEs).\n"
+                "**Core Mission:** Provide concise, actionable security guidance tailored for businesses with limited IT resources.\n"
+                "**Key Expertise:** Risk assessment, incident response planning, and practical security tool implementation.\n" 
+                "**Target Audience:** Non-technical business owners and staff requiring clear, understandable advice.\n\n"
+                "[User]: **Assignment:** Detail 4 common cybersecurity threats relevant to a typical small business, each with 2 practical mitigation steps.\n\n"
+                "**Output Directives:**\n"
+                "- Focus on immediately implementable and high-impact solutions.\n"
+                "- Ensure advice is current and avoids jargon.\n"
+                "- Present as a clear, numbered list.\n\n"
+                "**Format Example:**\n"
+                "1. **Threat:** [Threat Name]\n"
+                "   **Mitigation:** [Actionable Step 1]; [Actionable Step 2]\n\n"
+                "**Illustrative Entry:**\n"
+                "1. **Threat:** Phishing and Spear Phishing Attacks\n"
+                "   **Mitigation:** Conduct mandatory, regular employee training on identifying suspicious emails; Implement email gateway security with robust anti-phishing filters.\n\n"
+                "Generate the cybersecurity threat guide now. Only the formatted list should be returned."
+            )
+        ).with_inputs("crewai_prompt"),
+
+        dspy.Example(
+            crewai_prompt=(
+                "[System]: You are a Technology Risk Analyst whose goal is to look at new tech and find problems. "
+                "Your backstory is that you are good at spotting risks in new digital systems and you specialize in IoT devices. \n\n"
+                "To give my best complete final answer to the task respond using the exact following format:\n\n"
+                "Thought: I now can give a great answer.\n\n"
+                "[User]: Current Task: Identify security and privacy risks for deploying IoT in a smart home setting. "
+                "Expected output is a list of 3 risks.\n\n"
+                "This is the expected criteria for your final answer: Just a simple list of risks.\n\n"
+                "You MUST return the actual complete content as the final answer, not a summary.\n\n"
+                "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it! "
+            ),
+            dspy_improved_prompt=(
+                "[System]:\n"
+                "**Analyst Role:** IoT Security and Privacy Risk Assessment Specialist.\n"
+                "**Primary Objective:** Systematically identify and articulate potential vulnerabilities in nascent IoT deployments.\n"
+                "**Domain Expertise:** Comprehensive understanding of IoT device architecture, data flow, and emerging threat landscapes.\n"
+                "**Guiding Ethos:** Proactive identification and concise articulation of risks to enable robust mitigation strategies.\n\n"
+                "[User]:\n"
+                "**Task Directive:** Compile a list of 3 critical security and privacy risks associated with the deployment of Internet of Things (IoT) devices within a typical smart home environment.\n\n"
+                "**Content Specifications:**\n"
+                "- Each risk must be clearly named and explained in 2 sentences, highlighting the potential impact.\n"
+                "- Focus on risks inherent to consumer IoT devices and their interconnected nature.\n"
+                "- Categorize risks for clarity (e.g., Data Security, Device Vulnerabilities, Privacy Concerns).\n\n"
+                "**Expected Format:**\n"
+                "## IoT Smart Home Risk Assessment\n"
+                "\n"
+                "### [Risk Category 1]\n"
+                "- **[Risk Name 1]:** [Concise explanation of risk and impact]\n"
+                "- **[Risk Name 2]:** [Concise explanation of risk and impact]\n"
+                "\n"
+                "### [Risk Category 2]\n"
+                "- **[Risk Name 3]:** [Concise explanation of risk and impact]\n"
+                "\n"
+                "**Illustrative Entry:**\n"
+                "## IoT Smart Home Risk Assessment\n"
+                "\n"
+                "### Device Vulnerabilities\n"
+                "- **Weak Default Passwords:** Many IoT devices ship with easily guessable or hardcoded credentials, making them prime targets for unauthorized access and botnet recruitment.\n"
+                "- **Unpatched Firmware:** Manufacturers often fail to provide timely security updates, leaving devices vulnerable to known exploits long after discovery.\n\n"
+                "Generate the comprehensive risk assessment now. Provide only the markdown content, strictly adhering to the specified structure."
+            )
+        ).with_inputs("crewai_prompt"),
+    ]
+
+@lru_cache(maxsize=None)
+def get_devset() -> List[dspy.Example]:
+    return [
+        dspy.Example(
+            crewai_prompt=(
+                "[System]: You are a Climate Risk Analyst specializing in urban environments. Your expertise lies in using AI models "
+                "to evaluate environmental risks and guide decision-making for city planners.\n\n"
+                "To give my best complete final answer to the task respond using the exact following format:\n\n"
+                "Thought: I now can give a great answer.\n\n"
+                "[User]: Current Task: Use 2025 climate data to identify 3 climate-related risks "
+                "that should influence the design of a coastal urban infrastructure project.\n\n"
+                "This is the expected criteria for your final answer: A list of 5 specific climate risks with 1-2 lines of explanation each.\n\n"
+                "You MUST return the actual complete content as the final answer, not a summary.\n\n"
+                "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it!"
+            ),
+            dspy_improved_prompt=(
+                "[System]:\n"
+                "**Role:** Urban Climate Risk Analyst\n"
+                "**Objective:** Surface actionable climate risks affecting city infrastructure design in coastal areas.\n"
+                "**Domain:** AI-Driven Environmental Modeling\n\n"
+                "[User]:\n"
+                "**Task Directive:** List 5 critical climate risks that urban planners must consider when designing infrastructure for a coastal city.\n\n"
+                "**Requirements:**\n"
+                "- Each risk should be named clearly and briefly explained based on projected 2025 climate models.\n"
+                "- Focus on risks relevant to construction, public safety, and city sustainability.\n"
+                "- Do not include policy commentary or mitigation strategies.\n\n"
+                "**Format:**\n"
+                "1. [Risk Name] - [Short impact explanation]\n"
+                "2. ...\n\n"
+                "**Illustrative Entry:**\n"
+                "1. Sea Level Rise - Coastal flooding events are expected to increase in frequency and severity due to rising tides and extreme weather.\n"
+                "2. Heat Island Intensification - Dense urban areas will experience prolonged heat waves that strain public health and power systems.\n\n"
+                "Generate your list of climate risks now. Only return the structured markdown list."
+            )
+        ).with_inputs("crewai_prompt"),
+
+        dspy.Example(
+            crewai_prompt=(
+                "[System]: You are a Mental Health Resource Curator. Your goal is to find and share resources for people who need mental health support. "
+                "Your backstory: You are good at finding reliable info and tools.\n\n"
+                "To give my best complete final answer to the task respond using the exact following format:\n\n"
+                "Thought: I now can give a great answer.\n\n"
+                "[User]: Current Task: Provide resources for managing a specific mental health challenge. " # Generic task
+                "Expected output: A list of resources.\n\n"
+                "This is the expected criteria for your final answer: A list of resources for the specified challenge.\n\n"
+                "You MUST return the actual complete content as the final answer, not a summary.\n\n"
+                "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it! "
+            ),
+            dspy_improved_prompt=(
+                "[System]:\n"
+                "ROLE: Mental Wellness Resource Specialist\n"
+                "DOMAIN: Mental Health Support and Stress Management\n"
+                "OBJECTIVE: Curate and present accessible, evidence-based resources to improve mental well-being.\n"
+                "CONTEXT:\n"
+                "- You specialize in identifying credible tools, techniques, and programs for laypeople.\n"
+                "- Your audience includes individuals seeking practical self-help options.\n"
+                "- Resources should be current, actionable, and diverse in approach.\n\n"
+                "[User]: TASK: List 4 high-quality resources or strategies for managing stress, tailored to the general public.\n\n"
+                "REQUIREMENTS:\n"
+                "- Each entry must include a name and a brief description (1-2 sentences).\n"
+                "- Include at least one digital tool (e.g., app or website) and one offline method.\n"
+                "- Ensure descriptions highlight how the resource helps with stress.\n\n"
+                "FORMAT:\n"
+                "- **Resource 1:** [Name] - [Description]\n"
+                "- **Resource 2:** [Name] - [Description]\n"
+                "- ...\n\n"
+                "SAMPLE ENTRY:\n"
+                "- **Resource 1:** Calm App - This mobile app offers guided meditations and breathing exercises to reduce stress and promote relaxation.\n"
+                "- **Resource 2:** Journaling - Writing daily thoughts and feelings helps process emotions, lowering stress levels over time.\n\n"
+                "Generate the resource list now. Provide only the formatted output."
+            )
+        ).with_inputs("crewai_prompt"),
+    ]
 
 # --- Define an AI-Assisted Metric ---
 class AssessPromptImprovement(dspy.Signature):
@@ -256,8 +310,90 @@ class AssessPromptImprovement(dspy.Signature):
     assessment_question: str = dspy.InputField(desc="The specific question to evaluate the dspy improved prompt.")
     assessment_answer: bool = dspy.OutputField(desc="True if the improved prompt meets the criteria, False otherwise.")
 
+# Fused judge: returns the clarity and completeness verdicts from a single LM call,
+# so the raw, predicted and expected prompts are sent once per example instead of twice
+class AssessPromptImprovementFused(dspy.Signature):
+    """Assess the clarity and completeness of an improved prompt against an ideal expected prompt."""
+    assessed_raw_prompt: str = dspy.InputField(desc="The original crewai prompt before improvement.")
+    assessed_improved_prompt: str = dspy.InputField(desc="The prompt that was generated by the DSPy module based on the crewai prompt.")
+    expected_improved_prompt: str = dspy.InputField(desc="The ideal improved prompt for the same crewai prompt.")
+    clarity_answer: bool = dspy.OutputField(
+        desc="True if the improved prompt clarifies and structures the crewai prompt with effective formatting, headings "
+             "and clear instructions at least as well as the expected prompt, False otherwise."
+    )
+    completeness_answer: bool = dspy.OutputField(
+        desc="True if the improved prompt elaborates on the generic requirements of the crewai prompt with specific constraints, "
+             "clear formatting guidance and concrete examples as thoroughly as the expected prompt, False otherwise."
+    )
+
+# Judge mode for prompt_improvement_metric: "separate" asks the two assessment questions in two LM calls,
+# "fused" gets both verdicts from one call and halves judge traffic during compiles
+METRIC_MODE = os.getenv("DSPY_METRIC_MODE", "separate")
+
+# --- Persistent Judge Verdict Store ---
+
+# Optimizers re-score the same (raw prompt, predicted prompt, question) triples across trials and reruns,
+# so judge verdicts are kept on disk, separately from the generic dspy.LM cache. Set the path to "" to disable.
+JUDGE_VERDICT_STORE_FILE = os.getenv("DSPY_JUDGE_VERDICT_STORE", "judge_verdicts.sqlite")
+JUDGE_VERDICT_STORE_SIZE = int(os.getenv("DSPY_JUDGE_VERDICT_STORE_SIZE", "10000"))
+INLINE_WHITESPACE_PATTERN = re.compile(r"[ \t]+")
+
+class JudgeVerdictStore:
+    """Size-bounded SQLite store of judge verdicts, keyed by the normalized triple plus the judge model id."""
+
+    def __init__(self, path: str = JUDGE_VERDICT_STORE_FILE, maxsize: int = JUDGE_VERDICT_STORE_SIZE):
+        self.path = path
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(judge_model: str, raw_prompt: str, predicted_prompt: str, question: str) -> str:
+        # Runs of spaces and tabs (and trailing ones) should not cost a new judge call, but line breaks are kept:
+        # the clarity judge scores exactly the line and markdown structure of a candidate
+        normalized = "\x00".join("\n".join(INLINE_WHITESPACE_PATTERN.sub(" ", line).rstrip() for line in text.strip().splitlines())
+                                 for text in (judge_model, raw_prompt, predicted_prompt, question))
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened on first use; the metric is called from several evaluation threads
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, verdict TEXT NOT NULL, last_used REAL NOT NULL)")
+        return self._conn
+
+    def get(self, key: str):
+        if not self.path:
+            return None
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT verdict FROM verdicts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE verdicts SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, verdict) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO verdicts (key, verdict, last_used) VALUES (?, ?, ?)",
+                         (key, json.dumps(verdict), time.time()))
+            # Evict the least recently used verdicts once the store is over its size bound
+            conn.execute("DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                         (self.maxsize,))
+            conn.commit()
+
+judge_verdict_store = JudgeVerdictStore()
+
 # Define a metric function to evaluate the improved prompt
-def prompt_improvement_metric(example, pred, trace=None):
+def prompt_improvement_metric(example, pred, trace=None, mode=None):
     """
     Evaluates if the predicted improved prompt (pred.dspy_improved_prompt) effectively transforms
     the crewai prompt (example.crewai_prompt) into a high-quality, actionable, and well-structured prompt,
@@ -269,6 +405,22 @@ def prompt_improvement_metric(example, pred, trace=None):
     expected_improved_prompt = example.dspy_improved_prompt  # This is the gold standard dspy improved prompt from the training examples
     predicted_improved_prompt = pred.dspy_improved_prompt # This is the improved prompt generated by the DSPy module
 
+    # Fused mode: both criteria below are judged in a single LM call
+    if (mode or METRIC_MODE) == "fused":
+        verdict_key = judge_verdict_store.make_key(get_assess_lm().model, raw_prompt, predicted_improved_prompt,
+                                                   f"fused\n{expected_improved_prompt}")
+        verdicts = judge_verdict_store.get(verdict_key)
+        if verdicts is None:
+            with dspy.context(lm=get_assess_lm()):
+                fused_eval = dspy.Predict(AssessPromptImprovementFused)(
+                    assessed_raw_prompt=raw_prompt,
+                    assessed_improved_prompt=predicted_improved_prompt,
+                    expected_improved_prompt=expected_improved_prompt
+                )
+            verdicts = [bool(fused_eval.clarity_answer), bool(fused_eval.completeness_answer)]
+            judge_verdict_store.put(verdict_key, verdicts)
+        return sum(verdicts) == 2
+
     # Metric 1: Structural Integrity & Clarity
     # Does the generated improved prompt follow a clear, well-structured format
     # and is it easy to parse for the LLM, similar to the golden examples?
@@ -319,19 +471,25 @@ def prompt_improvement_metric(example, pred, trace=None):
     Respond with True or False.
     """
 
-    with dspy.context(lm=assess_lm):
-        clarity_eval = dspy.Predict(AssessPromptImprovement)(
-            assessed_raw_prompt=raw_prompt, # Pass raw_prompt for context
-            assessed_improved_prompt=predicted_improved_prompt,
-            assessment_question=q1
-        )
-        completeness_eval = dspy.Predict(AssessPromptImprovement)(
-            assessed_raw_prompt=raw_prompt, # Pass raw_prompt for context
-            assessed_improved_prompt=predicted_improved_prompt,
-            assessment_question=q2
-        )
+    def assess(question: str) -> bool:
+        # Reuse a stored verdict for this exact triple and judge model before paying for a new judge call
+        verdict_key = judge_verdict_store.make_key(get_assess_lm().model, raw_prompt, predicted_improved_prompt, question)
+        verdict = judge_verdict_store.get(verdict_key)
+        if verdict is None:
+            with dspy.context(lm=get_assess_lm()):
+                evaluation = dspy.Predict(AssessPromptImprovement)(
+                    assessed_raw_prompt=raw_prompt, # Pass raw_prompt for context
+                    assessed_improved_prompt=predicted_improved_prompt,
+                    assessment_question=question
+                )
+            verdict = bool(evaluation.assessment_answer)
+            judge_verdict_store.put(verdict_key, verdict)
+        return verdict
 
-    score = int(clarity_eval.assessment_answer) + int(completeness_eval.assessment_answer)
+    clarity_answer = assess(q1)
+    completeness_answer = assess(q2)
+
+    score = int(clarity_answer) + int(completeness_answer)
 
     # Based on the eval signature, the metric is set to return a bool, True/False for each example
     # Here, we can return True if both criteria for q1 and q2 are met.
@@ -341,21 +499,152 @@ def prompt_improvement_metric(example, pred, trace=None):
     return score == 2 # Return True if both criteria are met, False otherwise
 
 
-# --- Optimize with BootstrapFewShot ---
+# --- Parallel Dev-Set Evaluation ---
+
+# Number of dev examples scored at once, and how long one example (module call + judge calls) may take
+EVAL_NUM_THREADS = int(os.getenv("DSPY_EVAL_NUM_THREADS", "8"))
+EVAL_TIMEOUT_SECONDS = float(os.getenv("DSPY_EVAL_TIMEOUT_SECONDS", "300"))
+
+class LMCallCounter(BaseCallback):
+    """DSPy callback that counts the LM calls made while it is active."""
+
+    def __init__(self):
+        self.lm_calls = 0
+
+    def on_lm_start(self, call_id, instance, inputs):
+        self.lm_calls += 1
+
+# dspy.context settings are thread-local and never reach a plain worker thread, so the ones the caller scoped
+# (e.g. crewruntime's dspy.context(lm=...)) are captured on the calling thread and re-entered in every worker
+PROPAGATED_DSPY_SETTINGS = ("lm", "adapter", "callbacks")
+
+def capture_dspy_settings() -> Dict:
+    return {name: getattr(dspy.settings, name, None) for name in PROPAGATED_DSPY_SETTINGS}
+
+def evaluate_example(module: dspy.Module, index: int, example: dspy.Example, started_at: Dict[int, float],
+                     caller_settings: Dict) -> Dict:
+    """Scores one dev example under the caller's DSPy settings and records its wall time and LM call count."""
+    started_at[index] = time.perf_counter()
+    counter = LMCallCounter()
 
-# First we need to save the optimized module to avoid re-optimization every time we run with a new topic
-# Define the file path for saving the optimized module
-OPTIMIZED_MODULE_FILE = "optimized_prompt_module.json"
+    # The callback is added for this worker thread only, so the counts are per example
+    with dspy.context(**{**caller_settings, "callbacks": [*(caller_settings["callbacks"] or []), counter]}):
+        prediction = module(crewai_prompt=example.crewai_prompt)
+        score = prompt_improvement_metric(example, prediction)  # Use the same AI-assisted metric
+
+    return {
+        "index": index,
+        "score": float(score),
+        "wall_time": time.perf_counter() - started_at[index],
+        "lm_calls": counter.lm_calls,
+        "error": None,
+    }
+
+def evaluate_devset(module: dspy.Module, devset: List[dspy.Example], num_threads: int = EVAL_NUM_THREADS,
+                    timeout: float = EVAL_TIMEOUT_SECONDS) -> Dict:
+    """
+    Scores the devset on a thread pool and returns the average score plus per-example results.
+    Examples that fail or exceed the per-example timeout are scored 0 and reported with their error.
+    """
+    eval_start = time.perf_counter()
+    started_at = {}
+    results = {}
+
+    caller_settings = capture_dspy_settings()
+    executor = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix="dspy-eval")
+    futures = {executor.submit(evaluate_example, module, i, example, started_at, caller_settings): i
+               for i, example in enumerate(devset)}
+    pending = set(futures)
+
+    while pending:
+        done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                print(f"⚠️ Error evaluating dev example {index}: {e}")
+                results[index] = {"index": index, "score": 0.0, "wall_time": time.perf_counter() - started_at.get(index, eval_start),
+                                  "lm_calls": None, "error": repr(e)}
+
+        # A running example past its timeout is scored as a failure; its worker thread is left to finish on its own
+        now = time.perf_counter()
+        for future in list(pending):
+            index = futures[future]
+            if index in started_at and now - started_at[index] > timeout:
+                print(f"⏱️ Dev example {index} timed out after {timeout:g}s.")
+                results[index] = {"index": index, "score": 0.0, "wall_time": now - started_at[index],
+                                  "lm_calls": None, "error": "timeout"}
+                pending.discard(future)
+
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    ordered_results = [results[i] for i in range(len(devset))]
+    return {
+        "average_score": sum(r["score"] for r in ordered_results) / len(ordered_results) if ordered_results else 0.0,
+        "num_examples": len(ordered_results),
+        "num_errors": sum(1 for r in ordered_results if r["error"] is not None),
+        "wall_time": time.perf_counter() - eval_start,
+        "results": ordered_results,
+    }
+
+# --- Fingerprinted Optimized-Module Artifacts ---
+
+# First we need to save the optimized module to avoid re-optimization every time we run with a new topic.
+# Each artifact is named after a fingerprint of everything that shapes the compile (signature, trainset,
+# optimizer and its config, LM ids), so a matching artifact is reused instantly and a stale one never is.
+ARTIFACT_DIR = os.getenv("DSPY_ARTIFACT_DIR", "optimized_modules")
+
+def compute_artifact_fingerprint() -> str:
+    fingerprint_inputs = {
+        "signature": {
+            "instructions": ImprovePrompt.instructions,
+            "fields": {name: field.json_schema_extra for name, field in ImprovePrompt.fields.items()},
+        },
+        "trainset": [example.toDict() for example in get_trainset()],
+        "optimizer": {"class": BootstrapFewShot.__name__, "config": get_optimizer_config(), "metric_mode": METRIC_MODE},
+        "lms": {"main_task": MAIN_TASK_LM_MODEL, "assess": ASSESS_LM_MODEL},
+    }
+    serialized = json.dumps(fingerprint_inputs, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16]
+
+def get_optimized_module_file() -> str:
+    # Define the file path for saving the optimized module
+    return os.path.join(ARTIFACT_DIR, f"optimized_prompt_module-{compute_artifact_fingerprint()}.json")
+
+def save_optimized_module(module: dspy.Module) -> str:
+    """Saves the module under its fingerprinted path, with a small manifest describing what was compiled."""
+    os.makedirs(ARTIFACT_DIR, exist_ok=True)
+    module_file = get_optimized_module_file()
+    module.save(module_file)
+
+    manifest = {
+        "fingerprint": compute_artifact_fingerprint(),
+        "optimizer": BootstrapFewShot.__name__,
+        "optimizer_config": get_optimizer_config(),
+        "metric_mode": METRIC_MODE,
+        "trainset_size": len(get_trainset()),
+        "lms": {"main_task": MAIN_TASK_LM_MODEL, "assess": ASSESS_LM_MODEL},
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(module_file.replace(".json", ".manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return module_file
+
+# --- Optimize with BootstrapFewShot ---
 
 # Import the BootstrapFewShot optimizer
 from dspy.teleprompt import BootstrapFewShot
 
+def get_optimizer_config() -> Dict:
+    return dict(max_labeled_demos=3)  # Limit to 3 labeled demos for bootstrapping
+
 def optimize_and_get_module_bootstrap():
     """
     Optimizes the PromptOptimizerModule using BootstrapFewShot,
     saves it, and returns the optimized module.
     """
-    config = dict(max_labeled_demos=3)  # Limit to 3 labeled demos for bootstrapping
+    config = get_optimizer_config()
     teleprompter = BootstrapFewShot(
         metric=prompt_improvement_metric,
         **config,  # Unpack the configuration dictionary
@@ -364,109 +653,373 @@ def optimize_and_get_module_bootstrap():
     print("\n🚀 Starting BootstrapFewShot optimization for prompt improvement...")
     optimized_module_result = teleprompter.compile( # <--- This returns the optimized module
         basic_prompt_module, # <--- This is the starting point for optimization
-        trainset=trainset # this is the training examples we provided
+        trainset=get_trainset() # this is the training examples we provided
     )
     print("✅ Module optimized with BootstrapFewShot.")
 
     # Save the optimized module
-    optimized_module_result.save(OPTIMIZED_MODULE_FILE)
-    print(f"💾 Optimized module saved to: {OPTIMIZED_MODULE_FILE}")
+    module_file = save_optimized_module(optimized_module_result)
+    print(f"💾 Optimized module saved to: {module_file}")
 
 
     # Evaluate on dev set
-    dev_scores = []
-    for example in devset:
-        prediction = optimized_module_result(crewai_prompt=example.crewai_prompt)
-        score = prompt_improvement_metric(example, prediction)  # Use the same AI-assisted metric
-        dev_scores.append(score)
+    evaluation = evaluate_devset(optimized_module_result, get_devset())
+    for result in evaluation["results"]:
+        print(f"   Dev example {result['index']}: score={result['score']:.0f}, {result['wall_time']:.1f}s, "
+              f"{result['lm_calls']} LM calls" + (f", error={result['error']}" if result["error"] else ""))
+    print(f"📊 Evaluated {evaluation['num_examples']} dev examples in {evaluation['wall_time']:.1f}s ({evaluation['num_errors']} errors)")
 
-    avg_dev_score = sum(dev_scores) / len(dev_scores)
+    avg_dev_score = evaluation["average_score"]
+    print(f"⚖️ Judge verdict store: {judge_verdict_store.hits} hits, {judge_verdict_store.misses} misses")
     print(f"\nAverage dev score (BootstrapFewShot AI feedback metric): {avg_dev_score:.2f}")
 
     return optimized_module_result
 
-# --- CrewAI Monkey Patch with Optimized DSPy Module ---
-
-# Store the original method once
-_original_llm_call = crewai.llm.LLM.call
-
-def create_patched_llm_call_function(optimized_dspy_module: dspy.Module) -> Callable:
-    def patched_llm_call_inner(self, messages: Union[str, List[Dict[str, str]]], *args, **kwargs):
-        # Ensure messages is a list of dicts.
-        if isinstance(messages, str):
-            messages = [{"role": "user", "content": messages}]
-
-        # Print messages BEFORE DSPy optimization
-        print("\n🟦 [Monkey Patch] Messges before DSPy Optimization:")
-        print("=" * 60)
-        for msg in messages:
-            print(f"[{msg.get('role', 'user')}] {msg.get('content', '')}")
-        print("=" * 60)
-
-        optimized_messages = []
-        for msg in messages:
-            try:
-                # Use the optimized_dspy_module captured by the closure.
-                # Here, we pass the ENTIRE message content (system or/and user) to DSPy for optimization.
-                improved = optimized_dspy_module(crewai_prompt=msg["content"])
-                improved_content = improved.dspy_improved_prompt.strip()
-                optimized_messages.append({"role": msg["role"], "content": improved_content})
-            except Exception as e:
-                print(f"⚠️ Error optimizing message with DSPy: {e}. Keeping original content for role '{msg.get('role')}'.")
-                optimized_messages.append(msg)
-
-        # Print messages AFTER DSPy optimization
-        print("\n🟦 [Monkey Patch] Improved Prompt Sent to LLM after DSPy Optimization:")
-        print("=" * 60)
-        for msg in optimized_messages:
-            print(f"[{msg.get('role', 'user')}] {msg.get('content', '')}")
-        print("=" * 60)
+# --- Interceptor Token and Latency Accounting ---
 
-        # Call the original LLM.call method, ensuring 'self' remains the original CrewAI LLM instance
-        return _original_llm_call(self, optimized_messages, *args, **kwargs)
-    return patched_llm_call_inner
+# Every patched LLM.call records its token estimates, rewrite and downstream latency and cache status into a
+# RewriteStats (crewcommon.interceptor, shared with the other crews so the metric names match).
+CREW_NAME = "crewaibootstrap"
 
 # --- Global Cache ---
 optimized_module = None
+rewrite_cache = RewriteCache()
+boilerplate_normalizer = BoilerplateNormalizer() if REWRITE_NORMALIZE else None
+near_duplicate_index = NearDuplicateIndex() if NEAR_DUP_ENABLED else None
 
-def run():
+def get_optimized_module(main_task_lm: Optional[dspy.LM] = None) -> dspy.Module:
+    """
+    Loads (or compiles) the optimized module once per process. This crew's own entry points leave main_task_lm unset
+    and configure DSPy globally; crewruntime passes its LM, which is only scoped to the load or compile.
+    """
     global optimized_module # Declare intent to modify the global variable
 
+    if main_task_lm is None:
+        main_task_lm = configure_dspy() # Make sure DSPy is configured before the module is loaded or used
+
     # This block ensures optimized_module is set once, either by loading or optimizing
     if optimized_module is None: # Check if it's already set from a previous call in the same session
         print("⚙️ Optimizing or loading DSPy module...")
-        if os.path.exists(OPTIMIZED_MODULE_FILE):
-            print(f"📦 Loading optimized module from {OPTIMIZED_MODULE_FILE}...")
-            # Instantiate the module type *before* loading
-            temp_module = PromptOptimizerModule()
-            temp_module.load(OPTIMIZED_MODULE_FILE)
-            optimized_module = temp_module # Assign the loaded module to the global variable
-        else:
-            optimized_module = optimize_and_get_module_bootstrap() # This function also saves the module
+        module_file = get_optimized_module_file()
+        with dspy.context(lm=main_task_lm):
+            if os.path.exists(module_file):
+                print(f"📦 Loading optimized module from {module_file}...")
+                # Instantiate the module type *before* loading
+                temp_module = PromptOptimizerModule()
+                temp_module.load(module_file)
+                optimized_module = temp_module # Assign the loaded module to the global variable
+            else:
+                print(f"🔁 No artifact matches fingerprint {compute_artifact_fingerprint()}, recompiling...")
+                optimized_module = optimize_and_get_module_bootstrap() # This function also saves the module
     else:
         print("✅ Reusing cached DSPy module...") # This message happens if run() is called multiple times in one script execution
+    return optimized_module
 
-    # Define inputs BEFORE the print statement that uses it
-    inputs = {
-        "topic": "Kenyan couple going to Netherlands for 5 days"  # Change as needed for your tests
-    }
+# Default inputs for run/train/replay/test
+DEFAULT_INPUTS = {
+    "topic": "Kenyan couple going to Netherlands for 5 days"  # Change as needed for your tests
+}
 
-    # Now, `optimized_module` should definitively hold the loaded/optimized module before this print statement.
-    is_optimized_applied = (optimized_module is not None)
-    print(f"\n🚀 Kicking off CrewAI with topic: {inputs['topic']} (using {'optimized' if is_optimized_applied else 'original'} prompts)...")
+def install_interceptor(optimized_module: dspy.Module) -> Tuple[AgentTemplateStore, RewriteStats]:
+    """Patches LLM.call with the sync interceptor and returns the template store and stats for this crew run."""
+    # Agent templates are rewritten once per crew run, and the interceptor stats cover this run only
+    agent_templates = AgentTemplateStore()
+    rewrite_stats = RewriteStats(CREW_NAME)
+    custom_patched_llm_call = create_patched_llm_call_function(optimized_module, rewrite_cache, template_store=agent_templates,
+                                                               normalizer=boilerplate_normalizer, stats=rewrite_stats,
+                                                               policy=get_rewrite_policy(), static_templates=get_static_templates(),
+                                                               near_duplicates=near_duplicate_index)
+    patch_llm_call(custom_patched_llm_call)
+    return agent_templates, rewrite_stats
 
+def report_run_stats(agent_templates: Optional[AgentTemplateStore], rewrite_stats: RewriteStats) -> None:
+    # agent_templates is None when the crew ran from the pre-optimized YAML and nothing was rewritten
+    if agent_templates is not None:
+        stats = rewrite_cache.stats()
+        print(f"\n🗃️ Rewrite cache totals: {stats['hits']} hits, {stats['misses']} misses")
+        template_stats = agent_templates.stats()
+        print(f"🧩 Agent templates: {template_stats['rewritten']} rewritten, {template_stats['reused']} reused across {template_stats['agents']} agents")
+        if boilerplate_normalizer is not None:
+            normalizer_stats = boilerplate_normalizer.stats()
+            print(f"✂️ Boilerplate normalizer: ~{normalizer_stats['tokens_saved']} tokens saved across {normalizer_stats['messages']} messages")
+        print_rewrite_policy_stats(get_rewrite_policy())
+        print_static_template_stats(get_static_templates())
+        print_near_duplicate_stats(near_duplicate_index)
+    print_http_pool_stats(get_http_pool())
 
-    custom_patched_llm_call = create_patched_llm_call_function(optimized_module)
-    crewai.llm.LLM.call = custom_patched_llm_call
+    print_rewrite_stats_summary(rewrite_stats)
+    write_rewrite_stats(rewrite_stats)
 
+def create_crew():
     from src.crewaibootstrap.crew import BootStrapCrew
-    crew_instance = BootStrapCrew()
+    return BootStrapCrew()
 
-    result = crew_instance.crew().kickoff(inputs=inputs)
+def intercept_crew_run(crew_instance) -> Tuple[RewriteStats, Callable[[], None]]:
+    """Installs the sync interceptor for one crew run and returns its stats and the end-of-run report."""
+    if crew_instance.optimized_config_dir is not None:
+        # A crew loaded from the pre-optimized YAML already carries the DSPy rewrites, so its calls are only counted
+        rewrite_stats = RewriteStats(CREW_NAME)
+        print(f"📁 CREW_OPTIMIZED_CONFIG=1: using {crew_instance.optimized_config_dir}, the DSPy interceptor only counts calls.")
+        patch_llm_call(create_counting_llm_call(rewrite_stats))
+        return rewrite_stats, lambda: report_run_stats(None, rewrite_stats)
+
+    get_rewrite_policy() # Fail on a bad DSPY_REWRITE_POLICY before the module is loaded or compiled
+    agent_templates, rewrite_stats = install_interceptor(get_optimized_module())
+    return rewrite_stats, lambda: report_run_stats(agent_templates, rewrite_stats)
+
+def run():
+    # Define inputs BEFORE the print statement that uses it
+    inputs = dict(DEFAULT_INPUTS)
+
+    crew_instance = create_crew()
+    _, report = intercept_crew_run(crew_instance)
+    if crew_instance.optimized_config_dir is not None:
+        print(f"\n🚀 Kicking off CrewAI with topic: {inputs['topic']} (using pre-optimized config from {crew_instance.optimized_config_dir})...")
+    else:
+        print(f"\n🚀 Kicking off CrewAI with topic: {inputs['topic']} (using optimized prompts)...")
+
+    crew = crew_instance.crew()
+    if task_output_streamer is not None:
+        task_output_streamer.attach(crew)
+
+    result = crew.kickoff(inputs=inputs)
 
     print("\n✅ Final Result:")
     print(result)
+
+    report()
+    commands.save_task_outputs(result, inputs)
     return result
 
+def install_async_interceptor(rewrite_stats: RewriteStats) -> Optional[dspy.Module]:
+    """
+    Patches LLM.call with the async interceptor bridged onto the running loop and returns the shared optimized module.
+    Crews loaded from the pre-optimized YAML already carry the rewrites, so their calls are only counted (returns None).
+    """
+    if create_crew().optimized_config_dir is not None:
+        patch_llm_call(create_counting_llm_call(rewrite_stats))
+        return None
+
+    get_rewrite_policy() # Fail on a bad DSPY_REWRITE_POLICY before the module is loaded or compiled
+    optimized_module = get_optimized_module()
+
+    # One template store for the batch; each kickoff has its own agents and LLM instances, so templates stay per run
+    patched_llm_acall = create_async_patched_llm_call_function(optimized_module, rewrite_cache, template_store=AgentTemplateStore(),
+                                                               normalizer=boilerplate_normalizer, stats=rewrite_stats,
+                                                               policy=get_rewrite_policy(), static_templates=get_static_templates(),
+                                                               near_duplicates=near_duplicate_index)
+    patch_llm_call(bridge_async_llm_call(patched_llm_acall, asyncio.get_running_loop()))
+    return optimized_module
+
+async def kickoff_crews_async(inputs_list: List[Dict[str, str]]) -> List:
+    """
+    Kicks off one crew per inputs dict with kickoff_async. All kickoffs share the running event loop,
+    so rewrites and downstream LLM calls from different crews overlap instead of queueing.
+    """
+    rewrite_stats = RewriteStats(CREW_NAME)
+    install_async_interceptor(rewrite_stats)
+
+    from src.crewaibootstrap.crew import BootStrapCrew
+
+    # Each kickoff gets its own crew instance so agent and task state is never shared between runs
+    results = await asyncio.gather(*(BootStrapCrew().crew().kickoff_async(inputs=inputs) for inputs in inputs_list))
+
+    print_rewrite_stats_summary(rewrite_stats)
+    write_rewrite_stats(rewrite_stats)
+    return results
+
+def run_async():
+    inputs_list = [
+        {"topic": "Kenyan couple going to Netherlands for 5 days"}, # Change as needed for your tests
+        {"topic": "Kenyan family going to Japan for 7 days"},
+    ]
+
+    print(f"\n🚀 Kicking off {len(inputs_list)} CrewAI runs concurrently on one event loop...")
+    results = asyncio.run(kickoff_crews_async(inputs_list))
+
+    for inputs, result in zip(inputs_list, results):
+        print(f"\n✅ Final Result for topic: {inputs['topic']}")
+        print(result)
+    return results
+
+# --- Batch Kickoff and Train / Replay / Test ---
+
+async def kickoff_batch_async(topics: List[str], concurrency: int, output) -> List[Dict]:
+    """
+    Kicks off one crew per topic with at most `concurrency` crews in flight.
+    The optimized module, rewrite cache and interceptor are set up once and shared by every kickoff.
+    """
+    rewrite_stats = RewriteStats(CREW_NAME)
+    install_async_interceptor(rewrite_stats)
+
+    # Each topic gets its own crew instance so agent and task state is never shared between runs
+    records = await kickoff_topics_async(topics, concurrency, output, CREW_NAME,
+                                         lambda topic: create_crew().crew().kickoff_async(inputs={**DEFAULT_INPUTS, "topic": topic}))
+
+    print_rewrite_stats_summary(rewrite_stats)
+    write_rewrite_stats(rewrite_stats)
+    return records
+
+commands = CrewCommands(CREW_NAME, create_crew, default_inputs=lambda: dict(DEFAULT_INPUTS), intercept=intercept_crew_run,
+                        kickoff_batch=lambda topics, concurrency, output: asyncio.run(kickoff_batch_async(topics, concurrency, output)))
+
+# Console scripts (see pyproject.toml)
+run_batch = commands.run_batch
+train = commands.train
+replay = commands.replay
+test = commands.test
+
+# --- Static Template Compile ---
+
+def capture_prompt_templates(inputs: Dict) -> List[Tuple[str, List[str]]]:
+    """
+    Kicks off the crew with LLM.call replaced by a recorder that answers every call with a canned final answer,
+    so CrewAI builds each agent's and task's first-turn prompt without a single LLM call. Returns them in template form.
+    """
+    captured = {}
+
+    def recording_llm_call(self, messages: Union[str, List[Dict[str, str]]], *args, **kwargs):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        for msg, context in zip(messages, build_message_contexts(messages, kwargs)):
+            if context["turn"] != 0:
+                continue
+            # Split the same way the interceptor does, so the captured parts are exactly what it looks up
+            for part in split_agent_template(msg):
+                if part and TASK_CONTEXT_MARKER not in part:
+                    template, placeholders = to_placeholder_form(part, context["inputs"])
+                    captured[template] = placeholders
+        return CAPTURE_FINAL_ANSWER
+
+    _original_llm_call = get_original_llm_call()
+    patch_llm_call(recording_llm_call)
+    try:
+        from src.crewaibootstrap.crew import BootStrapCrew
+        # Static templates serve the interceptor, which only runs on the original YAML
+        crew = BootStrapCrew(use_optimized_config=False).crew()
+        for task in crew.tasks:
+            task.output_file = None # Don't overwrite the real reports with canned answers
+        crew.kickoff(inputs=inputs)
+    finally:
+        patch_llm_call(_original_llm_call)
+    return list(captured.items())
+
+def compile_templates():
+    optimized_module = get_optimized_module()
+    inputs = dict(DEFAULT_INPUTS)
+
+    print(f"\n📸 Capturing first-turn prompt templates with topic: {inputs['topic']}...")
+    templates = capture_prompt_templates(inputs)
+    print(f"📸 Captured {len(templates)} templates.")
+
+    store = get_static_templates() or StaticTemplateStore()
+    counts = store.compile(optimized_module, templates, normalizer=boilerplate_normalizer)
+    print(f"🧊 Static templates: {counts['compiled']} compiled, {counts['reused']} already compiled, "
+          f"{counts['rejected']} rejected (rewrite dropped a placeholder) → {store.path}")
+    return counts
+
+# --- Optimized YAML Config Variants ---
+
+# Bakes the DSPy rewrites into copies of agents.yaml/tasks.yaml under config/optimized/<artifact fingerprint>/. Crews
+# load the current variant when CREW_OPTIMIZED_CONFIG=1 (it is opt-in) and then only count their LLM calls.
+CREW_CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config")
+CONFIG_PLACEHOLDER_PATTERN = re.compile(r"\{([A-Za-z_][A-Za-z0-9_\-]*)\}") # The pattern CrewAI interpolates inputs with
+
+# The fields of each entry that are rewritten, each one on its own. CrewAI still assembles the prompt from role, goal,
+# backstory, description and expected_output, so a field must hold only its own (optimized) text.
+OPTIMIZED_CONFIG_FIELDS = {
+    "agents.yaml": ["goal", "backstory"],
+    "tasks.yaml": ["description", "expected_output"],
+}
+
+def write_config_yaml(config: Dict, path: str) -> None:
+    import yaml
+
+    # Multi-line strings are written as literal blocks, so the optimized YAML stays as readable as the original
+    class BlockStyleDumper(yaml.SafeDumper):
+        pass
+    BlockStyleDumper.add_representer(str, lambda dumper, value: dumper.represent_scalar(
+        "tag:yaml.org,2002:str", value, style="|" if "\n" in value else None))
+
+    with open(f"{path}.tmp", "w") as f:
+        yaml.dump(config, f, Dumper=BlockStyleDumper, sort_keys=False, allow_unicode=True, width=120)
+    os.replace(f"{path}.tmp", path)
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+# The module was trained on whole "[System]: ... [User]: ..." prompts, so given one field it may answer with a whole
+# structured prompt; such a rewrite (or one that grows far past the field) would be pasted into a single YAML field
+CONFIG_ROLE_MARKER_PATTERN = re.compile(r"\[(?:System|User|Assistant)\]:|^(?:Current Task|Thought|Final Answer):", re.IGNORECASE | re.MULTILINE)
+CONFIG_FIELD_MAX_GROWTH = float(os.getenv("DSPY_CONFIG_FIELD_MAX_GROWTH", "3"))
+CONFIG_FIELD_GROWTH_SLACK = 200 # Characters a short field may always grow by
+
+def rewrite_config_field(module: dspy.Module, original: str) -> Tuple[str, Optional[str]]:
+    """
+    Returns the rewritten field, or the original with the reason it was kept. The rewrite must be field text only (no
+    role markers, no more than CONFIG_FIELD_MAX_GROWTH times as long) and keep every {placeholder} of the original
+    and add none, since CrewAI fails on interpolation variables it has no input for.
+    """
+    rewritten = module(crewai_prompt=original.strip()).dspy_improved_prompt.strip()
+    marker = CONFIG_ROLE_MARKER_PATTERN.search(rewritten)
+    if marker is not None and not CONFIG_ROLE_MARKER_PATTERN.search(original):
+        return original, f"whole prompt instead of a field ({marker.group(0)!r})"
+    if len(rewritten) > CONFIG_FIELD_MAX_GROWTH * len(original.strip()) + CONFIG_FIELD_GROWTH_SLACK:
+        return original, f"grew from {len(original.strip())} to {len(rewritten)} characters"
+    original_placeholders = set(CONFIG_PLACEHOLDER_PATTERN.findall(original))
+    rewritten_placeholders = set(CONFIG_PLACEHOLDER_PATTERN.findall(rewritten))
+    if original_placeholders - rewritten_placeholders:
+        return original, f"dropped placeholders {sorted(original_placeholders - rewritten_placeholders)}"
+    if rewritten_placeholders - original_placeholders:
+        return original, f"added placeholders {sorted(rewritten_placeholders - original_placeholders)}"
+    return rewritten + "\n", None
+
+def build_optimized_config():
+    import argparse
+    import yaml
+
+    parser = argparse.ArgumentParser(prog="build_optimized_config", description="Write DSPy-optimized variants of the crew's agents.yaml and tasks.yaml.")
+    parser.add_argument("--config-dir", default=CREW_CONFIG_DIR,
+                        help="Config directory to optimize (another crew's, e.g. vanillacrewai's, works too)")
+    args = parser.parse_args(sys.argv[1:])
+
+    optimized_module = get_optimized_module()
+    version = compute_artifact_fingerprint()
+    output_dir = os.path.join(args.config_dir, "optimized", version)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {"version": version, "optimizer_artifact": get_optimized_module_file(), "sources": {}, "kept_original": {},
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    print(f"\n🏗️ Building optimized config {version} from {args.config_dir}...")
+    for filename, fields in OPTIMIZED_CONFIG_FIELDS.items():
+        source_path = os.path.join(args.config_dir, filename)
+        with open(source_path) as f:
+            config = yaml.safe_load(f) or {}
+        manifest["sources"][filename] = file_sha256(source_path)
+
+        for name, entry in config.items():
+            for field in fields:
+                if not entry.get(field):
+                    continue
+                entry[field], reason = rewrite_config_field(optimized_module, entry[field])
+                if reason:
+                    manifest["kept_original"][f"{filename}:{name}.{field}"] = reason
+                    print(f"⚠️ Kept the original {name}.{field}: the rewrite {reason}.")
+                else:
+                    print(f"✅ Optimized {name}.{field}")
+
+        write_config_yaml(config, os.path.join(output_dir, filename))
+
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    # The crews load whichever version "current" names, unless CREW_OPTIMIZED_CONFIG_VERSION pins another one
+    current_path = os.path.join(args.config_dir, "optimized", "current")
+    with open(f"{current_path}.tmp", "w") as f:
+        f.write(version + "\n")
+    os.replace(f"{current_path}.tmp", current_path)
+    print(f"📁 Optimized config written to {output_dir} (now current). Set CREW_OPTIMIZED_CONFIG=1 to run the crews from it.")
+    return output_dir
+
 if __name__ == "__main__":
     run()
\ No newline at end of file
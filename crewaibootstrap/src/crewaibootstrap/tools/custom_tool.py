@@ -1,19 +1,9 @@
-from crewai.tools import BaseTool
-from typing import Type
-from pydantic import BaseModel, Field
+from pathlib import Path
 
+from crewcommon.knowledge_search import KnowledgeSearchTool as SharedKnowledgeSearchTool
 
-class MyCustomToolInput(BaseModel):
-    """Input schema for MyCustomTool."""
-    argument: str = Field(..., description="Description of the argument.")
+# The project root holds knowledge/ and the markdown reports the crew writes on each run
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
 
-class MyCustomTool(BaseTool):
-    name: str = "Name of my tool"
-    description: str = (
-        "Clear description for what this tool is useful for, your agent will need this information to use it."
-    )
-    args_schema: Type[BaseModel] = MyCustomToolInput
-
-    def _run(self, argument: str) -> str:
-        # Implementation goes here
-        return "this is an example of a tool output, ignore it and move along."
+class KnowledgeSearchTool(SharedKnowledgeSearchTool):
+    project_root: str = str(PROJECT_ROOT)
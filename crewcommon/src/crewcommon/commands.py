@@ -0,0 +1,282 @@
+# --- Batch Kickoff and Train / Replay / Test Commands ---
+
+# run_batch, train, replay and test work the same way for every crew. Only three things differ per crew: how
+# the crew is created, its default inputs and the interceptor around its LLM calls. Each main builds one
+# CrewCommands from those and exposes its methods under the script names in its pyproject.toml.
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from crewcommon.interceptor import RewriteStats
+from crewcommon.streaming import task_output_streamer
+
+BATCH_CONCURRENCY = int(os.getenv("CREW_BATCH_CONCURRENCY", "4"))
+BATCH_OUTPUT = os.getenv("CREW_BATCH_OUTPUT", "batch_results.jsonl")
+TASK_OUTPUTS_FILE = os.getenv("CREW_TASK_OUTPUTS", "task_outputs.json")
+TEST_ITERATIONS = int(os.getenv("CREW_TEST_ITERATIONS", "3"))
+TEST_STATS_JSON = os.getenv("CREW_TEST_STATS_JSON", "test_stats.json")
+
+# Installs the interceptor for a crew instance and returns the stats it records into and the end-of-run report
+Intercept = Callable[[object], Tuple[RewriteStats, Callable[[], None]]]
+
+def read_topics(source: str) -> List[str]:
+    """Reads one topic per line from a file, or from stdin when source is "-". Blank lines and # comments are skipped."""
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+
+async def kickoff_topics_async(topics: List[str], concurrency: int, output, crew_name: str,
+                               kickoff: Callable[[str], Awaitable]) -> List[Dict]:
+    """
+    Awaits kickoff(topic) for every topic with at most `concurrency` in flight.
+    Each finished topic is written to `output` as one JSON line as soon as it completes.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    batch_start = time.perf_counter()
+
+    async def kickoff_topic(index: int, topic: str) -> Dict:
+        async with semaphore:
+            queued_seconds = time.perf_counter() - batch_start
+            record = {"index": index, "topic": topic, "crew": crew_name}
+            start = time.perf_counter()
+            try:
+                result = await kickoff(topic)
+                record.update(status="ok", result=str(result))
+            except Exception as e:
+                record.update(status="error", error=f"{type(e).__name__}: {e}")
+            record.update(queued_seconds=round(queued_seconds, 4), seconds=round(time.perf_counter() - start, 4))
+        # Records are written from the event loop thread, so lines never interleave
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+        print(f"{'✅' if record['status'] == 'ok' else '❌'} [{index + 1}/{len(topics)}] {topic} ({record['seconds']:.2f}s)")
+        return record
+
+    return list(await asyncio.gather(*(kickoff_topic(index, topic) for index, topic in enumerate(topics))))
+
+def replay_from_task(crew, start_index: int, saved: Dict):
+    """
+    Re-executes crew.tasks[start_index:], with the saved outputs of the earlier tasks standing in for their runs.
+    This takes the same steps as Crew.replay, but reads outputs keyed by task name from our file
+    instead of CrewAI's task-id store, which only ever holds the last kickoff.
+    """
+    from crewai.tasks.output_format import OutputFormat
+    from crewai.tasks.task_output import TaskOutput
+
+    inputs = saved["inputs"]
+    crew._inputs = inputs
+    crew._interpolate_inputs(inputs)
+    for task in crew.tasks[:start_index]:
+        entry = saved["tasks"][task.name]
+        task.output = TaskOutput(name=task.name, description=task.description, agent=entry["agent"], raw=entry["raw"],
+                                 summary=entry.get("summary"), output_format=OutputFormat(entry.get("output_format", "raw")))
+    return crew._execute_tasks(crew.tasks, start_index, True)
+
+def positive_int(value: str) -> int:
+    # argparse type for iteration counts: 0 or fewer iterations would leave nothing to train on or summarize
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def summarize_test_iterations(iterations: List[Dict]) -> Dict:
+    summary = {}
+    for field in ("seconds", "total_tokens", "prompt_tokens", "completion_tokens", "llm_requests"):
+        values = sorted(iteration[field] for iteration in iterations)
+        summary[field] = {
+            "mean": sum(values) / len(values),
+            "min": values[0],
+            "p50": values[len(values) // 2],
+            "max": values[-1],
+        }
+    return summary
+
+class CrewCommands:
+    """The run_batch, train, replay and test console scripts of one crew."""
+
+    def __init__(self, crew_name: str, create_crew: Callable[[], object], default_inputs: Callable[[], Dict],
+                 intercept: Intercept, kickoff_batch: Optional[Callable[[List[str], int, object], List[Dict]]] = None):
+        self.crew_name = crew_name
+        self.create_crew = create_crew # Returns a new @CrewBase instance; the crew module is imported on first use
+        self.default_inputs = default_inputs
+        self.intercept = intercept
+        self.kickoff_batch = kickoff_batch or self.kickoff_batch_in_threads
+
+    def topic_inputs(self, topic: str) -> Dict:
+        return {**self.default_inputs(), "topic": topic}
+
+    def load_task_outputs(self, path: str = TASK_OUTPUTS_FILE) -> Dict:
+        if not os.path.exists(path):
+            return {"crew": self.crew_name, "inputs": {}, "tasks": {}}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_task_outputs(self, result, inputs: Dict, path: str = TASK_OUTPUTS_FILE, saved: Optional[Dict] = None) -> None:
+        """
+        Persists each task's output under its task name, so replay() can resume from any later task.
+        A fresh run replaces the file; a replay passes the loaded outputs in `saved` and only overwrites the tasks it re-ran.
+        """
+        saved = saved if saved is not None else {"crew": self.crew_name, "inputs": inputs, "tasks": {}}
+        for task_output in result.tasks_output:
+            output_format = getattr(task_output, "output_format", "raw")
+            saved["tasks"][task_output.name] = {
+                "agent": task_output.agent,
+                "raw": task_output.raw,
+                "summary": task_output.summary,
+                "output_format": getattr(output_format, "value", output_format),
+                "saved_at": time.time(),
+            }
+
+        # Written to a temp file and renamed, so an interrupted run never leaves a truncated file behind
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=2, default=str)
+        os.replace(f"{path}.tmp", path)
+        print(f"💾 Task outputs saved to {path}")
+
+    def kickoff_batch_in_threads(self, topics: List[str], concurrency: int, output) -> List[Dict]:
+        # kickoff_async runs each kickoff in a worker thread, behind the same sync interceptor run() uses
+        rewrite_stats, report = self.intercept(self.create_crew())
+        records = asyncio.run(kickoff_topics_async(
+            topics, concurrency, output, self.crew_name,
+            # Each topic gets its own crew instance so agent and task state is never shared between runs
+            lambda topic: self.create_crew().crew().kickoff_async(inputs=self.topic_inputs(topic))))
+        report()
+        return records
+
+    def run_batch(self):
+        """
+        Usage: run_batch [TOPICS_FILE|-] [--concurrency N] [--output FILE|-]
+        Reads one topic per line (stdin by default) and writes per-topic results and timings as JSONL.
+        """
+        parser = argparse.ArgumentParser(prog="run_batch", description="Kick off one crew per topic with bounded concurrency.")
+        parser.add_argument("topics", nargs="?", default="-", help="File with one topic per line, or - for stdin")
+        parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Maximum crews in flight")
+        parser.add_argument("--output", default=BATCH_OUTPUT, help="JSONL results file, or - for stdout")
+        args = parser.parse_args(sys.argv[1:])
+
+        topics = read_topics(args.topics)
+        if not topics:
+            print("⚠️ No topics to run.")
+            return []
+        concurrency = max(1, args.concurrency)
+
+        print(f"\n🚀 Kicking off {len(topics)} {self.crew_name} runs, at most {concurrency} at a time...")
+        batch_start = time.perf_counter()
+        output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            records = self.kickoff_batch(topics, concurrency, output)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        failed = sum(1 for record in records if record["status"] != "ok")
+        print(f"\n📦 Batch finished: {len(records) - failed} ok, {failed} failed in {time.perf_counter() - batch_start:.2f}s")
+        if output is not sys.stdout:
+            print(f"📝 Per-topic results written to {args.output}")
+        return records
+
+    def train(self):
+        """
+        Usage: train N_ITERATIONS FILENAME
+        Runs CrewAI's human-feedback training loop with the crew's interceptor in place, so feedback is given on the prompts it sends.
+        """
+        parser = argparse.ArgumentParser(prog="train", description="Train the crew with human feedback.")
+        parser.add_argument("n_iterations", type=positive_int)
+        parser.add_argument("filename", help="Where CrewAI stores the training data (.pkl)")
+        args = parser.parse_args(sys.argv[1:])
+
+        crew_instance = self.create_crew()
+        _, report = self.intercept(crew_instance)
+        try:
+            crew_instance.crew().train(n_iterations=args.n_iterations, filename=args.filename, inputs=self.default_inputs())
+        except Exception as e:
+            raise Exception(f"An error occurred while training the crew: {e}") from e
+        report()
+
+    def replay(self):
+        """
+        Usage: replay TASK_NAME [--outputs FILE]
+        Re-executes the crew from TASK_NAME using the saved outputs of the earlier tasks,
+        so their LLM calls are not paid for again.
+        """
+        parser = argparse.ArgumentParser(prog="replay", description="Re-execute the crew from a chosen task.")
+        parser.add_argument("task", help="Name of the first task to re-execute")
+        parser.add_argument("--outputs", default=TASK_OUTPUTS_FILE, help="Saved task outputs from an earlier run")
+        args = parser.parse_args(sys.argv[1:])
+
+        saved = self.load_task_outputs(args.outputs)
+
+        crew_instance = self.create_crew()
+        crew = crew_instance.crew()
+        task_names = [task.name for task in crew.tasks]
+        if args.task not in task_names:
+            raise ValueError(f"Unknown task '{args.task}', expected one of: {', '.join(task_names)}")
+        start_index = task_names.index(args.task)
+        missing = [name for name in task_names[:start_index] if name not in saved["tasks"]]
+        if missing:
+            raise ValueError(f"No saved output for {', '.join(missing)} in {args.outputs}; run the crew first")
+
+        print(f"\n🔂 Replaying from {args.task} with saved outputs of: {', '.join(task_names[:start_index]) or 'none'}")
+        _, report = self.intercept(crew_instance)
+        if task_output_streamer is not None:
+            task_output_streamer.attach(crew)
+        result = replay_from_task(crew, start_index, saved)
+
+        print("\n✅ Final Result:")
+        print(result)
+
+        report()
+        self.save_task_outputs(result, saved["inputs"], path=args.outputs, saved=saved)
+        return result
+
+    def test(self):
+        """
+        Usage: test [N_ITERATIONS] [--topic TOPIC]
+        Kicks off the crew N times and reports latency and token statistics per iteration and overall.
+        """
+        parser = argparse.ArgumentParser(prog="test", description="Run the crew N times and report latency and token usage.")
+        # A string default goes through positive_int as well, so a bad CREW_TEST_ITERATIONS is rejected too
+        parser.add_argument("n_iterations", type=positive_int, nargs="?", default=str(TEST_ITERATIONS))
+        parser.add_argument("--topic", default=self.default_inputs()["topic"])
+        args = parser.parse_args(sys.argv[1:])
+        inputs = self.topic_inputs(args.topic)
+
+        print(f"\n🧪 Testing crew for {args.n_iterations} iterations with topic: {inputs['topic']}")
+        iterations = []
+        for iteration in range(1, args.n_iterations + 1):
+            # A fresh interceptor (and stats) per iteration, installed before the clock starts
+            crew_instance = self.create_crew()
+            rewrite_stats, _ = self.intercept(crew_instance)
+            start = time.perf_counter()
+            result = crew_instance.crew().kickoff(inputs=inputs)
+            seconds = time.perf_counter() - start
+
+            usage = result.token_usage
+            iterations.append({
+                "iteration": iteration,
+                "seconds": seconds,
+                "total_tokens": usage.total_tokens,
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "llm_requests": usage.successful_requests,
+                "interceptor": rewrite_stats.summary()["totals"],
+            })
+            print(f"⏱️ Iteration {iteration}/{args.n_iterations}: {seconds:.2f}s, {usage.total_tokens} tokens "
+                  f"({usage.prompt_tokens} prompt / {usage.completion_tokens} completion) over {usage.successful_requests} requests")
+
+        summary = summarize_test_iterations(iterations)
+        print("\n📊 Test summary (mean / p50 / max):")
+        for field, values in summary.items():
+            print(f"   {field}: {values['mean']:.2f} / {values['p50']:.2f} / {values['max']:.2f}")
+
+        report = {"crew": self.crew_name, "inputs": inputs, "summary": summary, "iterations": iterations}
+        with open(TEST_STATS_JSON, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Test stats written to {TEST_STATS_JSON}")
+        return report
@@ -0,0 +1,121 @@
+# --- Pooled HTTP Clients ---
+
+# litellm builds a new httpx client for every sync Anthropic completion, so each call from main_task_lm,
+# assess_lm and every CrewAI agent pays a fresh TCP + TLS handshake. install_http_pool() wraps litellm.completion
+# once per process and hands every call for a pooled provider a shared keep-alive client per (provider, api_base).
+# dspy.LM and CrewAI both call litellm.completion, so they end up on the same connection pools.
+# The client is added below dspy's request cache, so cache keys are unchanged.
+import os
+import sys
+import threading
+from typing import Dict, Optional
+
+HTTP_POOL_ENABLED = os.getenv("HTTP_POOL_ENABLED", "1") == "1"
+HTTP_POOL_PROVIDERS = [provider.strip() for provider in os.getenv("HTTP_POOL_PROVIDERS", "anthropic").split(",") if provider.strip()]
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10")) # Idle keep-alive connections kept per host
+HTTP_POOL_MAX_PER_HOST = int(os.getenv("HTTP_POOL_MAX_PER_HOST", "20")) # Open connections allowed per host
+HTTP_POOL_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "60"))
+
+class HTTPClientRegistry:
+    """One pooled litellm HTTPHandler per (provider, api_base), counting requests, new connections and TLS handshakes."""
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, max_per_host: int = HTTP_POOL_MAX_PER_HOST,
+                 keepalive_expiry: float = HTTP_POOL_KEEPALIVE_EXPIRY):
+        self.pool_size = pool_size
+        self.max_per_host = max_per_host
+        self.keepalive_expiry = keepalive_expiry
+        self._handlers = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, api_base: Optional[str] = None):
+        key = f"{provider}:{api_base or 'default'}"
+        with self._lock:
+            if key not in self._handlers:
+                self._handlers[key] = self._create_handler(key)
+            return self._handlers[key]
+
+    def _create_handler(self, key: str):
+        import httpx
+        import litellm
+        from litellm.llms.custom_httpx.http_handler import HTTPHandler, get_ssl_configuration
+
+        counters = self._counters[key] = {"requests": 0, "connections_opened": 0, "tls_handshakes": 0}
+
+        # httpcore reports connection set-up through the request's trace extension
+        def trace(event_name: str, info: Dict) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                with self._lock:
+                    counters["connections_opened"] += 1
+            elif event_name == "connection.start_tls.complete":
+                with self._lock:
+                    counters["tls_handshakes"] += 1
+
+        def on_request(request) -> None:
+            with self._lock:
+                counters["requests"] += 1
+            request.extensions["trace"] = trace
+
+        client = httpx.Client(
+            limits=httpx.Limits(max_connections=self.max_per_host, max_keepalive_connections=self.pool_size,
+                                keepalive_expiry=self.keepalive_expiry),
+            timeout=httpx.Timeout(600.0, connect=5.0), # litellm's default; calls pass their own timeout anyway
+            verify=get_ssl_configuration(),
+            cert=os.getenv("SSL_CERTIFICATE", litellm.ssl_certificate),
+            event_hooks={"request": [on_request]},
+        )
+        return HTTPHandler(client=client)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            handlers = dict(self._handlers)
+            counters = {key: dict(values) for key, values in self._counters.items()}
+        stats = {}
+        for key, handler in handlers.items():
+            # httpcore's pool lists its connections; open = not closed yet, idle = kept alive between requests
+            pool = getattr(getattr(handler.client, "_transport", None), "_pool", None)
+            connections = list(getattr(pool, "connections", []))
+            stats[key] = {**counters[key], "open_connections": sum(1 for connection in connections if not connection.is_closed()),
+                          "idle_connections": sum(1 for connection in connections if connection.is_idle())}
+        return stats
+
+def install_http_pool() -> Optional[HTTPClientRegistry]:
+    """Wraps litellm.completion with the pooled clients once per process and returns the shared registry."""
+    if not HTTP_POOL_ENABLED:
+        return None
+    import litellm
+
+    # Another crew or the shared runtime may have installed it already
+    registry = getattr(litellm.completion, "http_client_registry", None)
+    if registry is not None:
+        return registry
+
+    registry = HTTPClientRegistry()
+    original_completion = litellm.completion
+
+    def pooled_completion(*args, **kwargs):
+        if kwargs.get("client") is None:
+            model = kwargs.get("model") or (args[0] if args else None)
+            try:
+                _, provider, _, _ = litellm.get_llm_provider(model=model, custom_llm_provider=kwargs.get("custom_llm_provider"),
+                                                             api_base=kwargs.get("api_base"))
+            except Exception:
+                provider = None
+            if provider in HTTP_POOL_PROVIDERS:
+                kwargs["client"] = registry.get(provider, kwargs.get("api_base"))
+        return original_completion(*args, **kwargs)
+
+    pooled_completion.http_client_registry = registry
+    litellm.completion = pooled_completion
+    return registry
+
+def get_http_pool() -> Optional[HTTPClientRegistry]:
+    """Returns the registry install_http_pool() put in place, or None if it never ran. Never installs anything."""
+    litellm = sys.modules.get("litellm") # Not imported means nothing was installed (or called)
+    return getattr(getattr(litellm, "completion", None), "http_client_registry", None)
+
+def print_http_pool_stats(registry: Optional[HTTPClientRegistry]) -> None:
+    if registry is not None:
+        for key, stats in registry.stats().items():
+            print(f"🔗 HTTP pool {key}: {stats['requests']} requests over {stats['connections_opened']} connections "
+                  f"({stats['tls_handshakes']} TLS handshakes), {stats['idle_connections']}/{stats['open_connections']} idle")
@@ -0,0 +1,146 @@
+# --- Interceptor Token and Latency Accounting ---
+
+# Every patched LLM.call records its token estimates, rewrite and downstream latency and cache status.
+# The crews dump the per-agent/task totals as JSON and as a Prometheus textfile, with the same metric names in all
+# three; vanillacrewai rewrites nothing, so its rewrite, cache, policy and template counters stay 0.
+import json
+import math
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+
+REWRITE_STATS_JSON = os.getenv("REWRITE_STATS_JSON", "rewrite_stats.json")
+REWRITE_STATS_PROM = os.getenv("REWRITE_STATS_PROM", "rewrite_stats.prom")
+
+# (metric suffix, summary field, help text)
+REWRITE_STATS_METRICS = [
+    ("calls_total", "calls", "LLM calls seen by the interceptor."),
+    ("original_tokens_total", "original_tokens", "Estimated prompt tokens before rewriting."),
+    ("rewritten_tokens_total", "rewritten_tokens", "Estimated prompt tokens sent to the LLM after rewriting."),
+    ("rewrite_seconds_total", "rewrite_seconds", "Time spent rewriting prompts with DSPy."),
+    ("llm_seconds_total", "llm_seconds", "Time spent in the original LLM.call."),
+    ("cache_hits_total", "cache_hits", "Message rewrites served from the rewrite cache."),
+    ("cache_misses_total", "cache_misses", "Message rewrites that went to the DSPy module."),
+    ("policy_skips_total", "policy_skips", "Messages the rewrite policy passed through unchanged."),
+    ("static_hits_total", "static_hits", "Message parts served from compiled static templates."),
+    ("near_dup_hits_total", "near_dup_hits", "Message parts served by patching a near-duplicate rewrite."),
+]
+
+def estimate_tokens(text: str) -> int:
+    # Rough count (~4 characters per token) that is good enough to compare prompt sizes without a tokenizer
+    return math.ceil(len(text) / 4)
+
+def describe_call_origin(kwargs: Dict) -> Tuple[str, str]:
+    """Returns the (agent, task) names CrewAI passes to LLM.call as from_agent/from_task."""
+    agent = kwargs.get("from_agent")
+    task = kwargs.get("from_task")
+    agent_name = (getattr(agent, "role", None) or "unknown").strip()
+    task_name = getattr(task, "name", None) or (getattr(task, "description", None) or "unknown").strip().split("\n")[0][:60]
+    return agent_name, task_name
+
+class RewriteStats:
+    """Per-call token and latency accounting for the interceptor, aggregated per agent and task."""
+
+    def __init__(self, crew_name: str):
+        self.crew_name = crew_name
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, task: str, original_tokens: int, rewritten_tokens: int,
+               rewrite_seconds: float, llm_seconds: float, events: List[str]) -> None:
+        with self._lock:
+            totals = self._totals.setdefault((agent, task), {field: 0 for _, field, _ in REWRITE_STATS_METRICS})
+            totals["calls"] += 1
+            totals["original_tokens"] += original_tokens
+            totals["rewritten_tokens"] += rewritten_tokens
+            totals["rewrite_seconds"] += rewrite_seconds
+            totals["llm_seconds"] += llm_seconds
+            totals["cache_hits"] += events.count("cache_hit")
+            totals["cache_misses"] += events.count("cache_miss")
+            totals["policy_skips"] += events.count("policy_skip")
+            totals["static_hits"] += events.count("static_hit")
+            totals["near_dup_hits"] += events.count("near_dup_hit")
+
+    def summary(self) -> Dict:
+        with self._lock:
+            per_agent_task = [{"agent": agent, "task": task, **totals} for (agent, task), totals in self._totals.items()]
+        overall = {field: sum(entry[field] for entry in per_agent_task) for _, field, _ in REWRITE_STATS_METRICS}
+        return {"crew": self.crew_name, "totals": overall, "per_agent_task": per_agent_task}
+
+    def write_json(self, path: str = REWRITE_STATS_JSON) -> None:
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def write_prometheus(self, path: str = REWRITE_STATS_PROM) -> None:
+        def label(value: str) -> str:
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        lines = []
+        summary = self.summary()
+        for suffix, field, help_text in REWRITE_STATS_METRICS:
+            metric = f"crewai_interceptor_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for entry in summary["per_agent_task"]:
+                labels = f'crew="{label(self.crew_name)}",agent="{label(entry["agent"])}",task="{label(entry["task"])}"'
+                lines.append(f"{metric}{{{labels}}} {entry[field]}")
+
+        # Written to a temp file and renamed, so a textfile collector never reads a half-written file
+        with open(f"{path}.tmp", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(f"{path}.tmp", path)
+
+def print_rewrite_stats_summary(stats: RewriteStats) -> None:
+    totals = stats.summary()["totals"]
+    print(f"📏 Interceptor: {totals['calls']} calls, ~{totals['original_tokens']} → ~{totals['rewritten_tokens']} prompt tokens, "
+          f"{totals['rewrite_seconds']:.1f}s rewriting, {totals['llm_seconds']:.1f}s in the LLM, "
+          f"{totals['cache_hits']} cache hits / {totals['cache_misses']} misses, {totals['policy_skips']} skipped by policy, "
+          f"{totals['static_hits']} static template hits, {totals['near_dup_hits']} near-duplicate hits")
+
+def write_rewrite_stats(stats: RewriteStats) -> None:
+    stats.write_json()
+    stats.write_prometheus()
+    print(f"📈 Interceptor stats written to {REWRITE_STATS_JSON} and {REWRITE_STATS_PROM}")
+
+# --- CrewAI LLM.call Patching ---
+
+# Store the original method once per process (crewai is imported on first use, not when this module is imported).
+# Every crew's interceptor and the shared runtime's dispatcher call through this one captured method.
+@lru_cache(maxsize=None)
+def get_original_llm_call() -> Callable:
+    import crewai.llm
+    return crewai.llm.LLM.call
+
+def patch_llm_call(patched_llm_call: Callable) -> None:
+    import crewai.llm
+    get_original_llm_call() # Capture the unpatched method before replacing it
+    crewai.llm.LLM.call = patched_llm_call
+
+def print_messages(title: str, messages: List[Dict[str, str]]) -> None:
+    print(f"\n{title}")
+    print("=" * 60)
+    for msg in messages:
+        print(f"[{msg.get('role', 'user')}] {msg.get('content', '')}")
+    print("=" * 60)
+
+def create_counting_llm_call(stats: RewriteStats, print_prompts: bool = False) -> Callable:
+    """Returns an LLM.call replacement that sends the messages unchanged and only records them in `stats`."""
+    _original_llm_call = get_original_llm_call()
+
+    def counting_llm_call(self, messages, *args, **kwargs):
+        # Ensure messages is a list of dicts
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        if print_prompts:
+            print_messages("🧠 [Intercepted LLM Messages]:", messages)
+
+        llm_start = time.perf_counter()
+        try:
+            return _original_llm_call(self, messages, *args, **kwargs)
+        finally:
+            prompt_tokens = sum(estimate_tokens(msg.get("content", "")) for msg in messages)
+            stats.record(*describe_call_origin(kwargs), original_tokens=prompt_tokens, rewritten_tokens=prompt_tokens,
+                         rewrite_seconds=0.0, llm_seconds=time.perf_counter() - llm_start, events=[])
+    return counting_llm_call
@@ -0,0 +1,172 @@
+# --- Local Knowledge Search ---
+
+# A BM25 index over a crew project's knowledge/ folder and the markdown reports its runs write next to it, exposed
+# to the agents as KnowledgeSearchTool. Each crew subclasses the tool with its own project_root.
+import math
+import os
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Type
+
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field, PrivateAttr
+
+SEARCH_EXTENSIONS = (".md", ".txt")
+SEARCH_EXCLUDE = frozenset({"README.md"}) # Project docs, not knowledge
+BM25_K1 = 1.5
+BM25_B = 0.75
+CHUNK_CHARS = 800 # Paragraphs are merged into passages of about this size
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("a an and are as at be by for from has in is it of on or that the this to was were with".split())
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def split_passages(text: str, chunk_chars: int = CHUNK_CHARS) -> List[str]:
+    passages, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) > chunk_chars:
+            passages.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        passages.append(current)
+    return passages
+
+class BM25Index:
+    """
+    Inverted index over the passages of the .md/.txt files in a set of (directory, recursive) roots.
+    refresh() only re-reads files whose mtime or size changed, so a search normally costs a few stat calls.
+    """
+
+    def __init__(self, roots: List[Tuple[str, bool]]):
+        self.roots = roots
+        self.reindexed = 0
+        self._files: Dict[str, Tuple[float, int, List[int]]] = {} # path -> (mtime, size, passage ids)
+        self._passages: Dict[int, Tuple[str, str, int]] = {} # passage id -> (path, text, length in tokens)
+        self._postings: Dict[str, Dict[int, int]] = {} # term -> {passage id: term frequency}
+        self._total_length = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def iter_files(self):
+        for directory, recursive in self.roots:
+            if os.path.isdir(directory):
+                paths = Path(directory).rglob("*") if recursive else Path(directory).iterdir()
+                yield from (str(path) for path in paths if path.suffix in SEARCH_EXTENSIONS and path.name not in SEARCH_EXCLUDE and path.is_file())
+
+    def _remove_file(self, path: str) -> None:
+        for passage_id in self._files.pop(path)[2]:
+            _, text, length = self._passages.pop(passage_id)
+            self._total_length -= length
+            for term in set(tokenize(text)):
+                postings = self._postings[term]
+                postings.pop(passage_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _add_file(self, path: str, mtime: float, size: int) -> None:
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError:
+            return # Removed or unreadable between the scan and the read; picked up on the next refresh
+        passage_ids = []
+        for passage in split_passages(text):
+            tokens = tokenize(passage)
+            if not tokens:
+                continue
+            passage_id = self._next_id
+            self._next_id += 1
+            self._passages[passage_id] = (path, passage, len(tokens))
+            self._total_length += len(tokens)
+            for term, frequency in Counter(tokens).items():
+                self._postings.setdefault(term, {})[passage_id] = frequency
+            passage_ids.append(passage_id)
+        self._files[path] = (mtime, size, passage_ids)
+        self.reindexed += 1
+
+    def refresh(self) -> None:
+        with self._lock:
+            seen = set()
+            for path in self.iter_files():
+                seen.add(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                indexed = self._files.get(path)
+                if indexed is not None and indexed[:2] == (stat.st_mtime, stat.st_size):
+                    continue
+                if indexed is not None:
+                    self._remove_file(path)
+                self._add_file(path, stat.st_mtime, stat.st_size)
+            for path in set(self._files) - seen:
+                self._remove_file(path)
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict]:
+        self.refresh()
+        with self._lock:
+            if not self._passages:
+                return []
+            num_passages = len(self._passages)
+            average_length = self._total_length / num_passages
+            scores = Counter()
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (num_passages - len(postings) + 0.5) / (len(postings) + 0.5))
+                for passage_id, frequency in postings.items():
+                    length = self._passages[passage_id][2]
+                    scores[passage_id] += idf * frequency * (BM25_K1 + 1) / (
+                        frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+            return [{"path": self._passages[passage_id][0], "score": score, "text": self._passages[passage_id][1]}
+                    for passage_id, score in scores.most_common(top_k)]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"files": len(self._files), "passages": len(self._passages), "terms": len(self._postings),
+                    "reindexed": self.reindexed}
+
+@lru_cache(maxsize=None)
+def get_shared_index(roots: Tuple[Tuple[str, bool], ...]) -> BM25Index:
+    # One index per set of roots, shared by every agent and crew in the process
+    return BM25Index(list(roots))
+
+def default_search_roots(project_root: str) -> List[Tuple[str, bool]]:
+    # knowledge/ in full, plus the reports written next to it (but not the source tree under src/)
+    return [(str(Path(project_root) / "knowledge"), True), (str(project_root), False)]
+
+
+class KnowledgeSearchToolInput(BaseModel):
+    """Input schema for KnowledgeSearchTool."""
+    query: str = Field(..., description="Keywords or a question to search the local knowledge files and earlier reports for.")
+    top_k: int = Field(5, description="Number of passages to return.")
+
+class KnowledgeSearchTool(BaseTool):
+    name: str = "Search local knowledge"
+    description: str = (
+        "Searches the user's knowledge files (e.g. user preferences) and the markdown reports produced by earlier runs, "
+        "and returns the most relevant passages with their source file. Use it to reuse facts instead of guessing them."
+    )
+    args_schema: Type[BaseModel] = KnowledgeSearchToolInput
+    project_root: str # The crew project folder holding knowledge/ and the reports its runs write
+    roots: Optional[List[Tuple[str, bool]]] = None # Defaults to default_search_roots(project_root)
+    _index: Optional[BM25Index] = PrivateAttr(default=None)
+
+    def _run(self, query: str, top_k: int = 5) -> str:
+        if self._index is None:
+            roots = self.roots or default_search_roots(self.project_root)
+            self._index = get_shared_index(tuple(tuple(root) for root in roots))
+        results = self._index.search(query, top_k)
+        if not results:
+            return f"No local knowledge found for: {query}"
+        return "\n\n".join(f"[{rank}] {os.path.relpath(result['path'], self.project_root)} (score {result['score']:.2f})\n{result['text']}"
+                           for rank, result in enumerate(results, 1))
@@ -0,0 +1,14 @@
+# --- Shared dspy.LM Clients ---
+
+# One dspy.LM client per (model, API key) per process, so the DSPy crews and crewruntime all talk to a model through
+# the same client (and its cache) whichever of them asks first. Creating a client never configures DSPy: callers
+# either call dspy.configure from their own main thread or scope the LM with dspy.context.
+from functools import lru_cache
+
+from crewcommon.http_pool import install_http_pool
+
+@lru_cache(maxsize=None)
+def get_shared_lm(model: str, api_key: str):
+    import dspy
+    install_http_pool() # The LMs and the crew's agents share keep-alive connections
+    return dspy.LM(model, api_key=api_key, cache=True)
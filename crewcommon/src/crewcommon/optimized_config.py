@@ -0,0 +1,47 @@
+# --- Optimized YAML Config Variants ---
+
+# `build_optimized_config` writes DSPy-optimized copies of a crew's agents.yaml/tasks.yaml under
+# config/optimized/<version>/. With CREW_OPTIMIZED_CONFIG=1 a crew loads the version named in config/optimized/current
+# (or the one CREW_OPTIMIZED_CONFIG_VERSION pins) instead of its originals, and the DSPy interceptor is skipped.
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+USE_OPTIMIZED_CONFIG = os.getenv("CREW_OPTIMIZED_CONFIG", "0") == "1"
+OPTIMIZED_CONFIG_VERSION = os.getenv("CREW_OPTIMIZED_CONFIG_VERSION")
+
+def resolve_optimized_config(config_dir: Path, version: Optional[str] = None) -> Optional[Path]:
+    """Returns the optimized config directory to load, or None if it is missing or was built from other YAML."""
+    optimized_dir = config_dir / "optimized"
+    if version is None:
+        if not (optimized_dir / "current").exists():
+            print(f"⚠️ CREW_OPTIMIZED_CONFIG=1 but {optimized_dir} has no current version; run build_optimized_config first.")
+            return None
+        version = (optimized_dir / "current").read_text().strip()
+
+    variant_dir = optimized_dir / version
+    if not (variant_dir / "manifest.json").exists():
+        print(f"⚠️ Optimized config {version} not found in {optimized_dir}, loading config/agents.yaml and config/tasks.yaml.")
+        return None
+    manifest = json.loads((variant_dir / "manifest.json").read_text())
+    for filename, digest in manifest["sources"].items():
+        if hashlib.sha256((config_dir / filename).read_bytes()).hexdigest() != digest:
+            print(f"⚠️ Optimized config {version} was built from an older {filename}; rebuild it with build_optimized_config.")
+            return None
+    return variant_dir
+
+class OptimizedConfigCrew:
+    """
+    Base for @CrewBase crews that can load an optimized config variant; subclasses set `config_dir` to their config/.
+    CrewBase loads the YAML right after __init__ runs, so pointing the config paths at the variant swaps the prompts.
+    """
+
+    config_dir: Path
+
+    def __init__(self, use_optimized_config: bool = USE_OPTIMIZED_CONFIG, optimized_config_version: Optional[str] = OPTIMIZED_CONFIG_VERSION):
+        self.optimized_config_dir = resolve_optimized_config(self.config_dir, optimized_config_version) if use_optimized_config else None
+        if self.optimized_config_dir is not None:
+            self.original_agents_config_path = str(self.optimized_config_dir / "agents.yaml")
+            self.original_tasks_config_path = str(self.optimized_config_dir / "tasks.yaml")
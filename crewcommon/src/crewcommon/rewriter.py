@@ -0,0 +1,697 @@
+# --- DSPy Rewrite Interceptor ---
+
+# The stack both DSPy crews (and crewruntime) put in front of CrewAI's LLM.call: an exact-match rewrite cache,
+# near-duplicate reuse, boilerplate normalization, per-agent and static templates, the selective rewriting policy,
+# and the sync and async monkey patches that tie them together around an optimized DSPy module.
+# Nothing here creates an LM or configures DSPy; the module passed in runs with whatever LM its caller set up.
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from crewcommon.interceptor import RewriteStats, describe_call_origin, estimate_tokens, get_original_llm_call, print_messages
+
+if TYPE_CHECKING:
+    import dspy
+
+# --- Rewrite Cache for the Monkey Patch ---
+
+# CrewAI resends the same system prompt on every ReAct iteration, so we keep the DSPy rewrites
+# in a small in-process LRU cache instead of paying an extra Claude round-trip for the same text.
+REWRITE_CACHE_SIZE = int(os.getenv("DSPY_REWRITE_CACHE_SIZE", "256"))
+
+def fingerprint_module(module: "dspy.Module") -> str:
+    """
+    Returns a short hash of the module's learned state (instructions and demos),
+    so cached rewrites from one optimized module are never served for another.
+    """
+    state = json.dumps(module.dump_state(), sort_keys=True, default=str)
+    return hashlib.sha256(state.encode("utf-8")).hexdigest()[:16]
+
+class RewriteCache:
+    """Size-bounded LRU cache of DSPy rewrites, keyed by message content and module fingerprint."""
+
+    def __init__(self, maxsize: int = REWRITE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(content: str, module_fingerprint: str) -> str:
+        return hashlib.sha256(f"{module_fingerprint}\x00{content}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key) # Mark as most recently used
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False) # Evict the least recently used rewrite
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+# --- Near-Duplicate Rewrite Reuse ---
+
+# Prompts for different topics differ only in the crew inputs ({topic}, current_year), which the exact-hash cache
+# can't see past. Every rewrite is also indexed by a MinHash signature, along with the inputs it was made for; a new
+# message whose estimated similarity to an indexed one clears the threshold, and which differs from it only in those
+# input values, reuses that rewrite with the new values patched in, skipping DSPy.
+NEAR_DUP_ENABLED = os.getenv("DSPY_NEAR_DUP", "1") == "1"
+NEAR_DUP_THRESHOLD = float(os.getenv("DSPY_NEAR_DUP_THRESHOLD", "0.7")) # Estimated Jaccard similarity of word shingles
+NEAR_DUP_INDEX_SIZE = int(os.getenv("DSPY_NEAR_DUP_INDEX_SIZE", "512"))
+NEAR_DUP_NUM_PERM = 64
+NEAR_DUP_SHINGLE_SIZE = 2 # Word bigrams: one changed word touches at most two shingles
+NEAR_DUP_CANDIDATES = 3 # Most similar entries tried before giving up
+NEAR_DUP_MIN_VALUE_CHARS = 4 # Shorter input values ("5", "AI") collide with list numbers and ordinary words in a rewrite
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+def span_pattern(text: str) -> re.Pattern:
+    # Spans match whole words only, so "cancer" never patches the inside of "cancerous"
+    return re.compile(rf"(?<!\w){re.escape(text)}(?!\w)")
+
+def substitute_inputs(text: str, values: Dict[str, Tuple[str, str]]) -> Tuple[str, Dict[str, int]]:
+    """Replaces each input's old value with its new one as whole words and counts the replacements per input."""
+    # Longest values first, so a value that contains another input's value is replaced whole
+    ordered = sorted(values.items(), key=lambda item: len(item[1][0]), reverse=True)
+    counts = {}
+    for i, (name, (old, _)) in enumerate(ordered):
+        text, counts[name] = span_pattern(old).subn(f"\x00{i}\x00", text)
+    for i, (_, (_, new)) in enumerate(ordered):
+        text = text.replace(f"\x00{i}\x00", new)
+    return text, counts
+
+def patch_rewrite(original: str, rewritten: str, content: str, original_inputs: Dict, inputs: Dict) -> Optional[str]:
+    """
+    Carries a change of crew inputs from `original` (rewritten for `original_inputs`) over to its rewrite, giving
+    the rewrite of `content`. Only input values are patched, and only when swapping them turns `original` into
+    `content` exactly, and each swapped value is long enough not to be mistaken for list numbers or common words
+    and occurs as often in the rewrite as in the original. Anything else returns None, so the message is
+    rewritten normally.
+    """
+    changed = {name: (str(original_inputs[name]), str(value)) for name, value in inputs.items()
+               if name in original_inputs and str(original_inputs[name]) != str(value)}
+    patched_original, original_counts = substitute_inputs(original, changed)
+    if patched_original != content:
+        return None # The message differs in more than its inputs
+
+    used = {name: values for name, values in changed.items() if original_counts[name]}
+    if any(len(old) < NEAR_DUP_MIN_VALUE_CHARS for old, _ in used.values()):
+        return None
+    patched, rewrite_counts = substitute_inputs(rewritten, used)
+    # A value the rewrite paraphrased, or that also turns up in the rewrite on its own, can't be swapped safely
+    if any(rewrite_counts[name] != original_counts[name] for name in used):
+        return None
+    return patched
+
+class NearDuplicateIndex:
+    """Bounded MinHash index of (original, rewrite) pairs; similarity is estimated against all entries at once."""
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, maxsize: int = NEAR_DUP_INDEX_SIZE,
+                 num_perm: int = NEAR_DUP_NUM_PERM, seed: int = 9):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.unpatchable = 0
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._signatures = np.zeros((maxsize, num_perm), dtype=np.uint64)
+        self._entries = [None] * maxsize # (module fingerprint, original, rewrite, inputs), written round-robin
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def signature(self, content: str, inputs: Dict) -> np.ndarray:
+        # Hashed in template form, so messages that differ only in their inputs look identical however long the values are
+        words = to_placeholder_form(content, inputs)[0].split()
+        shingles = {" ".join(words[i:i + NEAR_DUP_SHINGLE_SIZE]) for i in range(max(1, len(words) - NEAR_DUP_SHINGLE_SIZE + 1))}
+        hashes = np.array([zlib.crc32(shingle.encode("utf-8")) for shingle in shingles], dtype=np.uint64)
+        # One universal hash per permutation, applied to every shingle at once; the signature keeps each row's minimum
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+    def lookup(self, content: str, module_fingerprint: str, inputs: Dict) -> Optional[str]:
+        signature = self.signature(content, inputs)
+        with self._lock:
+            count = min(self._next, self.maxsize)
+            similarity = (self._signatures[:count] == signature).mean(axis=1)
+            candidates = [self._entries[i] for i in np.argsort(-similarity)[:NEAR_DUP_CANDIDATES]
+                          if similarity[i] >= self.threshold and self._entries[i][0] == module_fingerprint]
+            if not candidates:
+                self.misses += 1
+                return None
+
+        for _, original, rewritten, original_inputs in candidates:
+            patched = patch_rewrite(original, rewritten, content, original_inputs, inputs)
+            if patched is not None:
+                with self._lock:
+                    self.hits += 1
+                return patched
+        with self._lock:
+            self.unpatchable += 1
+        return None
+
+    def add(self, content: str, rewritten: str, module_fingerprint: str, inputs: Dict) -> None:
+        signature = self.signature(content, inputs)
+        with self._lock:
+            slot = self._next % self.maxsize # Oldest entry is overwritten once the index is full
+            self._signatures[slot] = signature
+            self._entries[slot] = (module_fingerprint, content, rewritten, dict(inputs))
+            self._next += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "unpatchable": self.unpatchable,
+                    "size": min(self._next, self.maxsize)}
+
+def print_near_duplicate_stats(index: Optional[NearDuplicateIndex]) -> None:
+    if index is not None:
+        stats = index.stats()
+        print(f"🪞 Near-duplicate reuse: {stats['hits']} patched rewrites, {stats['unpatchable']} too different to patch, "
+              f"{stats['misses']} misses ({stats['size']} indexed)")
+
+# --- Boilerplate Pre-Normalizer ---
+
+# CrewAI stitches the same fixed lines into every prompt. They carry no task information, so they are
+# stripped or shortened by plain string rules before the DSPy rewrite, which makes rewrite requests
+# smaller and lets more of them hit the rewrite cache. Set DSPY_REWRITE_NORMALIZE=0 to send prompts verbatim.
+REWRITE_NORMALIZE = os.getenv("DSPY_REWRITE_NORMALIZE", "1") == "1"
+
+# (boilerplate phrase, canonical replacement); whitespace inside a phrase may vary
+BOILERPLATE_RULES = [
+    ("Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it!", ""),
+    ("I MUST use these formats, my job depends on it!", ""),
+    ("To give my best complete final answer to the task respond using the exact following format:", "Answer format:"),
+    ("You MUST return the actual complete content as the final answer, not a summary.", "Return the complete content as the final answer, not a summary."),
+    ("This is the expected criteria for your final answer:", "Expected output:"),
+    ("Your personal goal is:", "Goal:"),
+]
+
+class BoilerplateNormalizer:
+    """Rule-based pre-pass that strips or canonicalizes CrewAI's fixed prompt boilerplate."""
+
+    def __init__(self, rules: List[Tuple[str, str]] = BOILERPLATE_RULES):
+        self.rules = [(re.compile(r"\s+".join(re.escape(word) for word in phrase.split())), replacement)
+                      for phrase, replacement in rules]
+        self.messages = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self._lock = threading.Lock()
+
+    def normalize(self, text: str) -> str:
+        normalized = text
+        for pattern, replacement in self.rules:
+            normalized = pattern.sub(replacement, normalized)
+        normalized = re.sub(r"[ \t]+\n", "\n", normalized)  # Trailing spaces left behind by removed phrases
+        normalized = re.sub(r"\n{3,}", "\n\n", normalized).strip()
+
+        with self._lock:
+            self.messages += 1
+            self.tokens_before += estimate_tokens(text)
+            self.tokens_after += estimate_tokens(normalized)
+        return normalized
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"messages": self.messages, "tokens_before": self.tokens_before, "tokens_after": self.tokens_after,
+                    "tokens_saved": self.tokens_before - self.tokens_after}
+
+# --- Per-Agent Template Reuse ---
+
+# CrewAI builds each agent's system prompt from agents.yaml (role, goal, backstory) plus fixed format
+# instructions, so it is identical on every call that agent makes. That template is rewritten once per
+# crew run and reused; only the per-call part (the "Current Task:" turn and later turns) goes through DSPy.
+AGENT_TEMPLATE_SPLIT_MARKER = "\nCurrent Task:"
+
+class AgentTemplateStore:
+    """Holds each agent's stable system template and its rewrite for the duration of one crew run."""
+
+    def __init__(self):
+        self.reused = 0
+        self.rewritten = 0
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def get(self, agent_key, template: str) -> Optional[str]:
+        with self._lock:
+            entry = self._templates.get(agent_key)
+            # The stored rewrite only applies if the agent's template text is unchanged
+            if entry is not None and entry[0] == template:
+                self.reused += 1
+                return entry[1]
+            return None
+
+    def put(self, agent_key, template: str, rewritten: str) -> None:
+        with self._lock:
+            self._templates[agent_key] = (template, rewritten)
+            self.rewritten += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"agents": len(self._templates), "rewritten": self.rewritten, "reused": self.reused}
+
+def split_agent_template(msg: Dict[str, str]) -> Tuple[Optional[str], str]:
+    """Splits a message into the agent's stable template (if it carries one) and its per-call dynamic part."""
+    content = msg["content"]
+    if msg.get("role") == "system":
+        return content, ""
+
+    # Without a system prompt CrewAI puts the agent template in front of the task in a single user message
+    marker_index = content.find(AGENT_TEMPLATE_SPLIT_MARKER)
+    if msg.get("role") == "user" and marker_index > 0:
+        return content[:marker_index], content[marker_index:]
+    return None, content
+
+# --- Static Prompt Templates ---
+
+# The agents.yaml/tasks.yaml prompts only change with the crew inputs ({topic}), so `compile_templates` rewrites each
+# first-turn prompt once offline with its placeholders kept, and the interceptor serves that rewrite by filling the
+# placeholders back in, with no DSPy round-trip. Compiled templates are stored per optimized-module fingerprint.
+STATIC_TEMPLATES_FILE = os.getenv("DSPY_STATIC_TEMPLATES", "static_templates.json")
+STATIC_TEMPLATES_ENABLED = os.getenv("DSPY_STATIC_TEMPLATES_ENABLED", "1") == "1"
+TASK_CONTEXT_MARKER = "This is the context you're working with:" # Outputs of earlier tasks follow this, never static
+CAPTURE_FINAL_ANSWER = "Thought: I now can give a great answer\nFinal Answer: Template capture placeholder."
+
+def get_call_inputs(kwargs: Dict) -> Dict:
+    """Returns the kickoff inputs of the crew behind an LLM.call (CrewAI keeps them on the crew the agent belongs to)."""
+    crew = getattr(kwargs.get("from_agent"), "crew", None)
+    return dict(getattr(crew, "_inputs", None) or {})
+
+def to_placeholder_form(content: str, inputs: Dict) -> Tuple[str, List[str]]:
+    """Turns an interpolated prompt back into its template by replacing input values with {name} placeholders."""
+    placeholders = []
+    # Longest values first, so a value that contains another input's value is replaced whole
+    for name, value in sorted(inputs.items(), key=lambda item: len(str(item[1])), reverse=True):
+        value = str(value) if isinstance(value, (str, int, float)) else ""
+        if value and value in content:
+            content = content.replace(value, "{" + name + "}")
+            placeholders.append(name)
+    return content, sorted(placeholders)
+
+def fill_template(template: str, inputs: Dict, placeholders: List[str]) -> str:
+    # Only the template's own placeholders are filled; any other braces in the rewrite are left as written
+    for name in placeholders:
+        template = template.replace("{" + name + "}", str(inputs[name]))
+    return template
+
+class StaticTemplateStore:
+    """Compiled template rewrites, keyed by optimized-module fingerprint and then by template hash."""
+
+    def __init__(self, path: str = STATIC_TEMPLATES_FILE):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._modules = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._modules = json.load(f).get("modules", {})
+            except (OSError, ValueError, AttributeError) as e:
+                # A damaged file only costs the static hits; compile_templates rewrites it from scratch
+                print(f"⚠️ Ignoring unreadable static templates file {path}: {e}")
+                self._modules = {}
+
+    @staticmethod
+    def make_key(template: str) -> str:
+        return hashlib.sha256(template.encode("utf-8")).hexdigest()
+
+    def lookup(self, content: str, inputs: Dict, module_fingerprint: str) -> Optional[str]:
+        template, placeholders = to_placeholder_form(content, inputs)
+        entry = self._modules.get(module_fingerprint, {}).get(self.make_key(template))
+        with self._lock:
+            if entry is None or entry["rewritten"] is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return fill_template(entry["rewritten"], inputs, entry["placeholders"])
+
+    def compile(self, module: "dspy.Module", templates: List[Tuple[str, List[str]]],
+                normalizer: Optional[BoilerplateNormalizer] = None) -> Dict[str, int]:
+        """
+        Rewrites each (template, placeholders) pair once with the module and saves the results. A rewrite that
+        drops one of the placeholders can't be filled in at run time, so it is kept uncompiled (live rewrites).
+        """
+        counts = {"compiled": 0, "reused": 0, "rejected": 0}
+        entries = self._modules.setdefault(fingerprint_module(module), {})
+        for template, placeholders in templates:
+            key = self.make_key(template)
+            if entries.get(key, {}).get("rewritten") is not None:
+                counts["reused"] += 1
+                continue
+
+            content = normalizer.normalize(template) if normalizer is not None else template
+            rewritten = module(crewai_prompt=content).dspy_improved_prompt.strip()
+            missing = [name for name in placeholders if "{" + name + "}" not in rewritten]
+            entries[key] = {"template": template, "placeholders": placeholders,
+                            "rewritten": None if missing else rewritten, "missing_placeholders": missing}
+            counts["rejected" if missing else "compiled"] += 1
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"modules": self._modules}, f, indent=2)
+        os.replace(tmp_path, self.path)
+        return counts
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            compiled = sum(1 for entries in self._modules.values() for entry in entries.values() if entry["rewritten"] is not None)
+            return {"compiled": compiled, "hits": self.hits, "misses": self.misses}
+
+@lru_cache(maxsize=None)
+def get_static_templates(path: str = STATIC_TEMPLATES_FILE) -> Optional[StaticTemplateStore]:
+    # Read on first use rather than at import time, once per file: each crew compiles its own templates
+    return StaticTemplateStore(path) if STATIC_TEMPLATES_ENABLED else None
+
+def print_static_template_stats(store: Optional[StaticTemplateStore]) -> None:
+    if store is not None:
+        stats = store.stats()
+        print(f"🧊 Static templates: {stats['hits']} served without DSPy, {stats['misses']} misses ({stats['compiled']} compiled)")
+
+# --- Selective Rewriting Policy ---
+
+# Decides per message whether it goes through the DSPy rewrite. After the first turn the CrewAI agent loop
+# resends the conversation with the model's own Thought/Action/Observation turns; rewriting those adds
+# latency and can break the "Thought:/Final Answer:" protocol the agent parses.
+# DSPY_REWRITE_POLICY is a comma-separated list of rules; a message is rewritten only if every rule allows it.
+REWRITE_POLICY = os.getenv("DSPY_REWRITE_POLICY", "all")
+
+def build_message_contexts(messages: List[Dict[str, str]], kwargs: Dict) -> List[Dict]:
+    """
+    Describes each message of one LLM.call for the policy: role, position in the call, the agent turn it belongs to
+    (0 until the first assistant message, then +1 per assistant message), the calling agent and task, and the crew inputs.
+    """
+    agent, task = describe_call_origin(kwargs)
+    inputs = get_call_inputs(kwargs)
+    contexts = []
+    turn = 0
+    for index, msg in enumerate(messages):
+        role = msg.get("role", "user")
+        if role == "assistant":
+            turn += 1
+        contexts.append({"role": role, "index": index, "turn": turn, "agent": agent, "task": task, "inputs": inputs})
+    return contexts
+
+# Built-in rules: (message, context) -> True to rewrite. Register custom rules here to use them by name.
+REWRITE_POLICY_RULES: Dict[str, Callable[[Dict[str, str], Dict], bool]] = {
+    "all": lambda msg, context: True,
+    "first_turn": lambda msg, context: context["turn"] == 0,
+    "system_only": lambda msg, context: context["role"] == "system",
+    "no_assistant": lambda msg, context: context["role"] != "assistant",
+}
+
+class RewritePolicy:
+    """Applies the named rules to each message and counts how many messages each rule skipped."""
+
+    def __init__(self, rules: Union[str, List[Tuple[str, Callable]]] = REWRITE_POLICY):
+        if isinstance(rules, str):
+            names = [name.strip() for name in rules.split(",") if name.strip()] or ["all"]
+            unknown = [name for name in names if name not in REWRITE_POLICY_RULES]
+            if unknown:
+                raise ValueError(f"Unknown rewrite policy rule(s) {unknown}, expected one of: {', '.join(REWRITE_POLICY_RULES)}")
+            rules = [(name, REWRITE_POLICY_RULES[name]) for name in names]
+        self.rules = rules
+        self.name = ",".join(name for name, _ in rules)
+        self._rewritten = 0
+        self._skipped = {name: 0 for name, _ in rules}
+        self._lock = threading.Lock()
+
+    def should_rewrite(self, msg: Dict[str, str], context: Dict) -> bool:
+        for name, rule in self.rules:
+            if not rule(msg, context):
+                with self._lock:
+                    self._skipped[name] += 1
+                return False
+        with self._lock:
+            self._rewritten += 1
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"policy": self.name, "rewritten": self._rewritten, "skipped": dict(self._skipped)}
+
+@lru_cache(maxsize=None)
+def get_rewrite_policy() -> RewritePolicy:
+    # Built on first use, so a bad DSPY_REWRITE_POLICY stops the run that needs it with a clear message instead of the import
+    try:
+        return RewritePolicy(REWRITE_POLICY)
+    except ValueError as e:
+        raise SystemExit(f"❌ Invalid DSPY_REWRITE_POLICY={REWRITE_POLICY!r}: {e}") from e
+
+def print_rewrite_policy_stats(policy: Optional[RewritePolicy]) -> None:
+    if policy is not None:
+        stats = policy.stats()
+        skipped = ", ".join(f"{name}={count}" for name, count in stats["skipped"].items())
+        print(f"🎯 Rewrite policy '{stats['policy']}': {stats['rewritten']} messages rewritten, skipped by rule: {skipped}")
+
+# --- CrewAI Monkey Patch with Optimized DSPy Module ---
+
+# get_original_llm_call (crewcommon.interceptor) captures the unpatched method once per process
+
+# Number of messages of one LLM.call rewritten concurrently (1 keeps the original one-after-the-other behaviour)
+REWRITE_MAX_WORKERS = int(os.getenv("DSPY_REWRITE_MAX_WORKERS", "1"))
+
+def print_rewrite_cache_stats(rewrite_cache: Optional[RewriteCache]) -> None:
+    if rewrite_cache is not None:
+        stats = rewrite_cache.stats()
+        print(f"🗃️ Rewrite cache: {stats['hits']} hits, {stats['misses']} misses ({stats['size']}/{stats['maxsize']} entries)")
+
+def create_message_rewriter(optimized_dspy_module: "dspy.Module", rewrite_cache: Optional[RewriteCache] = None,
+                            template_store: Optional[AgentTemplateStore] = None,
+                            normalizer: Optional[BoilerplateNormalizer] = None,
+                            policy: Optional[RewritePolicy] = None,
+                            static_templates: Optional[StaticTemplateStore] = None,
+                            near_duplicates: Optional[NearDuplicateIndex] = None) -> Callable:
+    """
+    Returns a function that rewrites a single CrewAI message with the optimized DSPy module.
+    Shared by the sync and async monkey patches so both follow the same policy, cache and fallback rules.
+    """
+    # Fingerprint the module once; it is fixed for the lifetime of this rewriter
+    module_fingerprint = fingerprint_module(optimized_dspy_module)
+
+    def rewrite_content(content: str, events: List[str], inputs: Optional[Dict] = None) -> str:
+        # Prompts compiled offline are filled in with this call's inputs, no DSPy call needed
+        if static_templates is not None and inputs is not None:
+            static_content = static_templates.lookup(content, inputs, module_fingerprint)
+            if static_content is not None:
+                events.append("static_hit")
+                return static_content
+
+        # Strip the fixed CrewAI boilerplate first, so the cache key and the DSPy input are both the smaller text
+        if normalizer is not None:
+            content = normalizer.normalize(content)
+
+        # Repeat messages (e.g. the same system prompt on every ReAct iteration) skip the rewrite entirely
+        cache_key = None
+        if rewrite_cache is not None:
+            cache_key = rewrite_cache.make_key(content, module_fingerprint)
+            cached_content = rewrite_cache.get(cache_key)
+            if cached_content is not None:
+                events.append("cache_hit")
+                return cached_content
+            events.append("cache_miss")
+
+        # The same prompt for other inputs (another topic) reuses the earlier rewrite with the new values patched in
+        use_near_duplicates = near_duplicates is not None and inputs is not None
+        improved_content = near_duplicates.lookup(content, module_fingerprint, inputs) if use_near_duplicates else None
+        if improved_content is not None:
+            events.append("near_dup_hit")
+        else:
+            # Use the optimized_dspy_module captured by the closure.
+            # Here, we pass the message content (system or/and user) to DSPy for optimization.
+            improved = optimized_dspy_module(crewai_prompt=content)
+            improved_content = improved.dspy_improved_prompt.strip()
+            if use_near_duplicates:
+                near_duplicates.add(content, improved_content, module_fingerprint, inputs)
+        if rewrite_cache is not None:
+            rewrite_cache.put(cache_key, improved_content)
+        return improved_content
+
+    def rewrite_template(agent_key, template: str, events: List[str], inputs: Optional[Dict] = None) -> str:
+        rewritten = template_store.get(agent_key, template)
+        if rewritten is None:
+            rewritten = rewrite_content(template, events, inputs)
+            template_store.put(agent_key, template, rewritten)
+        else:
+            events.append("template_reused")
+        return rewritten
+
+    def rewrite_message(msg: Dict[str, str], agent_key=None, events: Optional[List[str]] = None,
+                        context: Optional[Dict] = None) -> Dict[str, str]:
+        # Callers pass a shared list to collect what happened to each message (cache hits, errors, ...)
+        events = events if events is not None else []
+        if policy is not None and context is not None and not policy.should_rewrite(msg, context):
+            events.append("policy_skip")
+            return msg
+        inputs = context.get("inputs") if context is not None else None
+        try:
+            if template_store is None:
+                return {"role": msg["role"], "content": rewrite_content(msg["content"], events, inputs)}
+
+            # The agent's stable template is rewritten once per run; only the dynamic part is rewritten per call
+            template, dynamic = split_agent_template(msg)
+            parts = []
+            if template:
+                parts.append(rewrite_template(agent_key, template, events, inputs))
+            if dynamic:
+                parts.append(rewrite_content(dynamic, events, inputs))
+            return {"role": msg["role"], "content": "\n\n".join(parts)}
+        except Exception as e:
+            events.append("rewrite_error")
+            print(f"⚠️ Error optimizing message with DSPy: {e}. Keeping original content for role '{msg.get('role')}'.")
+            return msg
+    return rewrite_message
+
+def create_patched_llm_call_function(optimized_dspy_module: "dspy.Module", rewrite_cache: Optional[RewriteCache] = None,
+                                     max_workers: int = REWRITE_MAX_WORKERS,
+                                     template_store: Optional[AgentTemplateStore] = None,
+                                     normalizer: Optional[BoilerplateNormalizer] = None,
+                                     stats: Optional[RewriteStats] = None,
+                                     policy: Optional[RewritePolicy] = None,
+                                     static_templates: Optional[StaticTemplateStore] = None,
+                                     near_duplicates: Optional[NearDuplicateIndex] = None) -> Callable:
+    rewrite_message = create_message_rewriter(optimized_dspy_module, rewrite_cache, template_store, normalizer, policy,
+                                              static_templates, near_duplicates)
+    _original_llm_call = get_original_llm_call()
+
+    # One bounded worker pool shared by every call made through this patched function
+    rewrite_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dspy-rewrite") if max_workers > 1 else None
+
+    def patched_llm_call_inner(self, messages: Union[str, List[Dict[str, str]]], *args, **kwargs):
+        # Ensure messages is a list of dicts.
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+
+        # Print messages BEFORE DSPy optimization
+        print_messages("🟦 [Monkey Patch] Messges before DSPy Optimization:", messages)
+
+        # Each agent has its own CrewAI LLM instance, so it identifies the agent whose template is reused
+        agent_key = id(self)
+        events = []
+        contexts = build_message_contexts(messages, kwargs)
+        rewrite_start = time.perf_counter()
+        if rewrite_executor is not None and len(messages) > 1:
+            # Rewrite the system and user messages at the same time; map() returns them in their original order
+            optimized_messages = list(rewrite_executor.map(lambda msg, context: rewrite_message(msg, agent_key, events, context),
+                                                           messages, contexts))
+        else:
+            optimized_messages = [rewrite_message(msg, agent_key, events, context) for msg, context in zip(messages, contexts)]
+        rewrite_seconds = time.perf_counter() - rewrite_start
+
+        # Print messages AFTER DSPy optimization
+        print_messages("🟦 [Monkey Patch] Improved Prompt Sent to LLM after DSPy Optimization:", optimized_messages)
+        print_rewrite_cache_stats(rewrite_cache)
+
+        # Call the original LLM.call method, ensuring 'self' remains the original CrewAI LLM instance
+        llm_start = time.perf_counter()
+        try:
+            return _original_llm_call(self, optimized_messages, *args, **kwargs)
+        finally:
+            if stats is not None:
+                stats.record(*describe_call_origin(kwargs),
+                             original_tokens=sum(estimate_tokens(msg.get("content", "")) for msg in messages),
+                             rewritten_tokens=sum(estimate_tokens(msg.get("content", "")) for msg in optimized_messages),
+                             rewrite_seconds=rewrite_seconds, llm_seconds=time.perf_counter() - llm_start, events=events)
+    return patched_llm_call_inner
+
+# --- Async Monkey Patch for kickoff_async ---
+
+# Upper bound on rewrites in flight across all crews sharing one event loop
+REWRITE_ASYNC_MAX_WORKERS = int(os.getenv("DSPY_REWRITE_ASYNC_MAX_WORKERS", "8"))
+# Upper bound on downstream LLM calls in flight. They run on an executor owned by the patch, never on the loop's
+# default executor: kickoff_async parks every crew's thread there, blocked on its bridged LLM.call, so once
+# enough crews are running no default-executor thread would be left to make the call they are waiting for.
+ASYNC_LLM_MAX_WORKERS = int(os.getenv("DSPY_ASYNC_LLM_MAX_WORKERS", "16"))
+
+def create_async_patched_llm_call_function(optimized_dspy_module: "dspy.Module", rewrite_cache: Optional[RewriteCache] = None,
+                                           max_workers: int = REWRITE_ASYNC_MAX_WORKERS,
+                                           llm_max_workers: int = ASYNC_LLM_MAX_WORKERS,
+                                           template_store: Optional[AgentTemplateStore] = None,
+                                           normalizer: Optional[BoilerplateNormalizer] = None,
+                                           stats: Optional[RewriteStats] = None,
+                                           policy: Optional[RewritePolicy] = None,
+                                           static_templates: Optional[StaticTemplateStore] = None,
+                                           near_duplicates: Optional[NearDuplicateIndex] = None) -> Callable:
+    rewrite_message = create_message_rewriter(optimized_dspy_module, rewrite_cache, template_store, normalizer, policy,
+                                              static_templates, near_duplicates)
+    _original_llm_call = get_original_llm_call()
+
+    # DSPy modules are synchronous, so each rewrite is bridged onto a bounded executor and awaited from the event loop
+    rewrite_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dspy-async-rewrite")
+    llm_executor = ThreadPoolExecutor(max_workers=llm_max_workers, thread_name_prefix="dspy-async-llm")
+
+    async def patched_llm_acall_inner(self, messages: Union[str, List[Dict[str, str]]], *args, **kwargs):
+        # Ensure messages is a list of dicts.
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+
+        print_messages("🟦 [Async Monkey Patch] Messges before DSPy Optimization:", messages)
+
+        # Rewrites of this call overlap with each other and with rewrites from every other kickoff on the loop
+        loop = asyncio.get_running_loop()
+        events = []
+        contexts = build_message_contexts(messages, kwargs)
+        rewrite_start = time.perf_counter()
+        optimized_messages = list(await asyncio.gather(
+            *(loop.run_in_executor(rewrite_executor, rewrite_message, msg, id(self), events, context)
+              for msg, context in zip(messages, contexts))
+        ))
+        rewrite_seconds = time.perf_counter() - rewrite_start
+
+        print_messages("🟦 [Async Monkey Patch] Improved Prompt Sent to LLM after DSPy Optimization:", optimized_messages)
+        print_rewrite_cache_stats(rewrite_cache)
+
+        # The original LLM.call is blocking, so it runs on the patch's own executor instead of on the event loop
+        # (with the caller's context, as asyncio.to_thread would)
+        llm_start = time.perf_counter()
+        context = contextvars.copy_context()
+        try:
+            return await loop.run_in_executor(llm_executor, lambda: context.run(_original_llm_call, self, optimized_messages,
+                                                                              *args, **kwargs))
+        finally:
+            if stats is not None:
+                stats.record(*describe_call_origin(kwargs),
+                             original_tokens=sum(estimate_tokens(msg.get("content", "")) for msg in messages),
+                             rewritten_tokens=sum(estimate_tokens(msg.get("content", "")) for msg in optimized_messages),
+                             rewrite_seconds=rewrite_seconds, llm_seconds=time.perf_counter() - llm_start, events=events)
+    return patched_llm_acall_inner
+
+def bridge_async_llm_call(patched_llm_acall: Callable, loop: asyncio.AbstractEventLoop) -> Callable:
+    """
+    Wraps the async patched call in a synchronous LLM.call.
+    CrewAI's kickoff_async runs each crew in a worker thread that still calls LLM.call synchronously,
+    so those threads hand their calls to the shared event loop and wait for the result.
+    """
+    def patched_llm_call_inner(self, messages: Union[str, List[Dict[str, str]]], *args, **kwargs):
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is loop:
+            raise RuntimeError("LLM.call was invoked on the event loop thread; run the crew with kickoff_async instead.")
+
+        future = asyncio.run_coroutine_threadsafe(patched_llm_acall(self, messages, *args, **kwargs), loop)
+        return future.result()
+    return patched_llm_call_inner
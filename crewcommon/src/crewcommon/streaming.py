@@ -0,0 +1,116 @@
+# --- Streaming Task Output ---
+
+# With CREW_STREAM_OUTPUT=1 the agents' LLMs stream, and each task's final-answer tokens are appended to its
+# output_file as they arrive, so readers see the report within seconds instead of after the whole task.
+# When the task completes, the file is atomically replaced with CrewAI's final output.
+import os
+import threading
+import time
+
+STREAM_OUTPUT = os.getenv("CREW_STREAM_OUTPUT", "0") == "1"
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+class TaskOutputStreamer:
+    """Streams final-answer chunks into each attached task's output_file and finalizes the file atomically."""
+
+    def __init__(self):
+        self._paths = {} # task id -> output file
+        self._streams = {} # task id -> state of the completion currently being streamed
+        self._lock = threading.Lock()
+        self._registered = False
+
+    def attach(self, crew) -> None:
+        """Turns on streaming for the crew's agents and takes over writing its tasks' output files."""
+        self._register_handlers()
+        for agent in crew.agents:
+            agent.llm.stream = True
+        for task in crew.tasks:
+            if not task.output_file:
+                continue
+            task_id = str(task.id)
+            self._paths[task_id] = task.output_file
+            # CrewAI would rewrite the file in place after the task, finalize() replaces it atomically instead
+            task.output_file = None
+            previous_callback = task.callback
+
+            def finalize_callback(output, task_id=task_id, previous_callback=previous_callback):
+                self.finalize(task_id, output.raw)
+                if previous_callback:
+                    previous_callback(output)
+            task.callback = finalize_callback
+
+    def _register_handlers(self) -> None:
+        if self._registered:
+            return
+        from crewai.utilities.events import crewai_event_bus, LLMCallStartedEvent, LLMStreamChunkEvent
+
+        # The event bus calls handlers synchronously on the thread making the LLM call, in chunk order
+        crewai_event_bus.register_handler(LLMCallStartedEvent, self._on_call_started)
+        crewai_event_bus.register_handler(LLMStreamChunkEvent, self._on_chunk)
+        self._registered = True
+
+    def _on_call_started(self, source, event) -> None:
+        task_id = str(event.task_id)
+        if task_id not in self._paths:
+            return
+        with self._lock:
+            stream = self._streams.setdefault(task_id, {"buffer": "", "file": None, "in_answer": False,
+                                                        "started_at": time.perf_counter(), "first_byte_at": None})
+            # Each ReAct step is a new completion; only the one that reaches the final answer is written
+            stream["buffer"] = ""
+            stream["in_answer"] = False
+
+    def _on_chunk(self, source, event) -> None:
+        task_id = str(event.task_id)
+        if task_id not in self._paths or event.tool_call:
+            return
+        with self._lock:
+            stream = self._streams.get(task_id)
+            if stream is None:
+                return
+            if stream["in_answer"]:
+                text = event.chunk
+            else:
+                # The marker can be split across chunks, so look for it in everything this completion has sent so far
+                stream["buffer"] += event.chunk
+                marker_at = stream["buffer"].find(FINAL_ANSWER_MARKER)
+                if marker_at == -1:
+                    return
+                stream["in_answer"] = True
+                text = stream["buffer"][marker_at + len(FINAL_ANSWER_MARKER):].lstrip()
+                if stream["file"] is None:
+                    path = self._paths[task_id]
+                    if os.path.dirname(path):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                    stream["file"] = open(path, "w", encoding="utf-8")
+                else:
+                    # A later completion reached a final answer again (e.g. after a parse retry), so start over
+                    stream["file"].seek(0)
+                    stream["file"].truncate()
+            if text:
+                if stream["first_byte_at"] is None:
+                    stream["first_byte_at"] = time.perf_counter()
+                stream["file"].write(text)
+                stream["file"].flush()
+
+    def finalize(self, task_id: str, content: str) -> None:
+        with self._lock:
+            stream = self._streams.pop(task_id, None)
+            path = self._paths[task_id]
+            if stream is not None and stream["file"] is not None:
+                stream["file"].close()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written to a temp file and renamed, so readers see either the streamed draft or the final output, never a mix
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write(str(content))
+        os.replace(f"{path}.tmp", path)
+
+        if stream is not None and stream["first_byte_at"] is not None:
+            print(f"📝 {path} finalized (first byte after {stream['first_byte_at'] - stream['started_at']:.1f}s)")
+        else:
+            print(f"📝 {path} finalized")
+
+# One per process: the event bus handlers are registered once and route chunks by task id
+task_output_streamer = TaskOutputStreamer() if STREAM_OUTPUT else None
@@ -0,0 +1,503 @@
+# --- Shared Crew Runtime ---
+
+# Hosts OpportunityInsightCrew, BootStrapCrew and StartupValidatorCrew in one warm process.
+# The crews share one dspy.LM client per model, one rewrite cache, one boilerplate normalizer and rewrite policy,
+# and every optimized module is loaded once per process instead of once per project run.
+# All their litellm calls go through one set of pooled keep-alive HTTP clients (crewcommon.http_pool).
+#
+#   crewruntime jobs.jsonl --concurrency 4
+#
+# Each line of the jobs file is {"crew": "crewaibootstrap", "topic": "..."} or {"crew": ..., "inputs": {...}}.
+import asyncio
+import contextvars
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# (crew package, crew class, main module with the DSPy interceptor, or None to pass prompts through unchanged)
+CREWS = {
+    "vanillacrewai": ("vanillacrewai", "OpportunityInsightCrew", None),
+    "crewaibootstrap": ("crewaibootstrap", "BootStrapCrew", "crewaibootstrap.main"),
+    "crewaimiprov2": ("crewaimiprov2", "StartupValidatorCrew", "crewaimiprov2.main"),
+}
+
+# Each crew project keeps its own src/ layout, so the runtime puts all three (and their shared crewcommon) on the path
+for project in [crew_package for crew_package, _, _ in CREWS.values()] + ["crewcommon"]:
+    project_src = os.path.join(REPO_ROOT, project, "src")
+    if project_src not in sys.path:
+        sys.path.insert(0, project_src)
+
+from crewcommon.http_pool import get_http_pool, install_http_pool
+from crewcommon.interceptor import RewriteStats, create_counting_llm_call, get_original_llm_call
+from crewcommon.rewriter import (NEAR_DUP_ENABLED, REWRITE_NORMALIZE, STATIC_TEMPLATES_FILE, AgentTemplateStore,
+                                 BoilerplateNormalizer, NearDuplicateIndex, RewriteCache, create_patched_llm_call_function,
+                                 get_rewrite_policy, get_static_templates)
+
+RUNTIME_CONCURRENCY = int(os.getenv("CREW_RUNTIME_CONCURRENCY", "4"))
+RUNTIME_OUTPUT = os.getenv("CREW_RUNTIME_OUTPUT", "runtime_results.jsonl")
+RUNTIME_STATS_JSON = os.getenv("CREW_RUNTIME_STATS_JSON", "runtime_stats.json")
+
+# The interceptor for the kickoff running in the current thread (or task); None means call the LLM unchanged
+active_llm_call: contextvars.ContextVar[Optional[Callable]] = contextvars.ContextVar("active_llm_call", default=None)
+
+def resolve_crew_path(crew_package: str, path: str) -> str:
+    # Artifacts are built from inside each project folder, so relative paths are looked up there ("" stays disabled)
+    if not path or os.path.isabs(path):
+        return path
+    return os.path.join(REPO_ROOT, crew_package, path)
+
+def resolve_crew_paths(main_module, crew_package: str) -> str:
+    """Points a main's artifact paths at its own project folder and returns its static templates file."""
+    main_module.ARTIFACT_DIR = resolve_crew_path(crew_package, main_module.ARTIFACT_DIR)
+    main_module.judge_verdict_store.path = resolve_crew_path(crew_package, main_module.judge_verdict_store.path)
+    if hasattr(main_module, "COMPILE_CHECKPOINT_DIR"):
+        main_module.COMPILE_CHECKPOINT_DIR = resolve_crew_path(crew_package, main_module.COMPILE_CHECKPOINT_DIR)
+    # The optimized YAML needs nothing here: crew.py finds it next to its own config/
+    return resolve_crew_path(crew_package, STATIC_TEMPLATES_FILE)
+
+class RequestStats:
+    """Collects the interceptor totals of one kickoff and forwards every call to the crew's running RewriteStats."""
+
+    def __init__(self, crew_stats):
+        self.crew_stats = crew_stats
+        self.totals = {"llm_calls": 0, "original_tokens": 0, "rewritten_tokens": 0, "rewrite_seconds": 0.0, "llm_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, task: str, original_tokens: int, rewritten_tokens: int,
+               rewrite_seconds: float, llm_seconds: float, events: List[str]) -> None:
+        self.crew_stats.record(agent, task, original_tokens=original_tokens, rewritten_tokens=rewritten_tokens,
+                               rewrite_seconds=rewrite_seconds, llm_seconds=llm_seconds, events=events)
+        with self._lock:
+            self.totals["llm_calls"] += 1
+            self.totals["original_tokens"] += original_tokens
+            self.totals["rewritten_tokens"] += rewritten_tokens
+            self.totals["rewrite_seconds"] += rewrite_seconds
+            self.totals["llm_seconds"] += llm_seconds
+
+class CrewRuntime:
+    """One process, three crews: warm once, then kick off any crew with the shared clients and caches."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._warm_lock = threading.RLock() # Concurrent first requests for a crew must not load its module twice
+        self._crew_classes = {}
+        self._main_modules = {}
+        self._static_templates_files = {}
+        self._stats = {}
+        self._warm_seconds = {}
+        self.rewrite_cache = None
+        self.normalizer = None
+        self.near_duplicates = None
+        self.policy = None
+        self._installed = False
+        self._dspy_configured = False
+
+    def warm(self, crew_names: Optional[List[str]] = None) -> Dict[str, float]:
+        """Imports the crews, loads (or compiles) their optimized modules and installs the dispatching LLM.call."""
+        for crew_name in crew_names or list(CREWS):
+            if crew_name not in CREWS:
+                raise ValueError(f"Unknown crew '{crew_name}', expected one of: {', '.join(CREWS)}")
+            if crew_name in self._warm_seconds:
+                continue
+            with self._warm_lock:
+                if crew_name in self._warm_seconds:
+                    continue
+                start = time.perf_counter()
+                crew_package, crew_class_name, main_name = CREWS[crew_name]
+                crew_class = getattr(importlib.import_module(f"{crew_package}.crew"), crew_class_name)
+                self._crew_classes[crew_name] = crew_class
+                # A crew loaded from its pre-optimized YAML already carries the DSPy rewrites; like vanillacrewai it is only counted
+                optimized_config_dir = crew_class().optimized_config_dir
+                if main_name is not None and optimized_config_dir is None:
+                    self._warm_main_module(crew_name, crew_package, main_name)
+                elif main_name is not None:
+                    print(f"📁 {crew_name} runs from {optimized_config_dir} (CREW_OPTIMIZED_CONFIG=1); its calls are only counted")
+                self._install()
+                self._warm_seconds[crew_name] = time.perf_counter() - start
+                print(f"🔥 Warmed {crew_name} in {self._warm_seconds[crew_name]:.2f}s")
+        return dict(self._warm_seconds)
+
+    def _warm_main_module(self, crew_name: str, crew_package: str, main_name: str) -> None:
+        main_module = importlib.import_module(main_name)
+        self._static_templates_files[crew_name] = resolve_crew_paths(main_module, crew_package)
+        # The mains hand out crewcommon's per-model clients (crewcommon.lms), so both DSPy crews share one per model
+        main_task_lm = main_module.get_main_task_lm()
+        self._configure_dspy(main_task_lm)
+
+        # One rewrite cache, normalizer, near-duplicate index and policy (crewcommon.rewriter) for every DSPy crew;
+        # cached and indexed rewrites are keyed by module fingerprint, so the crews never see each other's
+        if self.rewrite_cache is None:
+            self.rewrite_cache = RewriteCache()
+            self.normalizer = BoilerplateNormalizer() if REWRITE_NORMALIZE else None
+            self.near_duplicates = NearDuplicateIndex() if NEAR_DUP_ENABLED else None
+            self.policy = get_rewrite_policy()
+
+        # The LM is passed in and only scoped to the load (or compile), never configured by the main module
+        main_module.get_optimized_module(main_task_lm=main_task_lm)
+        self._main_modules[crew_name] = main_module
+
+    def _configure_dspy(self, main_task_lm) -> None:
+        # The default LM for threads that no dspy.context reaches (e.g. CrewAI's async task threads); set once, as
+        # dspy.configure raises on any thread other than the first one that called it
+        if self._dspy_configured:
+            return
+        import dspy
+        dspy.configure(lm=main_task_lm)
+        self._dspy_configured = True
+
+    def _install(self) -> None:
+        if self._installed:
+            return
+        import crewai.llm
+        install_http_pool() # Installed once per process; every crew's agents and LMs share its pools
+        # Every interceptor calls "the original" LLM.call captured once per process; that has to happen before the
+        # dispatcher replaces it, or interceptors created later would call back into the dispatcher
+        original_llm_call = get_original_llm_call()
+
+        def dispatching_llm_call(llm_self, messages, *args, **kwargs):
+            llm_call = active_llm_call.get()
+            if llm_call is None:
+                return original_llm_call(llm_self, messages, *args, **kwargs)
+            return llm_call(llm_self, messages, *args, **kwargs)
+
+        crewai.llm.LLM.call = dispatching_llm_call
+        self._installed = True
+
+    def _stats_for(self, crew_name: str):
+        with self._lock:
+            if crew_name not in self._stats:
+                self._stats[crew_name] = RewriteStats(crew_name)
+            return self._stats[crew_name]
+
+    def _create_llm_call(self, crew_name: str, stats) -> Callable:
+        main_module = self._main_modules.get(crew_name)
+        if main_module is not None:
+            # A fresh template store per kickoff: templates are keyed by LLM instance, which lives as long as the crew
+            return create_patched_llm_call_function(main_module.optimized_module, self.rewrite_cache,
+                                                    template_store=AgentTemplateStore(), normalizer=self.normalizer,
+                                                    stats=stats, policy=self.policy,
+                                                    static_templates=get_static_templates(self._static_templates_files[crew_name]),
+                                                    near_duplicates=self.near_duplicates)
+
+        # vanillacrewai and crews on their pre-optimized YAML rewrite nothing, their calls are only counted
+        return create_counting_llm_call(stats)
+
+    def kickoff(self, crew_name: str, inputs: Dict, timings: Optional[Dict] = None):
+        """Kicks off one crew; if `timings` is given it is filled with per-stage seconds and this kickoff's LLM totals."""
+        start = time.perf_counter()
+        self.warm([crew_name])
+        warmed = time.perf_counter()
+
+        request_stats = RequestStats(self._stats_for(crew_name))
+        token = active_llm_call.set(self._create_llm_call(crew_name, request_stats))
+        built = warmed
+        try:
+            crew = self._crew_classes[crew_name]().crew()
+            built = time.perf_counter()
+            main_module = self._main_modules.get(crew_name)
+            if main_module is None:
+                result = crew.kickoff(inputs=inputs)
+            else:
+                import dspy
+                # Thread-local, so concurrent kickoffs on request threads never touch the global DSPy settings
+                with dspy.context(lm=main_module.get_main_task_lm()):
+                    result = crew.kickoff(inputs=inputs)
+        finally:
+            active_llm_call.reset(token)
+            if timings is not None:
+                timings.update(warm_seconds=warmed - start, build_seconds=built - warmed,
+                               kickoff_seconds=time.perf_counter() - built, **request_stats.totals)
+        return result
+
+    async def kickoff_async(self, crew_name: str, inputs: Dict):
+        # asyncio.to_thread copies the context, so the kickoff thread sees this crew's interceptor
+        return await asyncio.to_thread(self.kickoff, crew_name, inputs)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            per_crew = {crew_name: stats.summary() for crew_name, stats in self._stats.items()}
+        registry = get_http_pool()
+        http_pools = registry.stats() if registry is not None else None
+        return {
+            "warm_seconds": dict(self._warm_seconds),
+            "rewrite_cache": self.rewrite_cache.stats() if self.rewrite_cache is not None else None,
+            "optimized_modules": len(self._main_modules),
+            "http_pools": http_pools,
+            "crews": per_crew,
+        }
+
+def read_jobs(source: str) -> List[Dict]:
+    """Reads one JSON job per line from a file, or from stdin when source is "-". Blank lines and # comments are skipped."""
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    return [json.loads(line) for line in lines if line.strip() and not line.strip().startswith("#")]
+
+def validate_job(job) -> Optional[str]:
+    """Returns why a job cannot run, or None if it can."""
+    if not isinstance(job, dict):
+        return f"Job must be a JSON object, got {type(job).__name__}"
+    if not isinstance(job.get("crew"), str) or job["crew"] not in CREWS:
+        return f"'crew' must be one of: {', '.join(CREWS)}"
+    if not job.get("topic") and not job.get("inputs"):
+        return "Provide a 'topic' or an 'inputs' object"
+    if job.get("inputs") and not isinstance(job["inputs"], dict):
+        return f"'inputs' must be a JSON object, got {type(job['inputs']).__name__}"
+    return None
+
+def build_inputs(job: Dict) -> Dict:
+    inputs = dict(job.get("inputs") or {"topic": job["topic"]})
+    # OpportunityInsightCrew's tasks interpolate {current_year}; the other crews ignore it
+    inputs.setdefault("current_year", datetime.now().year)
+    return inputs
+
+def run_job(runtime: CrewRuntime, index: int, job: Dict, batch_start: float) -> Dict:
+    queued_seconds = time.perf_counter() - batch_start
+    error = validate_job(job)
+    if not isinstance(job, dict):
+        record = {"index": index, "crew": None, "inputs": None}
+    else:
+        record = {"index": index, "crew": job.get("crew"), "inputs": job.get("inputs") or {"topic": job.get("topic")}}
+    start = time.perf_counter()
+    timings = {}
+    try:
+        if error is not None:
+            raise ValueError(error) # Recorded like any failed kickoff; the rest of the batch still runs
+        result = runtime.kickoff(job["crew"], build_inputs(job), timings=timings)
+        record.update(status="ok", result=str(result))
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record.update(queued_seconds=round(queued_seconds, 4), seconds=round(time.perf_counter() - start, 4),
+                  timings={stage: round(value, 4) for stage, value in timings.items()})
+    return record
+
+def run():
+    """
+    Usage: crewruntime [JOBS_FILE|-] [--concurrency N] [--output FILE|-] [--warm CREW ...]
+    Warms the crews once, then runs every job with at most N kickoffs in flight and writes per-job results as JSONL.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="crewruntime", description="Run jobs for all three crews in one warm process.")
+    parser.add_argument("jobs", nargs="?", default="-", help="JSONL file of jobs, or - for stdin")
+    parser.add_argument("--concurrency", type=int, default=RUNTIME_CONCURRENCY, help="Maximum kickoffs in flight")
+    parser.add_argument("--output", default=RUNTIME_OUTPUT, help="JSONL results file, or - for stdout")
+    parser.add_argument("--warm", nargs="*", choices=list(CREWS), help="Crews to warm up front (default: the crews the jobs use)")
+    args = parser.parse_args(sys.argv[1:])
+
+    jobs = read_jobs(args.jobs)
+    if not jobs:
+        print("⚠️ No jobs to run.")
+        return []
+    invalid = sum(1 for job in jobs if validate_job(job) is not None)
+    if invalid:
+        print(f"⚠️ {invalid} invalid jobs will be recorded as errors.")
+
+    runtime = CrewRuntime()
+    # Only the crews that valid jobs use are warmed; a crew that fails to warm fails its own jobs, not the batch
+    for crew_name in args.warm or sorted({job["crew"] for job in jobs if validate_job(job) is None}):
+        try:
+            runtime.warm([crew_name])
+        except Exception as e:
+            print(f"❌ Could not warm {crew_name}: {type(e).__name__}: {e}")
+    concurrency = max(1, args.concurrency)
+
+    print(f"\n🚀 Running {len(jobs)} jobs across {len(runtime.stats()['warm_seconds'])} warm crews, at most {concurrency} at a time...")
+    batch_start = time.perf_counter()
+    records = []
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="crew-runtime") as executor:
+            futures = [executor.submit(run_job, runtime, index, job, batch_start) for index, job in enumerate(jobs)]
+            # Records are written from this thread as kickoffs finish, so lines never interleave
+            for future in as_completed(futures):
+                record = future.result()
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                print(f"{'✅' if record['status'] == 'ok' else '❌'} [{record['index'] + 1}/{len(jobs)}] {record['crew']} ({record['seconds']:.2f}s)")
+                records.append(record)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    failed = sum(1 for record in records if record["status"] != "ok")
+    print(f"\n📦 Runtime finished: {len(records) - failed} ok, {failed} failed in {time.perf_counter() - batch_start:.2f}s")
+    stats = runtime.stats()
+    if stats["rewrite_cache"] is not None:
+        print(f"🗃️ Shared rewrite cache: {stats['rewrite_cache']['hits']} hits, {stats['rewrite_cache']['misses']} misses")
+    print(f"📦 Optimized modules loaded: {stats['optimized_modules']}")
+    with open(RUNTIME_STATS_JSON, "w") as f:
+        json.dump(stats, f, indent=2)
+    print(f"📈 Runtime stats written to {RUNTIME_STATS_JSON}")
+    return sorted(records, key=lambda record: record["index"])
+
+# --- Local Crew Service ---
+
+# `crewruntime_serve` keeps the runtime warm behind a small HTTP server (TCP, or a Unix socket with --socket),
+# so per-request latency no longer includes interpreter start-up, imports, module loading or patching.
+#
+#   POST /kickoff  {"crew": "crewaibootstrap", "topic": "..."} -> result plus per-stage timings
+#   GET  /health   warm crews and in-flight kickoffs
+#   GET  /stats    shared cache and per-crew interceptor totals
+SERVICE_HOST = os.getenv("CREW_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("CREW_SERVICE_PORT", "8765"))
+SERVICE_SOCKET = os.getenv("CREW_SERVICE_SOCKET", "")
+SERVICE_MAX_CONCURRENT = int(os.getenv("CREW_SERVICE_MAX_CONCURRENT", "2"))
+SERVICE_QUEUE_TIMEOUT = float(os.getenv("CREW_SERVICE_QUEUE_TIMEOUT", "300"))
+
+class CrewService:
+    """Runs kickoff requests on a warm CrewRuntime, with at most `max_concurrent` kickoffs in flight."""
+
+    def __init__(self, runtime: CrewRuntime, max_concurrent: int = SERVICE_MAX_CONCURRENT,
+                 queue_timeout: float = SERVICE_QUEUE_TIMEOUT):
+        self.runtime = runtime
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.served = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def kickoff(self, job: Dict) -> Tuple[int, Dict]:
+        """Returns (HTTP status, response body) for one kickoff request."""
+        error = validate_job(job)
+        if error is not None:
+            return 400, {"error": error}
+
+        start = time.perf_counter()
+        # Requests beyond the concurrency limit wait here; the wait is reported as queued_seconds
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            return 503, {"error": f"No kickoff slot free within {self.queue_timeout:g}s", "max_concurrent": self.max_concurrent}
+        queued_seconds = time.perf_counter() - start
+
+        with self._lock:
+            self.in_flight += 1
+        timings = {}
+        try:
+            result = self.runtime.kickoff(job["crew"], build_inputs(job), timings=timings)
+            status, body = 200, {"status": "ok", "result": str(result)}
+        except Exception as e:
+            status, body = 500, {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.in_flight -= 1
+                self.served += 1
+                self.failed += 0 if status == 200 else 1
+
+        timings = {"queued_seconds": queued_seconds, **timings, "total_seconds": time.perf_counter() - start}
+        body.update(crew=job["crew"], timings={stage: round(value, 4) for stage, value in timings.items()})
+        return status, body
+
+    def health(self) -> Dict:
+        with self._lock:
+            counters = {"in_flight": self.in_flight, "served": self.served, "failed": self.failed, "rejected": self.rejected}
+        return {"status": "ok", "max_concurrent": self.max_concurrent, "warm_seconds": self.runtime.stats()["warm_seconds"], **counters}
+
+def create_request_handler(service: CrewService):
+    from http.server import BaseHTTPRequestHandler
+
+    class CrewRequestHandler(BaseHTTPRequestHandler):
+        def send_json(self, status: int, body: Dict) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self.send_json(200, service.health())
+            elif self.path == "/stats":
+                self.send_json(200, service.runtime.stats())
+            else:
+                self.send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/kickoff":
+                self.send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                if length < 0:
+                    raise ValueError(f"negative Content-Length {length}")
+                job = json.loads(self.rfile.read(length) or b"{}")
+            except (ValueError, json.JSONDecodeError) as e: # A bad Content-Length or body must not drop the connection
+                self.send_json(400, {"error": f"Invalid request body: {e}"})
+                return
+            if not isinstance(job, dict):
+                self.send_json(400, {"error": f"Request body must be a JSON object, got {type(job).__name__}"})
+                return
+            if not isinstance(job.get("crew"), str):
+                self.send_json(400, {"error": f"'crew' must be one of: {', '.join(CREWS)}"})
+                return
+            self.send_json(*service.kickoff(job))
+
+        def address_string(self) -> str:
+            # Unix socket peers have no (host, port) address
+            return self.client_address[0] if isinstance(self.client_address, tuple) else "unix-socket"
+
+    return CrewRequestHandler
+
+def serve():
+    """
+    Usage: crewruntime_serve [--host HOST] [--port PORT | --socket PATH] [--max-concurrent N] [--warm CREW ...]
+    Warms the crews once and serves kickoff requests until interrupted.
+    """
+    import argparse
+    import socketserver
+    from http.server import ThreadingHTTPServer
+
+    parser = argparse.ArgumentParser(prog="crewruntime_serve", description="Serve crew kickoffs from one warm process.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--socket", default=SERVICE_SOCKET, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--max-concurrent", type=int, default=SERVICE_MAX_CONCURRENT, help="Kickoffs running at the same time")
+    parser.add_argument("--queue-timeout", type=float, default=SERVICE_QUEUE_TIMEOUT, help="Seconds a request may wait for a slot")
+    parser.add_argument("--warm", nargs="*", choices=list(CREWS), help="Crews to warm before serving (default: all)")
+    args = parser.parse_args(sys.argv[1:])
+
+    runtime = CrewRuntime()
+    runtime.warm(args.warm)
+    service = CrewService(runtime, max_concurrent=max(1, args.max_concurrent), queue_timeout=args.queue_timeout)
+    handler = create_request_handler(service)
+
+    if args.socket:
+        class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = ThreadingUnixHTTPServer(args.socket, handler)
+        where = f"unix:{args.socket}"
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), handler)
+        where = f"http://{args.host}:{server.server_address[1]}"
+
+    print(f"\n🛰️ Crew service listening on {where} (max {service.max_concurrent} concurrent kickoffs)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down crew service...")
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    run()
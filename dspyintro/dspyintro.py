@@ -7,16 +7,23 @@ import dspy
 from dotenv import load_dotenv
 import os
 
-# Load environment variables
-load_dotenv()
-anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+# The LLMs are created in configure_lms(), so importing this file does not load .env or build any clients
+lm = None
+assess_lm = None
 
-# Configure DSPy with preferred LLM (Claude Sonnet 4)
-lm = dspy.LM('anthropic/claude-sonnet-4-20250514', api_key=anthropic_api_key, cache=True)
-dspy.configure(lm=lm)
+def configure_lms():
+    global lm, assess_lm
 
-# Configure a separate LLM for the AI-assisted metric (e.g., Claude Sonnet)
-assess_lm = dspy.LM('anthropic/claude-sonnet-4-20250514', api_key=anthropic_api_key, cache=True)
+    # Load environment variables
+    load_dotenv()
+    anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+
+    # Configure DSPy with preferred LLM (Claude Sonnet 4)
+    lm = dspy.LM('anthropic/claude-sonnet-4-20250514', api_key=anthropic_api_key, cache=True)
+    dspy.configure(lm=lm)
+
+    # Configure a separate LLM for the AI-assisted metric (e.g., Claude Sonnet)
+    assess_lm = dspy.LM('anthropic/claude-sonnet-4-20250514', api_key=anthropic_api_key, cache=True)
 
 # Define the NEW Signature for Prompt Optimization
 class PromptOptimizer(dspy.Signature):
@@ -244,8 +251,28 @@ class AssessPromptImprovement(dspy.Signature):
     assessment_question: str = dspy.InputField(desc="The specific question to evaluate the improved prompt.")
     assessment_answer: bool = dspy.OutputField(desc="True if the improved prompt meets the criteria, False otherwise.")
 
+# Fused judge: returns the clarity and completeness verdicts from a single LM call,
+# so the raw, predicted and expected prompts are sent once per example instead of twice
+class AssessPromptImprovementFused(dspy.Signature):
+    """Assess the clarity and completeness of an improved prompt against an ideal expected prompt."""
+    assessed_raw_prompt: str = dspy.InputField(desc="The original raw prompt before improvement.")
+    assessed_improved_prompt: str = dspy.InputField(desc="The prompt that was generated by the DSPy module based on the raw prompt.")
+    expected_improved_prompt: str = dspy.InputField(desc="The ideal improved prompt for the same raw prompt.")
+    clarity_answer: bool = dspy.OutputField(
+        desc="True if the improved prompt clarifies and structures the raw prompt with effective formatting, headings "
+             "and clear instructions at least as well as the expected prompt, False otherwise."
+    )
+    completeness_answer: bool = dspy.OutputField(
+        desc="True if the improved prompt elaborates on the generic requirements of the raw prompt with specific constraints, "
+             "clear formatting guidance and concrete examples as thoroughly as the expected prompt, False otherwise."
+    )
+
+# Judge mode for prompt_improvement_metric: "separate" asks the two assessment questions in two LM calls,
+# "fused" gets both verdicts from one call and halves judge traffic during compiles
+METRIC_MODE = os.getenv("DSPY_METRIC_MODE", "separate")
+
 
-def prompt_improvement_metric(example, pred, trace=None):
+def prompt_improvement_metric(example, pred, trace=None, mode=None):
     """
     Evaluates if the predicted improved prompt (pred.improved_prompt) effectively transforms
     the raw prompt (example.raw_prompt) into a high-quality, actionable, and well-structured prompt,
@@ -255,6 +282,16 @@ def prompt_improvement_metric(example, pred, trace=None):
     expected_improved_prompt = example.improved_prompt # This is the gold standard improved prompt
     predicted_improved_prompt = pred.improved_prompt # This is what our DSPy module generated
 
+    # Fused mode: both criteria below are judged in a single LM call
+    if (mode or METRIC_MODE) == "fused":
+        with dspy.context(lm=assess_lm):
+            fused_eval = dspy.Predict(AssessPromptImprovementFused)(
+                assessed_raw_prompt=raw_prompt,
+                assessed_improved_prompt=predicted_improved_prompt,
+                expected_improved_prompt=expected_improved_prompt
+            )
+        return int(fused_eval.clarity_answer) + int(fused_eval.completeness_answer) == 2
+
     # Metric 1: Structural Integrity & Clarity
     # Does the generated improved prompt follow a clear, well-structured format
     # and is it easy to parse for the LLM, similar to the golden examples?
@@ -329,50 +366,56 @@ def prompt_improvement_metric(example, pred, trace=None):
 # Import BootstrapFewShot
 from dspy.teleprompt import BootstrapFewShot
 
-config = dict(max_labeled_demos=3)  # Limit to 3 labeled demos for bootstrapping
-
-# BootstrapFewShot will use the provided metric to guide its optimization
-teleprompter = BootstrapFewShot(metric=prompt_improvement_metric, **config)
-
-# --- Compile (Optimize) the Module ---
-# This is where DSPy learns to transform raw_prompt into improved_prompt
-print("Starting module optimization with bootstrapping...")
-optimized_module = teleprompter.compile(basic_module, trainset=trainset)
-print("Module optimized successfully!")
-
-print("\n--- Evaluating on Development Set (Manual Loop) ---")
-dev_scores = []
-for i, example in enumerate(devset):
-    print(f"Evaluating example {i+1}/{len(devset)}...")
-    prediction = optimized_module(raw_prompt=example.raw_prompt) # Corrected input field
-    score = prompt_improvement_metric(example, prediction) # Corrected metric function
-    dev_scores.append(score)
-
-avg_dev_score = sum(dev_scores) / len(dev_scores)
-print(f"\nAverage score on the development set: {avg_dev_score:.2f}")
-
-new_raw_prompt = (
-    "[System]: You are a Sustainability Consultant specializing in corporate environmental impact. Your goal is to advise "
-    "companies on reducing their carbon footprint and improving resource efficiency. Your backstory: You are an expert "
-    "in analyzing supply chains, energy consumption, and waste management practices.\n\n"
-    "Your personal goal is: Identify actionable strategies and innovative technologies for businesses to achieve "
-    "net-zero emissions and circular economy principles by 2030.\n\n"
-    "To give my best complete final answer to the task respond using the exact following format:\n\n"
-    "Thought: I now can give a great answer.\n\n"
-    "[User]: Current Task: Propose 4-5 actionable sustainability initiatives for a mid-sized manufacturing company, "
-    "focusing on immediate impact and long-term viability, considering current industry trends (2025).\n\n"
-    "This is the expected criteria for your final answer: A bulleted list of initiatives, each with a brief description "
-    "and anticipated benefit (1-2 sentences per initiative).\n\n"
-    "You MUST return the actual complete content as the final answer, not a summary.\n\n"
-    "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it! "
-)
-
-# Use the optimized module to generate an improved prompt
-result = optimized_module(raw_prompt=new_raw_prompt)
-
-print("\n--- Optimized Prompt Generated for New Sustainability Example ---")
-print(result.improved_prompt)
-
-# Display the last prompt(s) used by the optimized module (optional, can show multiple if n > 1)
-print("\n--- Prompt History for Second Final Prediction ---")
-dspy.inspect_history(n=1) # Show only the last prompt used by this new call
+def main():
+    configure_lms()
+
+    config = dict(max_labeled_demos=3)  # Limit to 3 labeled demos for bootstrapping
+
+    # BootstrapFewShot will use the provided metric to guide its optimization
+    teleprompter = BootstrapFewShot(metric=prompt_improvement_metric, **config)
+
+    # --- Compile (Optimize) the Module ---
+    # This is where DSPy learns to transform raw_prompt into improved_prompt
+    print("Starting module optimization with bootstrapping...")
+    optimized_module = teleprompter.compile(basic_module, trainset=trainset)
+    print("Module optimized successfully!")
+
+    print("\n--- Evaluating on Development Set (Manual Loop) ---")
+    dev_scores = []
+    for i, example in enumerate(devset):
+        print(f"Evaluating example {i+1}/{len(devset)}...")
+        prediction = optimized_module(raw_prompt=example.raw_prompt) # Corrected input field
+        score = prompt_improvement_metric(example, prediction) # Corrected metric function
+        dev_scores.append(score)
+
+    avg_dev_score = sum(dev_scores) / len(dev_scores)
+    print(f"\nAverage score on the development set: {avg_dev_score:.2f}")
+
+    new_raw_prompt = (
+        "[System]: You are a Sustainability Consultant specializing in corporate environmental impact. Your goal is to advise "
+        "companies on reducing their carbon footprint and improving resource efficiency. Your backstory: You are an expert "
+        "in analyzing supply chains, energy consumption, and waste management practices.\n\n"
+        "Your personal goal is: Identify actionable strategies and innovative technologies for businesses to achieve "
+        "net-zero emissions and circular economy principles by 2030.\n\n"
+        "To give my best complete final answer to the task respond using the exact following format:\n\n"
+        "Thought: I now can give a great answer.\n\n"
+        "[User]: Current Task: Propose 4-5 actionable sustainability initiatives for a mid-sized manufacturing company, "
+        "focusing on immediate impact and long-term viability, considering current industry trends (2025).\n\n"
+        "This is the expected criteria for your final answer: A bulleted list of initiatives, each with a brief description "
+        "and anticipated benefit (1-2 sentences per initiative).\n\n"
+        "You MUST return the actual complete content as the final answer, not a summary.\n\n"
+        "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it! "
+    )
+
+    # Use the optimized module to generate an improved prompt
+    result = optimized_module(raw_prompt=new_raw_prompt)
+
+    print("\n--- Optimized Prompt Generated for New Sustainability Example ---")
+    print(result.improved_prompt)
+
+    # Display the last prompt(s) used by the optimized module (optional, can show multiple if n > 1)
+    print("\n--- Prompt History for Second Final Prediction ---")
+    dspy.inspect_history(n=1) # Show only the last prompt used by this new call
+
+if __name__ == "__main__":
+    main()
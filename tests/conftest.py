@@ -0,0 +1,7 @@
+# The crew projects keep their own src/ layouts, so the tests put them on the path the same way the benchmarks do
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for project in ("crewcommon", "vanillacrewai", "crewaibootstrap", "crewaimiprov2", "crewruntime"):
+    sys.path.insert(0, os.path.join(REPO_ROOT, project, "src"))
@@ -0,0 +1,69 @@
+# CrewAI boilerplate variants must reach DSPy as one rewrite input, while the agent's and task's own words are kept
+from types import SimpleNamespace
+
+from crewcommon.rewriter import BoilerplateNormalizer, RewriteCache, create_message_rewriter
+
+SYSTEM_PROMPT = (
+    "You are Travel Planner. You plan trips.\n"
+    "Your personal goal is: Plan a 7 day trip to Japan\n"
+    "To give my best complete final answer to the task respond using the exact following format:\n\n"
+    "Thought: I now can give a great answer\n"
+    "Final Answer: Your final answer must be the great and the most complete as possible.\n\n"
+    "I MUST use these formats, my job depends on it!"
+)
+# The same prompt as another CrewAI release words its whitespace, with the "Begin!" line added
+SYSTEM_PROMPT_VARIANT = (
+    "You are Travel Planner. You plan trips.\n"
+    "Your personal  goal\tis: Plan a 7 day trip to Japan\n"
+    "To give my best complete final answer to the task\nrespond using the exact following format:   \n\n\n\n"
+    "Thought: I now can give a great answer\n"
+    "Final Answer: Your final answer must be the great and the most complete as possible.\n\n"
+    "I MUST use these formats, my job depends on it!\n\n"
+    "Begin! This is VERY important to you, use the tools available and give your best Final Answer, your job depends on it!"
+)
+
+def test_boilerplate_variants_normalize_to_the_same_text():
+    normalizer = BoilerplateNormalizer()
+    normalized = normalizer.normalize(SYSTEM_PROMPT)
+    assert normalizer.normalize(SYSTEM_PROMPT_VARIANT) == normalized
+    assert normalized == ("You are Travel Planner. You plan trips.\n"
+                          "Goal: Plan a 7 day trip to Japan\n"
+                          "Answer format:\n\n"
+                          "Thought: I now can give a great answer\n"
+                          "Final Answer: Your final answer must be the great and the most complete as possible.")
+
+def test_content_differences_are_kept():
+    normalizer = BoilerplateNormalizer()
+    other_goal = SYSTEM_PROMPT.replace("Plan a 7 day trip to Japan", "Plan a 3 day trip to Kenya")
+    assert normalizer.normalize(other_goal) != normalizer.normalize(SYSTEM_PROMPT)
+    assert "Goal: Plan a 3 day trip to Kenya" in normalizer.normalize(other_goal)
+    # Text that only resembles a boilerplate phrase is left alone
+    assert normalizer.normalize("My job depends on it: plan the trip.") == "My job depends on it: plan the trip."
+
+def test_stats_count_the_tokens_saved():
+    normalizer = BoilerplateNormalizer()
+    normalizer.normalize(SYSTEM_PROMPT_VARIANT)
+    stats = normalizer.stats()
+    assert stats["messages"] == 1 and stats["tokens_saved"] > 0
+    assert stats["tokens_saved"] == stats["tokens_before"] - stats["tokens_after"]
+
+class RecordingModule:
+    def __init__(self):
+        self.prompts = []
+
+    def dump_state(self):
+        return {}
+
+    def __call__(self, crewai_prompt):
+        self.prompts.append(crewai_prompt)
+        return SimpleNamespace(dspy_improved_prompt=f"REWRITTEN {len(self.prompts)}")
+
+def test_variants_share_one_dspy_rewrite():
+    module = RecordingModule()
+    rewrite_message = create_message_rewriter(module, RewriteCache(), normalizer=BoilerplateNormalizer())
+    first = rewrite_message({"role": "system", "content": SYSTEM_PROMPT})
+    events = []
+    second = rewrite_message({"role": "system", "content": SYSTEM_PROMPT_VARIANT}, events=events)
+    assert first == second == {"role": "system", "content": "REWRITTEN 1"}
+    assert events == ["cache_hit"] and len(module.prompts) == 1
+    assert "my job depends on it" not in module.prompts[0]
@@ -0,0 +1,77 @@
+# Task outputs saved after a run let replay re-execute only the later tasks, and iteration counts must be positive
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from crewcommon.commands import CrewCommands, replay_from_task
+
+class StubTask:
+    def __init__(self, name: str):
+        self.name = name
+        self.description = f"Do the {name}"
+        self.output = None
+
+class StubCrew:
+    """Runs its tasks by echoing the topic and the raw output of the task before."""
+
+    def __init__(self, task_names):
+        self.tasks = [StubTask(name) for name in task_names]
+        self.executed = []
+
+    def _interpolate_inputs(self, inputs):
+        for task in self.tasks:
+            task.description = f"Do the {task.name} for {inputs['topic']}"
+
+    def _execute_tasks(self, tasks, start_index, was_replayed):
+        tasks_output = []
+        for task in tasks[start_index:]:
+            previous = tasks[tasks.index(task) - 1].output.raw if tasks.index(task) else ""
+            task.output = SimpleNamespace(name=task.name, agent=f"{task.name} agent", raw=f"{task.description} after [{previous}]",
+                                          summary=task.name, output_format="raw")
+            self.executed.append(task.name)
+            tasks_output.append(task.output)
+        return SimpleNamespace(tasks_output=tasks_output, raw=tasks_output[-1].raw)
+
+def create_commands():
+    return CrewCommands("stubcrew", create_crew=lambda: pytest.fail("no crew expected"),
+                        default_inputs=lambda: {"topic": "AI tutors"}, intercept=lambda crew_instance: (None, lambda: None))
+
+def test_saved_outputs_replay_from_a_later_task(tmp_path):
+    commands = create_commands()
+    outputs_file = str(tmp_path / "task_outputs.json")
+    inputs = {"topic": "Japan trip"}
+
+    crew = StubCrew(["research", "plan", "report"])
+    crew._interpolate_inputs(inputs)
+    commands.save_task_outputs(crew._execute_tasks(crew.tasks, 0, False), inputs, path=outputs_file)
+    first_run = commands.load_task_outputs(outputs_file)
+    assert first_run["crew"] == "stubcrew" and first_run["inputs"] == inputs
+    assert list(first_run["tasks"]) == ["research", "plan", "report"]
+
+    # A fresh crew re-executes only from "plan", with the saved research output standing in for its run
+    replayed_crew = StubCrew(["research", "plan", "report"])
+    result = replay_from_task(replayed_crew, 1, first_run)
+    assert replayed_crew.executed == ["plan", "report"] and replayed_crew._inputs == inputs
+    assert replayed_crew.tasks[0].output.raw == first_run["tasks"]["research"]["raw"]
+    assert result.tasks_output[0].raw == f"Do the plan for Japan trip after [{first_run['tasks']['research']['raw']}]"
+
+    commands.save_task_outputs(result, first_run["inputs"], path=outputs_file, saved=first_run)
+    with open(outputs_file, encoding="utf-8") as f:
+        replayed = json.load(f)
+    assert replayed["inputs"] == inputs
+    assert replayed["tasks"]["research"]["raw"] == "Do the research for Japan trip after []"
+    assert replayed["tasks"]["report"]["raw"] == result.raw
+    assert not (tmp_path / "task_outputs.json.tmp").exists()
+
+def test_missing_outputs_file_loads_empty(tmp_path):
+    saved = create_commands().load_task_outputs(str(tmp_path / "missing.json"))
+    assert saved == {"crew": "stubcrew", "inputs": {}, "tasks": {}}
+
+@pytest.mark.parametrize("command, argv", [("test", ["0"]), ("test", ["-2"]), ("train", ["0", "training.pkl"])])
+def test_non_positive_iterations_are_rejected(monkeypatch, capsys, command, argv):
+    monkeypatch.setattr(sys, "argv", [command, *argv])
+    with pytest.raises(SystemExit) as exc_info:
+        getattr(create_commands(), command)()
+    assert exc_info.value.code == 2 and "must be at least 1" in capsys.readouterr().err
@@ -0,0 +1,65 @@
+# A MIPROv2 compile resumed from its checkpoint replays every trial the interrupted run finished and evaluates none twice
+import json
+import random
+
+import dspy
+import pytest
+
+from crewaimiprov2 import main as miprov2_main
+from crewaimiprov2.main import CheckpointedMIPROv2, PromptOptimizerModule
+
+SEED = 9
+VALSET = [dspy.Example(crewai_prompt=f"[User]: prompt {i}").with_inputs("crewai_prompt") for i in range(8)]
+
+@pytest.fixture(autouse=True)
+def candidate_steps(monkeypatch):
+    # Stand-ins for the LM-backed steps; like the real ones they make many draws from the optimizer's rng
+    def bootstrap_fewshot_examples(self, program, trainset, seed, teacher):
+        shuffled = list(trainset)
+        self.rng.shuffle(shuffled)
+        return {0: [shuffled[:2]]}
+
+    def propose_instructions(self, *args, **kwargs):
+        tips = ["Be concise.", "Use numbered lists.", "Name the audience.", "Add an example."]
+        return {0: [f"Rewrite the prompt. {self.rng.choice(tips)}" for _ in range(3)]}
+
+    monkeypatch.setattr(miprov2_main.MIPROv2, "_bootstrap_fewshot_examples", bootstrap_fewshot_examples)
+    monkeypatch.setattr(miprov2_main.MIPROv2, "_propose_instructions", propose_instructions)
+
+def compile_trials(checkpoint_dir, num_trials, evaluated):
+    """Runs the compile steps in MIPROv2's order, scoring one random minibatch per trial like minibatch=True does."""
+    optimizer = CheckpointedMIPROv2(checkpoint_dir=str(checkpoint_dir), metric=lambda example, pred, trace=None: True)
+    optimizer.rng = random.Random(SEED)
+    program = PromptOptimizerModule()
+    optimizer._bootstrap_fewshot_examples(program, VALSET, SEED, None)
+    optimizer._propose_instructions()
+
+    def evaluate(candidate_program, devset, return_all_scores=False, **kwargs):
+        evaluated.append(optimizer.fingerprint_devset(devset))
+        return 50.0
+
+    checkpointed_evaluate = optimizer.create_checkpointed_evaluate(evaluate)
+    for _ in range(num_trials):
+        checkpointed_evaluate(program, devset=optimizer.rng.sample(VALSET, 3))
+    return optimizer
+
+def test_resume_replays_finished_minibatch_trials(tmp_path):
+    evaluated = []
+    interrupted = compile_trials(tmp_path, 3, evaluated)
+    assert interrupted.trials_evaluated == 3
+    with open(interrupted.trials_file, "a") as f:
+        f.write('{"key": "cut short by the interrup') # The line being written when the run was killed
+
+    resumed = compile_trials(tmp_path, 6, evaluated)
+    assert (resumed.trials_replayed, resumed.trials_evaluated) == (3, 3)
+    assert len(evaluated) == len(set(evaluated)) == 6
+
+def test_candidate_files_hold_the_rng_state(tmp_path):
+    optimizer = compile_trials(tmp_path, 0, [])
+    for path in (optimizer.demo_candidates_file, optimizer.instruction_candidates_file):
+        with open(path) as f:
+            saved = json.load(f)
+        assert set(saved) == {"candidates", "rng_state"}
+    restored = random.Random()
+    miprov2_main.load_rng_state(restored, saved["rng_state"])
+    assert restored.random() == optimizer.rng.random()
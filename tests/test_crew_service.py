@@ -0,0 +1,123 @@
+# Malformed kickoff requests must get a 400 from the HTTP handler, and malformed batch jobs a per-job error record;
+# neither may reach a crew or stop the rest of the work
+import http.client
+import json
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from crewruntime.main import REPO_ROOT, CrewRuntime, create_request_handler, resolve_crew_paths, run, run_job
+
+class FakeService:
+    def __init__(self):
+        self.jobs = []
+
+    def kickoff(self, job):
+        self.jobs.append(job)
+        return 200, {"status": "ok", "crew": job["crew"]}
+
+@pytest.fixture
+def server():
+    service = FakeService()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), create_request_handler(service))
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield httpd, service
+    httpd.shutdown()
+    httpd.server_close()
+    thread.join()
+
+def post(httpd, body: bytes, content_length=None):
+    conn = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+    try:
+        conn.putrequest("POST", "/kickoff")
+        conn.putheader("Content-Type", "application/json")
+        conn.putheader("Content-Length", str(len(body)) if content_length is None else content_length)
+        conn.endheaders(body)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+@pytest.mark.parametrize("body", [b"{not json", b"\xff\xfe"])
+def test_invalid_json_is_rejected(server, body):
+    httpd, service = server
+    status, response = post(httpd, body)
+    assert status == 400 and "Invalid request body" in response["error"]
+    assert service.jobs == []
+
+@pytest.mark.parametrize("content_length", ["abc", "-1"])
+def test_bad_content_length_is_rejected(server, content_length):
+    httpd, service = server
+    status, response = post(httpd, b'{"crew": "crewaibootstrap"}', content_length=content_length)
+    assert status == 400 and "Invalid request body" in response["error"]
+    assert service.jobs == []
+
+@pytest.mark.parametrize("body", [b'["crewaibootstrap"]', b'"crewaibootstrap"', b"42"])
+def test_non_object_body_is_rejected(server, body):
+    httpd, service = server
+    status, response = post(httpd, body)
+    assert status == 400 and "must be a JSON object" in response["error"]
+    assert service.jobs == []
+
+@pytest.mark.parametrize("job", [{"topic": "AI tutors"}, {"crew": ["crewaibootstrap"], "topic": "AI tutors"}, {"crew": 1}])
+def test_missing_or_non_string_crew_is_rejected(server, job):
+    httpd, service = server
+    status, response = post(httpd, json.dumps(job).encode("utf-8"))
+    assert status == 400 and "'crew' must be one of" in response["error"]
+    assert service.jobs == []
+
+def test_valid_request_reaches_the_service(server):
+    httpd, service = server
+    job = {"crew": "crewaibootstrap", "topic": "Kenyan family going to Japan for 7 days"}
+    status, response = post(httpd, json.dumps(job).encode("utf-8"))
+    assert (status, response) == (200, {"status": "ok", "crew": "crewaibootstrap"})
+    assert service.jobs == [job]
+
+class FakeRuntime:
+    def __init__(self):
+        self.kickoffs = []
+
+    def kickoff(self, crew_name, inputs, timings=None):
+        self.kickoffs.append(crew_name)
+        return "report"
+
+@pytest.mark.parametrize("job", [["crewaibootstrap"], {"topic": "AI tutors"}, {"crew": "unknown", "topic": "AI tutors"},
+                                 {"crew": "crewaibootstrap"}, {"crew": "crewaibootstrap", "inputs": ["AI tutors"]}])
+def test_invalid_batch_job_is_recorded_as_error(job):
+    runtime = FakeRuntime()
+    record = run_job(runtime, 3, job, batch_start=0.0)
+    assert record["index"] == 3 and record["status"] == "error" and record["error"].startswith("ValueError")
+    assert runtime.kickoffs == []
+
+def test_valid_batch_job_runs():
+    runtime = FakeRuntime()
+    record = run_job(runtime, 0, {"crew": "crewaibootstrap", "topic": "AI tutors"}, batch_start=0.0)
+    assert (record["status"], record["result"]) == ("ok", "report")
+    assert runtime.kickoffs == ["crewaibootstrap"]
+
+def test_empty_jobs_file_warms_nothing(tmp_path, monkeypatch):
+    jobs_file = tmp_path / "jobs.jsonl"
+    jobs_file.write_text("# nothing to do\n\n", encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", ["crewruntime", str(jobs_file)])
+    monkeypatch.setattr(CrewRuntime, "warm", lambda self, crew_names=None: pytest.fail("warmed with no jobs"))
+    assert run() == []
+
+def test_crew_artifact_paths_resolve_against_the_project_folder():
+    main_module = SimpleNamespace(ARTIFACT_DIR="optimized_modules", COMPILE_CHECKPOINT_DIR="/abs/checkpoints",
+                                  judge_verdict_store=SimpleNamespace(path="judge_verdicts.sqlite"))
+    templates_file = resolve_crew_paths(main_module, "crewaimiprov2")
+    project = os.path.join(REPO_ROOT, "crewaimiprov2")
+    assert main_module.ARTIFACT_DIR == os.path.join(project, "optimized_modules")
+    assert main_module.judge_verdict_store.path == os.path.join(project, "judge_verdicts.sqlite")
+    assert main_module.COMPILE_CHECKPOINT_DIR == "/abs/checkpoints"
+    assert os.path.dirname(templates_file) == project
+
+def test_disabled_judge_store_stays_disabled():
+    main_module = SimpleNamespace(ARTIFACT_DIR="optimized_modules", judge_verdict_store=SimpleNamespace(path=""))
+    resolve_crew_paths(main_module, "crewaibootstrap")
+    assert main_module.judge_verdict_store.path == ""
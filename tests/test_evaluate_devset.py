@@ -0,0 +1,29 @@
+# Dev examples are scored on worker threads, which must run under the DSPy settings the caller scoped with dspy.context
+import importlib
+
+import dspy
+import pytest
+
+class RecordingModule(dspy.Module):
+    def __init__(self):
+        super().__init__()
+        self.lms = []
+
+    def forward(self, crewai_prompt):
+        self.lms.append(dspy.settings.lm)
+        return dspy.Prediction(dspy_improved_prompt=crewai_prompt)
+
+@pytest.fixture(params=["crewaibootstrap.main", "crewaimiprov2.main"])
+def main_module(request, monkeypatch):
+    main_module = importlib.import_module(request.param)
+    monkeypatch.setattr(main_module, "prompt_improvement_metric", lambda example, pred, trace=None: True)
+    return main_module
+
+def test_workers_run_under_the_callers_lm(main_module):
+    caller_lm = dspy.LM("fake/offline-dspy")
+    devset = [dspy.Example(crewai_prompt=f"[User]: prompt {i}").with_inputs("crewai_prompt") for i in range(4)]
+    module = RecordingModule()
+    with dspy.context(lm=caller_lm):
+        evaluation = main_module.evaluate_devset(module, devset, num_threads=2)
+    assert evaluation["num_errors"] == 0 and evaluation["average_score"] == 1.0
+    assert len(module.lms) == 4 and all(lm is caller_lm for lm in module.lms)
@@ -0,0 +1,34 @@
+# Reporting HTTP pool stats reads the installed registry and must never install the litellm wrapper itself
+import sys
+from types import ModuleType
+
+import pytest
+
+from crewcommon import http_pool
+from crewcommon.http_pool import get_http_pool, install_http_pool, print_http_pool_stats
+
+@pytest.fixture
+def litellm(monkeypatch):
+    fake_litellm = ModuleType("litellm")
+    fake_litellm.completion = lambda *args, **kwargs: "completed"
+    monkeypatch.setitem(sys.modules, "litellm", fake_litellm)
+    monkeypatch.setattr(http_pool, "HTTP_POOL_ENABLED", True)
+    return fake_litellm
+
+def test_nothing_installed_reports_nothing(litellm, capsys):
+    original_completion = litellm.completion
+    assert get_http_pool() is None
+    print_http_pool_stats(get_http_pool())
+    assert capsys.readouterr().out == ""
+    assert litellm.completion is original_completion
+
+def test_litellm_not_imported_is_not_imported(monkeypatch):
+    monkeypatch.delitem(sys.modules, "litellm", raising=False)
+    assert get_http_pool() is None
+    assert "litellm" not in sys.modules
+
+def test_installed_registry_is_returned(litellm):
+    registry = install_http_pool()
+    installed_completion = litellm.completion
+    assert registry is not None and get_http_pool() is registry
+    assert install_http_pool() is registry and litellm.completion is installed_completion
@@ -0,0 +1,52 @@
+# Judge verdicts are reused across trials only for the same candidate text, up to runs of spaces and tabs
+import importlib
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+@pytest.fixture(params=["crewaibootstrap.main", "crewaimiprov2.main"])
+def main_module(request, monkeypatch):
+    main_module = importlib.import_module(request.param)
+    # A strictly increasing clock, so least-recently-used order never depends on timer resolution
+    clock = itertools.count(1)
+    monkeypatch.setattr(main_module, "time", SimpleNamespace(time=lambda: next(clock)))
+    return main_module
+
+def key(main_module, predicted_prompt: str) -> str:
+    return main_module.JudgeVerdictStore.make_key("anthropic/claude-sonnet-4", "[User]: plan a trip", predicted_prompt, "clear?")
+
+def test_spaces_and_tabs_share_a_key(main_module):
+    assert key(main_module, "ROLE: Planner\n- Be  specific") == key(main_module, "ROLE:\tPlanner \n- Be specific  ")
+
+def test_line_breaks_get_their_own_key(main_module):
+    assert key(main_module, "ROLE: Planner\n- Be specific") != key(main_module, "ROLE: Planner - Be specific")
+    assert key(main_module, "## Task\nPlan it") != key(main_module, "## Task Plan it")
+
+def test_hit_and_miss(main_module, tmp_path):
+    store = main_module.JudgeVerdictStore(path=str(tmp_path / "verdicts.sqlite"))
+    assert store.get(key(main_module, "ROLE: Planner")) is None
+    store.put(key(main_module, "ROLE: Planner"), {"assessment": True, "clarity": False})
+    assert store.get(key(main_module, "ROLE:  Planner")) == {"assessment": True, "clarity": False}
+    assert store.get(key(main_module, "ROLE:\nPlanner")) is None
+    assert (store.hits, store.misses) == (1, 2)
+
+def test_verdicts_persist_across_stores(main_module, tmp_path):
+    path = str(tmp_path / "verdicts.sqlite")
+    main_module.JudgeVerdictStore(path=path).put("k", True)
+    assert main_module.JudgeVerdictStore(path=path).get("k") is True
+
+def test_least_recently_used_verdict_is_evicted(main_module, tmp_path):
+    store = main_module.JudgeVerdictStore(path=str(tmp_path / "verdicts.sqlite"), maxsize=2)
+    store.put("a", 1)
+    store.put("b", 2)
+    assert store.get("a") == 1 # "b" is now the least recently used
+    store.put("c", 3)
+    assert (store.get("a"), store.get("b"), store.get("c")) == (1, None, 3)
+
+def test_empty_path_disables_the_store(main_module, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = main_module.JudgeVerdictStore(path="")
+    store.put("a", 1)
+    assert store.get("a") is None
+    assert (store.hits, store.misses) == (0, 0) and list(tmp_path.iterdir()) == []
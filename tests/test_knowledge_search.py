@@ -0,0 +1,71 @@
+# The BM25 index only re-reads files whose mtime or size changed, drops deleted files, and ranks passages by relevance
+import os
+
+from crewcommon.knowledge_search import BM25Index, KnowledgeSearchTool
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+def test_unchanged_files_are_not_reread(tmp_path):
+    write(tmp_path / "visas.md", "Kenyan citizens need a visa for Japan.")
+    write(tmp_path / "food.txt", "Ramen and sushi are popular in Tokyo.")
+    index = BM25Index([(str(tmp_path), True)])
+    assert index.search("visa")[0]["path"] == str(tmp_path / "visas.md")
+    index.search("ramen")
+    assert index.stats()["files"] == 2 and index.stats()["reindexed"] == 2
+
+def test_size_change_reindexes_the_file(tmp_path):
+    write(tmp_path / "visas.md", "Kenyan citizens need a visa for Japan.")
+    index = BM25Index([(str(tmp_path), True)])
+    index.refresh()
+    write(tmp_path / "visas.md", "Kenyan citizens need an eVisa for Japan, issued within five working days.")
+    assert "eVisa" in index.search("evisa")[0]["text"]
+    assert index.search("visa") == [] and index.stats()["reindexed"] == 2
+
+def test_mtime_change_reindexes_the_file(tmp_path):
+    path = tmp_path / "visas.md"
+    write(path, "Kenyan citizens need a visa for Japan.")
+    index = BM25Index([(str(tmp_path), True)])
+    index.refresh()
+    write(path, "Kenyan citizens need a pass for Japan.") # Same size, only the mtime tells them apart
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+    assert index.search("visa") == [] and index.search("pass")[0]["path"] == str(path)
+    assert index.stats()["reindexed"] == 2
+
+def test_deleted_file_is_dropped(tmp_path):
+    write(tmp_path / "visas.md", "Kenyan citizens need a visa for Japan.")
+    write(tmp_path / "food.md", "Ramen and sushi are popular in Tokyo.")
+    index = BM25Index([(str(tmp_path), True)])
+    index.refresh()
+    os.remove(tmp_path / "visas.md")
+    assert index.search("visa") == []
+    stats = index.stats()
+    assert (stats["files"], stats["passages"]) == (1, 1) and "visa" not in index._postings
+
+def test_non_recursive_root_and_excluded_files(tmp_path):
+    write(tmp_path / "report.md", "Japan itinerary for seven days.")
+    write(tmp_path / "README.md", "Japan project docs.")
+    write(tmp_path / "src" / "notes.md", "Japan source notes.")
+    index = BM25Index([(str(tmp_path), False)])
+    assert [result["path"] for result in index.search("japan")] == [str(tmp_path / "report.md")]
+
+def test_ranking_order(tmp_path):
+    write(tmp_path / "both.md", "Visa requirements for a Japan trip from Kenya.")
+    write(tmp_path / "visa.md", "Visa processing takes a week.")
+    write(tmp_path / "other.md", "Packing list for a beach holiday.")
+    write(tmp_path / "repeated.md", "Japan Japan Japan visa visa trip guide and Japan visa office hours.")
+    index = BM25Index([(str(tmp_path), True)])
+    results = index.search("japan visa", top_k=5)
+    paths = [os.path.basename(result["path"]) for result in results]
+    assert paths[:2] == ["repeated.md", "both.md"] and paths[2] == "visa.md" and "other.md" not in paths
+    assert [result["score"] for result in results] == sorted((result["score"] for result in results), reverse=True)
+    assert len(index.search("japan visa", top_k=1)) == 1
+
+def test_tool_searches_the_crew_project(tmp_path):
+    write(tmp_path / "knowledge" / "user_preference.txt", "The user prefers window seats and vegetarian food.")
+    tool = KnowledgeSearchTool(project_root=str(tmp_path))
+    output = tool._run("vegetarian")
+    assert output.startswith(f"[1] {os.path.join('knowledge', 'user_preference.txt')}")
+    assert tool._run("skiing") == "No local knowledge found for: skiing"
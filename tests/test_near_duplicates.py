@@ -0,0 +1,52 @@
+# Near-duplicate rewrite reuse must only ever swap crew-input values, never lookalike numbers or words
+from crewcommon.rewriter import NearDuplicateIndex, patch_rewrite
+
+TOPIC = "Kenyan couple going to Netherlands for 5 days"
+NEW_TOPIC = "Kenyan couple going to Japan for 3 days"
+ORIGINAL = f"Current Task: Create a day-by-day itinerary for {TOPIC}.\nInclude restaurants and transport."
+CONTENT = f"Current Task: Create a day-by-day itinerary for {NEW_TOPIC}.\nInclude restaurants and transport."
+
+def test_rewrite_with_paraphrased_topic_is_not_patched():
+    # The rewrite never repeats the topic verbatim, so "5" and "Netherlands" on their own must not be swapped
+    rewritten = ("TASK: Plan 5 days in the Netherlands for a Kenyan couple.\n"
+                 "FORMAT:\n1. Day 1 - ...\n5. Day 5 - ...\nInclude 5 restaurant picks.")
+    assert patch_rewrite(ORIGINAL, rewritten, CONTENT, {"topic": TOPIC}, {"topic": NEW_TOPIC}) is None
+
+def test_numbered_list_survives_topic_patch():
+    rewritten = (f"TASK: Build an itinerary for {TOPIC}.\n"
+                 "FORMAT:\n1. Day 1 - ...\n5. Day 5 - ...\nInclude 5 restaurant picks.")
+    patched = patch_rewrite(ORIGINAL, rewritten, CONTENT, {"topic": TOPIC}, {"topic": NEW_TOPIC})
+    assert patched == (f"TASK: Build an itinerary for {NEW_TOPIC}.\n"
+                       "FORMAT:\n1. Day 1 - ...\n5. Day 5 - ...\nInclude 5 restaurant picks.")
+
+def test_year_that_also_appears_elsewhere_in_rewrite_is_not_patched():
+    original = "Current Task: Identify gaps in AI coaching using up-to-date 2025 data."
+    content = "Current Task: Identify gaps in AI coaching using up-to-date 2026 data."
+    rewritten = "TASK: Use 2025 data.\nEXAMPLE: A 2025 survey found 2025 users churned."
+    assert patch_rewrite(original, rewritten, content, {"current_year": 2025}, {"current_year": 2026}) is None
+
+def test_year_is_patched_when_every_occurrence_is_the_input():
+    original = "Current Task: Identify gaps in AI coaching using up-to-date 2025 data."
+    content = "Current Task: Identify gaps in AI coaching using up-to-date 2026 data."
+    rewritten = "TASK: List 8-10 gaps grounded in 2025 market data."
+    patched = patch_rewrite(original, rewritten, content, {"current_year": 2025}, {"current_year": 2026})
+    assert patched == "TASK: List 8-10 gaps grounded in 2026 market data."
+
+def test_short_input_values_are_never_patched():
+    original = "Current Task: Plan 5 days in Japan."
+    content = "Current Task: Plan 3 days in Japan."
+    rewritten = "TASK: Plan 5 days in Japan."
+    assert patch_rewrite(original, rewritten, content, {"days": 5}, {"days": 3}) is None
+
+def test_message_that_differs_beyond_its_inputs_is_not_patched():
+    content = CONTENT.replace("restaurants", "museums")
+    rewritten = f"TASK: Build an itinerary for {TOPIC}."
+    assert patch_rewrite(ORIGINAL, rewritten, content, {"topic": TOPIC}, {"topic": NEW_TOPIC}) is None
+
+def test_index_serves_patched_rewrite_for_same_module_only():
+    index = NearDuplicateIndex()
+    index.add(ORIGINAL, f"TASK: Build an itinerary for {TOPIC}.\n5. Day 5", "module-a", {"topic": TOPIC})
+
+    assert index.lookup(CONTENT, "module-a", {"topic": NEW_TOPIC}) == f"TASK: Build an itinerary for {NEW_TOPIC}.\n5. Day 5"
+    assert index.lookup(CONTENT, "module-b", {"topic": NEW_TOPIC}) is None
+    assert index.stats()["hits"] == 1
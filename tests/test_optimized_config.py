@@ -0,0 +1,71 @@
+# The optimized config variant is opt-in, is only loaded while it matches the YAML it was built from,
+# and only holds field rewrites that are still just that field
+import hashlib
+import importlib
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from crewcommon.optimized_config import OptimizedConfigCrew, resolve_optimized_config
+
+def build_variant(config_dir, version="abc123"):
+    (config_dir / "agents.yaml").write_text("planner:\n  goal: Plan trips\n")
+    variant_dir = config_dir / "optimized" / version
+    variant_dir.mkdir(parents=True)
+    digest = hashlib.sha256((config_dir / "agents.yaml").read_bytes()).hexdigest()
+    (variant_dir / "manifest.json").write_text(json.dumps({"sources": {"agents.yaml": digest}}))
+    (config_dir / "optimized" / "current").write_text(version + "\n")
+    return variant_dir
+
+def test_current_variant_is_resolved(tmp_path):
+    variant_dir = build_variant(tmp_path)
+    assert resolve_optimized_config(tmp_path) == variant_dir
+    assert resolve_optimized_config(tmp_path, "missing") is None
+
+def test_variant_built_from_older_yaml_is_ignored(tmp_path):
+    build_variant(tmp_path)
+    (tmp_path / "agents.yaml").write_text("planner:\n  goal: Plan cheaper trips\n")
+    assert resolve_optimized_config(tmp_path) is None
+
+def test_no_variant_without_build(tmp_path):
+    assert resolve_optimized_config(tmp_path) is None
+
+def test_variant_is_opt_in(tmp_path):
+    variant_dir = build_variant(tmp_path)
+
+    class Crew(OptimizedConfigCrew):
+        config_dir = tmp_path
+
+    assert Crew().optimized_config_dir is None
+    crew = Crew(use_optimized_config=True)
+    assert crew.optimized_config_dir == variant_dir
+    assert crew.original_agents_config_path == str(variant_dir / "agents.yaml")
+
+class FieldRewriter:
+    def __init__(self, rewritten):
+        self.rewritten = rewritten
+
+    def __call__(self, crewai_prompt):
+        return SimpleNamespace(dspy_improved_prompt=self.rewritten)
+
+@pytest.fixture(params=["crewaibootstrap.main", "crewaimiprov2.main"])
+def main_module(request):
+    return importlib.import_module(request.param)
+
+def test_field_rewrite_is_kept(main_module):
+    rewritten, reason = main_module.rewrite_config_field(FieldRewriter("Plan a detailed {days}-day trip to {country}."),
+                                                         "Plan a trip to {country} for {days} days")
+    assert (rewritten, reason) == ("Plan a detailed {days}-day trip to {country}.\n", None)
+
+@pytest.mark.parametrize("rewritten, reason", [
+    ("[System]: You are a planner.\n[User]: Plan a trip to {country}.", "whole prompt"),
+    ("Current Task: plan a trip to {country}", "whole prompt"),
+    ("Plan a trip to {country}. " * 40, "grew from"),
+    ("Plan a trip.", "dropped placeholders"),
+    ("Plan a trip to {country} in {month}.", "added placeholders"),
+])
+def test_bad_field_rewrite_keeps_the_original(main_module, rewritten, reason):
+    original = "Plan a trip to {country}"
+    kept, kept_reason = main_module.rewrite_config_field(FieldRewriter(rewritten), original)
+    assert kept == original and kept_reason.startswith(reason)
@@ -0,0 +1,46 @@
+# Cached rewrites are served only for the same message and the same optimized module, and the cache stays bounded
+from crewcommon.rewriter import RewriteCache, fingerprint_module
+
+class StateModule:
+    """Stands in for a dspy.Module: fingerprint_module only reads dump_state()."""
+
+    def __init__(self, instructions: str):
+        self.instructions = instructions
+
+    def dump_state(self):
+        return {"improve.predict": {"signature": {"instructions": self.instructions}, "demos": []}}
+
+SYSTEM_PROMPT = "You are Travel Planner. Your goal is to plan trips."
+
+def test_hit_after_put_and_miss_for_other_content():
+    cache = RewriteCache()
+    fingerprint = fingerprint_module(StateModule("Rewrite the prompt."))
+    assert cache.get(RewriteCache.make_key(SYSTEM_PROMPT, fingerprint)) is None
+    cache.put(RewriteCache.make_key(SYSTEM_PROMPT, fingerprint), "ROLE: Travel Planner")
+    assert cache.get(RewriteCache.make_key(SYSTEM_PROMPT, fingerprint)) == "ROLE: Travel Planner"
+    assert cache.get(RewriteCache.make_key(SYSTEM_PROMPT + " ", fingerprint)) is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 1, "maxsize": cache.maxsize}
+
+def test_changed_module_misses():
+    cache = RewriteCache()
+    old_fingerprint = fingerprint_module(StateModule("Rewrite the prompt."))
+    new_fingerprint = fingerprint_module(StateModule("Rewrite the prompt with numbered steps."))
+    assert old_fingerprint != new_fingerprint
+    assert fingerprint_module(StateModule("Rewrite the prompt.")) == old_fingerprint
+    cache.put(RewriteCache.make_key(SYSTEM_PROMPT, old_fingerprint), "ROLE: Travel Planner")
+    assert cache.get(RewriteCache.make_key(SYSTEM_PROMPT, new_fingerprint)) is None
+
+def test_least_recently_used_rewrite_is_evicted():
+    cache = RewriteCache(maxsize=2)
+    cache.put("a", "rewrite a")
+    cache.put("b", "rewrite b")
+    assert cache.get("a") == "rewrite a" # "b" is now the least recently used
+    cache.put("c", "rewrite c")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("rewrite a", None, "rewrite c")
+    assert cache.stats()["size"] == 2
+
+def test_put_replaces_an_existing_rewrite():
+    cache = RewriteCache(maxsize=2)
+    cache.put("a", "first")
+    cache.put("a", "second")
+    assert cache.get("a") == "second" and cache.stats()["size"] == 1
@@ -0,0 +1,73 @@
+# The rewrite policy decides per message, by its role, agent turn and calling agent, and rejects unknown rules up front
+from types import SimpleNamespace
+
+import pytest
+
+from crewcommon import rewriter
+from crewcommon.rewriter import RewritePolicy, build_message_contexts, get_rewrite_policy
+
+MESSAGES = [
+    {"role": "system", "content": "You are Travel Planner."},
+    {"role": "user", "content": "Current Task: plan a trip to Japan"},
+    {"role": "assistant", "content": "Thought: I should search the knowledge files"},
+    {"role": "user", "content": "Observation: the user prefers window seats"},
+]
+
+def call_kwargs(agent_role: str):
+    crew = SimpleNamespace(_inputs={"topic": "Japan"})
+    return {"from_agent": SimpleNamespace(role=agent_role, crew=crew), "from_task": SimpleNamespace(name="itinerary_creation_task")}
+
+def decisions(policy: RewritePolicy, agent_role: str = "Travel Planner"):
+    contexts = build_message_contexts(MESSAGES, call_kwargs(agent_role))
+    return [policy.should_rewrite(msg, context) for msg, context in zip(MESSAGES, contexts)]
+
+def test_contexts_describe_role_turn_agent_and_inputs():
+    contexts = build_message_contexts(MESSAGES, call_kwargs("Travel Planner"))
+    assert [(context["role"], context["index"], context["turn"]) for context in contexts] == [
+        ("system", 0, 0), ("user", 1, 0), ("assistant", 2, 1), ("user", 3, 1)]
+    assert contexts[0]["agent"] == "Travel Planner" and contexts[0]["task"] == "itinerary_creation_task"
+    assert contexts[0]["inputs"] == {"topic": "Japan"}
+
+@pytest.mark.parametrize("rules, expected", [
+    ("all", [True, True, True, True]),
+    ("", [True, True, True, True]),
+    ("system_only", [True, False, False, False]),
+    ("first_turn", [True, True, False, False]),
+    ("no_assistant", [True, True, False, True]),
+    ("first_turn, no_assistant", [True, True, False, False]),
+])
+def test_built_in_rules_decide_per_message(rules, expected):
+    assert decisions(RewritePolicy(rules)) == expected
+
+def test_first_failing_rule_is_counted():
+    policy = RewritePolicy("no_assistant,first_turn")
+    decisions(policy)
+    assert policy.stats() == {"policy": "no_assistant,first_turn", "rewritten": 2, "skipped": {"no_assistant": 1, "first_turn": 1}}
+
+def test_custom_rule_decides_per_agent():
+    policy = RewritePolicy([("planner_only", lambda msg, context: context["agent"] == "Travel Planner"),
+                            ("system_only", rewriter.REWRITE_POLICY_RULES["system_only"])])
+    assert decisions(policy, "Travel Planner") == [True, False, False, False]
+    assert decisions(policy, "Visa Expert") == [False, False, False, False]
+    assert policy.stats()["skipped"] == {"planner_only": 4, "system_only": 3}
+
+def test_unknown_rule_is_rejected():
+    with pytest.raises(ValueError, match="first_trun"):
+        RewritePolicy("first_trun")
+
+def test_invalid_policy_setting_exits(monkeypatch):
+    monkeypatch.setattr(rewriter, "REWRITE_POLICY", "system_only,everything")
+    get_rewrite_policy.cache_clear()
+    try:
+        with pytest.raises(SystemExit, match="Invalid DSPY_REWRITE_POLICY='system_only,everything'"):
+            get_rewrite_policy()
+    finally:
+        get_rewrite_policy.cache_clear()
+
+def test_policy_setting_is_built_once(monkeypatch):
+    monkeypatch.setattr(rewriter, "REWRITE_POLICY", "first_turn")
+    get_rewrite_policy.cache_clear()
+    try:
+        assert get_rewrite_policy() is get_rewrite_policy() and get_rewrite_policy().name == "first_turn"
+    finally:
+        get_rewrite_policy.cache_clear()
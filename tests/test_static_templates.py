@@ -0,0 +1,79 @@
+# Prompts compiled offline with their {placeholders} are served for any inputs without DSPy, and only if every
+# placeholder survived the rewrite
+from types import SimpleNamespace
+
+from crewcommon.rewriter import BoilerplateNormalizer, StaticTemplateStore, fingerprint_module, to_placeholder_form
+
+TEMPLATE = "Current Task: Create a day-by-day itinerary for {topic} in {current_year}.\nYour personal goal is: Plan trips"
+
+class TemplateModule:
+    """Rewrites a template by wrapping it; `keep` decides whether the placeholders survive."""
+
+    def __init__(self, keep: bool = True, version: str = "v1"):
+        self.keep = keep
+        self.version = version
+        self.prompts = []
+
+    def dump_state(self):
+        return {"version": self.version}
+
+    def __call__(self, crewai_prompt):
+        self.prompts.append(crewai_prompt)
+        rewritten = crewai_prompt if self.keep else crewai_prompt.replace("{topic}", "the trip")
+        return SimpleNamespace(dspy_improved_prompt=f"TASK:\n{rewritten}\n")
+
+def interpolate(inputs):
+    return TEMPLATE.format(**inputs)
+
+def test_placeholder_form_recovers_the_template():
+    inputs = {"topic": "Kenyan family going to Japan", "current_year": 2025}
+    assert to_placeholder_form(interpolate(inputs), inputs) == (TEMPLATE, ["current_year", "topic"])
+
+def test_compiled_template_is_filled_for_new_inputs(tmp_path):
+    path = str(tmp_path / "static_templates.json")
+    module = TemplateModule()
+    counts = StaticTemplateStore(path).compile(module, [(TEMPLATE, ["current_year", "topic"])])
+    assert counts == {"compiled": 1, "reused": 0, "rejected": 0}
+
+    store = StaticTemplateStore(path) # Served from the saved file, as at run time
+    inputs = {"topic": "Kenyan couple going to Peru", "current_year": 2026}
+    filled = store.lookup(interpolate(inputs), inputs, fingerprint_module(module))
+    assert filled == "TASK:\n" + interpolate(inputs)
+    assert store.stats() == {"compiled": 1, "hits": 1, "misses": 0}
+
+def test_lookup_misses_for_other_modules_and_other_prompts(tmp_path):
+    store = StaticTemplateStore(str(tmp_path / "static_templates.json"))
+    module = TemplateModule()
+    store.compile(module, [(TEMPLATE, ["current_year", "topic"])])
+    inputs = {"topic": "Kenyan couple going to Peru", "current_year": 2026}
+    assert store.lookup(interpolate(inputs), inputs, fingerprint_module(TemplateModule(version="v2"))) is None
+    assert store.lookup(interpolate(inputs) + "\nExtra context", inputs, fingerprint_module(module)) is None
+    assert store.stats()["misses"] == 2
+
+def test_rewrite_that_drops_a_placeholder_is_rejected(tmp_path):
+    store = StaticTemplateStore(str(tmp_path / "static_templates.json"))
+    module = TemplateModule(keep=False)
+    assert store.compile(module, [(TEMPLATE, ["current_year", "topic"])]) == {"compiled": 0, "reused": 0, "rejected": 1}
+    inputs = {"topic": "Kenyan couple going to Peru", "current_year": 2026}
+    assert store.lookup(interpolate(inputs), inputs, fingerprint_module(module)) is None
+    assert store.stats()["compiled"] == 0
+
+def test_compiled_templates_are_reused(tmp_path):
+    path = str(tmp_path / "static_templates.json")
+    StaticTemplateStore(path).compile(TemplateModule(), [(TEMPLATE, ["current_year", "topic"])])
+    module = TemplateModule()
+    assert StaticTemplateStore(path).compile(module, [(TEMPLATE, ["current_year", "topic"])]) == {"compiled": 0, "reused": 1, "rejected": 0}
+    assert module.prompts == []
+
+def test_templates_are_normalized_before_compiling(tmp_path):
+    module = TemplateModule()
+    StaticTemplateStore(str(tmp_path / "static_templates.json")).compile(module, [(TEMPLATE, ["current_year", "topic"])],
+                                                                          normalizer=BoilerplateNormalizer())
+    assert module.prompts == [TEMPLATE.replace("Your personal goal is:", "Goal:")]
+
+def test_unreadable_file_is_ignored(tmp_path, capsys):
+    path = tmp_path / "static_templates.json"
+    path.write_text("{not json")
+    store = StaticTemplateStore(str(path))
+    assert store.stats() == {"compiled": 0, "hits": 0, "misses": 0}
+    assert "Ignoring unreadable static templates file" in capsys.readouterr().out
@@ -0,0 +1,84 @@
+# Successive halving keeps the top 1/eta of the candidates after each rung and stops once the search budget is spent
+import os
+import sys
+from types import SimpleNamespace
+
+import dspy
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from fake_lm import FakeDSPyLM
+
+import crewaimiprov2.main as main_module
+
+# Candidate i scores QUALITIES[i] on every dev example, so the promotion order is known up front
+QUALITIES = [3, 7, 1, 8, 5, 2, 6, 4]
+
+class QualityModule(dspy.Module):
+    """Search candidate that makes one fake LM call per example and answers with its fixed quality."""
+
+    def __init__(self, quality: int):
+        super().__init__()
+        self.quality = quality
+        self.improver = SimpleNamespace(demos=[None] * quality)
+
+    def forward(self, crewai_prompt):
+        dspy.settings.lm(messages=[{"role": "user", "content": crewai_prompt}])
+        return dspy.Prediction(dspy_improved_prompt=str(self.quality))
+
+@pytest.fixture
+def fake_lm(monkeypatch):
+    monkeypatch.setattr(main_module, "get_search_candidates", lambda trainset: [QualityModule(q) for q in QUALITIES])
+    monkeypatch.setattr(main_module, "prompt_improvement_metric",
+                        lambda example, pred, trace=None: int(pred.dspy_improved_prompt) / 10)
+    fake_lm = FakeDSPyLM(latency=0)
+    with dspy.context(lm=fake_lm):
+        yield fake_lm
+
+def get_devset(size: int = 8):
+    return [dspy.Example(crewai_prompt=f"[User]: prompt {i}").with_inputs("crewai_prompt") for i in range(size)]
+
+def test_rung_sizes_grow_by_eta_up_to_the_devset():
+    assert main_module.get_search_rung_sizes(8, minibatch_size=2, eta=2) == [2, 4, 8]
+    assert main_module.get_search_rung_sizes(10, minibatch_size=2, eta=3) == [2, 6, 10]
+    assert main_module.get_search_rung_sizes(2, minibatch_size=4, eta=2) == [2]
+
+def test_top_candidates_are_promoted_and_only_scored_on_new_examples(fake_lm):
+    best, report = main_module.successive_halving_search([], get_devset(), eta=2, num_threads=2)
+
+    assert [rung["minibatch_size"] for rung in report["rungs"]] == [2, 4, 8]
+    assert [rung["candidates"] for rung in report["rungs"]] == [8, 4, 2]
+    assert [rung["best_score"] for rung in report["rungs"]] == pytest.approx([0.8, 0.8, 0.8])
+    assert best.quality == 8 and report["best_candidate"] == QUALITIES.index(8) and report["best_demos"] == 8
+    assert report["fully_scored"] and report["stop_reason"] is None
+    # 8 candidates x 2 examples, then 4 x 2 and 2 x 4 new ones: scores from earlier rungs are reused
+    assert report["lm_calls"] == fake_lm.counter.calls == 16 + 8 + 8
+
+def test_lm_call_budget_stops_the_search_after_the_rung_that_spent_it(fake_lm):
+    budget = main_module.SearchBudget(time_budget=0, lm_call_budget=16)
+    best, report = main_module.successive_halving_search([], get_devset(), budget=budget, eta=2, num_threads=2)
+
+    assert len(report["rungs"]) == 1 and report["stop_reason"] == "LM call budget of 16"
+    assert best.quality == 8 and not report["fully_scored"]
+    assert report["lm_calls"] == fake_lm.counter.calls == 16
+
+def test_spent_budget_falls_back_to_the_zero_shot_candidate(fake_lm):
+    budget = main_module.SearchBudget(time_budget=0, lm_call_budget=1)
+    budget.lm_calls = 1
+    best, report = main_module.successive_halving_search([], get_devset(), budget=budget, eta=2, num_threads=2)
+
+    assert report["rungs"] == [] and report["best_candidate"] == 0 and best.quality == QUALITIES[0]
+    assert not report["fully_scored"] and fake_lm.counter.calls == 0
+
+def test_search_budget_reports_the_cap_it_hit():
+    assert main_module.SearchBudget(time_budget=0, lm_call_budget=0).exhausted() is None
+
+    budget = main_module.SearchBudget(time_budget=0, lm_call_budget=5)
+    budget.charge({"results": [{"lm_calls": 2}, {"lm_calls": None}, {"lm_calls": 2}]})
+    assert budget.lm_calls == 4 and budget.exhausted() is None
+    budget.charge({"results": [{"lm_calls": 1}]})
+    assert budget.exhausted() == "LM call budget of 5"
+
+    budget = main_module.SearchBudget(time_budget=0.5, lm_call_budget=0)
+    budget.start_time -= 1
+    assert budget.exhausted() == "time budget of 0.5s"
@@ -1,15 +1,23 @@
+from pathlib import Path
+
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
+from crewcommon.optimized_config import OptimizedConfigCrew
+
+from .tools.custom_tool import KnowledgeSearchTool
 
 @CrewBase
-class OpportunityInsightCrew():
+class OpportunityInsightCrew(OptimizedConfigCrew):
     """Crew that explores opportunities and reports insights for a given topic"""
 
+    config_dir = Path(__file__).parent / "config" # CREW_OPTIMIZED_CONFIG=1 loads config/optimized/current instead of the YAML below
+
     @agent
     def opportunity_explorer(self) -> Agent:
         return Agent(
             config=self.agents_config['opportunity_explorer'],
             verbose=True,
+            tools=[KnowledgeSearchTool()], # Shared BM25 index over knowledge/ and earlier reports
             llm="anthropic/claude-sonnet-4-20250514"
         )
 
@@ -18,6 +26,7 @@ class OpportunityInsightCrew():
         return Agent(
             config=self.agents_config['insight_reporter'],
             verbose=True,
+            tools=[KnowledgeSearchTool()], # Shared BM25 index over knowledge/ and earlier reports
             llm="anthropic/claude-sonnet-4-20250514"
         )
 
@@ -1,45 +1,77 @@
 # --- Monkey Patch CrewAI's LLM.call to intercept messages ---
-import crewai.llm
+# Importing this module patches nothing; each entry point installs the interceptor and the pooled HTTP clients
+# when it starts, so importing it stays fast, offline and side-effect free.
 from datetime import datetime
+from typing import Callable, Dict, Tuple
 
-original_llm_call = crewai.llm.LLM.call
+from crewcommon.commands import CrewCommands
+from crewcommon.http_pool import get_http_pool, install_http_pool, print_http_pool_stats
+from crewcommon.interceptor import RewriteStats, create_counting_llm_call, patch_llm_call, print_rewrite_stats_summary, write_rewrite_stats
+from crewcommon.streaming import task_output_streamer
 
-def intercepted_llm_call(self, messages, *args, **kwargs):
-    # Ensure messages is a list of dicts
-    if isinstance(messages, str):
-        messages = [{"role": "user", "content": messages}]
+# --- Interceptor Token and Latency Accounting ---
 
-    # Print intercepted messages
-    print("\n🧠 [Intercepted LLM Messages]:")
-    print("=" * 60)
-    for msg in messages:
-        print(f"[{msg.get('role', 'user')}] {msg.get('content', '')}")
-    print("=" * 60)
+# Every intercepted LLM.call records its token estimates and latency, using the same counters as the
+# DSPy crews (rewrite time, cache and policy counts stay 0 here, nothing is rewritten).
+# run() dumps the per-agent/task totals as JSON and as a Prometheus textfile.
+CREW_NAME = "vanillacrewai"
 
-    # Proceed as normal
-    return original_llm_call(self, messages, *args, **kwargs)
+def install_interceptor() -> RewriteStats:
+    """Patches LLM.call to print and count every prompt, and returns the stats for this crew run."""
+    install_http_pool() # The agents' litellm calls reuse pooled keep-alive connections
+    rewrite_stats = RewriteStats(CREW_NAME)
+    patch_llm_call(create_counting_llm_call(rewrite_stats, print_prompts=True))
+    return rewrite_stats
 
-# Apply the monkey patch
-crewai.llm.LLM.call = intercepted_llm_call
+def report_run_stats(rewrite_stats: RewriteStats) -> None:
+    print_rewrite_stats_summary(rewrite_stats)
+    print_http_pool_stats(get_http_pool())
+    write_rewrite_stats(rewrite_stats)
 
 # --- Import and run your Crew ---
-from src.vanillacrewai.crew import OpportunityInsightCrew
+
+def create_crew():
+    from src.vanillacrewai.crew import OpportunityInsightCrew
+    return OpportunityInsightCrew()
+
+def get_default_inputs() -> Dict:
+    return {
+        "topic": "AI in Personalized Fitness and Nutrition Coaching",
+        "current_year": datetime.now().year
+    }
+
+def intercept_crew_run(crew_instance) -> Tuple[RewriteStats, Callable[[], None]]:
+    rewrite_stats = install_interceptor()
+    return rewrite_stats, lambda: report_run_stats(rewrite_stats)
+
+commands = CrewCommands(CREW_NAME, create_crew, default_inputs=get_default_inputs, intercept=intercept_crew_run)
 
 def run():
     print("🚀 Launching OpportunityInsightCrew...")
 
-    crew_instance = OpportunityInsightCrew()
+    rewrite_stats = install_interceptor()
+    crew_instance = create_crew()
+    crew = crew_instance.crew()
+    if task_output_streamer is not None:
+        task_output_streamer.attach(crew)
 
-    inputs = {
-        "topic": "AI in Personalized Fitness and Nutrition Coaching",  
-        "current_year": datetime.now().year
-    }
+    inputs = get_default_inputs()
 
-    result = crew_instance.crew().kickoff(inputs=inputs)
+    result = crew.kickoff(inputs=inputs)
 
     print("\n✅ Final Result:")
     print(result)
+
+    report_run_stats(rewrite_stats)
+    commands.save_task_outputs(result, inputs)
     return result
 
+# --- Batch Kickoff and Train / Replay / Test ---
+# Console scripts (see pyproject.toml); kickoffs run in worker threads behind the same interceptor as run()
+run_batch = commands.run_batch
+train = commands.train
+replay = commands.replay
+test = commands.test
+
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()